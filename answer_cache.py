@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import CACHE_DIR
+
+# 공지 업로드 시 갱신되는 인덱스 버전 파일 (다른 프로세스의 캐시까지 무효화하는 용도)
+INDEX_VERSION_FILE = os.path.join(CACHE_DIR, "index_version")
+
+# 새 공지가 벡터 DB에 올라갔음을 기록함 (upload.py / update_upload.py 에서 호출)
+def bump_index_version():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(INDEX_VERSION_FILE, "w") as f:
+        f.write(str(time.time_ns()))
+
+def read_index_version():
+    try:
+        with open(INDEX_VERSION_FILE) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+# 날짜 필터를 캐시 키로 변환 (타임스탬프는 일 단위로 맞춰서 '최근' 같은 상대 필터도 같은 날엔 같은 키가 됨)
+def date_filter_key(date_filter):
+    if not date_filter:
+        return ""
+
+    def coarsen(value):
+        if isinstance(value, dict):
+            return {k: coarsen(v) for k, v in value.items()}
+        if isinstance(value, (int, float)):
+            return int(value) // 86400
+        return value
+
+    return json.dumps(coarsen(date_filter), sort_keys=True)
+
+# 캐시된 답변을 스트림처럼 다시 흘려보냄 (st.write_stream 동작 유지)
+def replay_stream(answer):
+    for piece in re.findall(r"\S+\s*|\s+", answer):
+        yield piece
+
+class _Entry:
+    __slots__ = ("vector", "bucket", "answer", "sources", "created_at")
+
+    def __init__(self, vector, bucket, answer, sources, created_at):
+        self.vector = vector
+        self.bucket = bucket
+        self.answer = answer
+        self.sources = sources
+        self.created_at = created_at
+
+# 질문 임베딩 유사도 기반 답변 캐시 (LRU + TTL, 날짜 필터/언어별로 분리)
+class AnswerCache:
+    def __init__(self, max_entries=256, ttl_seconds=1800, similarity_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._index_version = read_index_version()
+
+    # 인덱스 버전이 바뀌었으면 (새 공지 업로드) 캐시 전체를 비움
+    def _check_index_version(self):
+        version = read_index_version()
+        if version != self._index_version:
+            self._entries.clear()
+            self._index_version = version
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    # 적중하면 (답변, 출처 공지 목록), 아니면 None
+    def lookup(self, vector, date_filter, language):
+        query = _normalize(vector)
+        bucket = (date_filter_key(date_filter), language)
+        now = time.time()
+        with self._lock:
+            self._check_index_version()
+            self._expire(now)
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry.bucket == bucket]
+            if candidates:
+                matrix = np.stack([entry.vector for _, entry in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.answer, entry.sources
+            self.misses += 1
+            return None
+
+    def store(self, vector, date_filter, language, answer, sources=()):
+        if not answer:
+            return
+        entry = _Entry(_normalize(vector), (date_filter_key(date_filter), language), answer, list(sources), time.time())
+        with self._lock:
+            self._check_index_version()
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
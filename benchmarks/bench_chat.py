@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# 채팅 경로(get_ai_events)와 로그인 추천(get_recommended_notices)의 오프라인 부하/지연 벤치마크
+# OpenAI 채팅/임베딩, Pinecone, Google 번역, MySQL 을 지연을 조절할 수 있는 가짜 백엔드로 바꾸고
+# 가짜 공지를 로컬 인덱스에 색인한 뒤 동시 요청을 보내 QPS, 지연 분포, 출처 카드/첫 토큰 시간, 단계별 지연을 JSON 으로 출력
+# 실행: python -m benchmarks.bench_chat --requests 200 --concurrency 8 --output bench.json
+# --max-p95-ms / --max-ttft-p95-ms 를 주면 넘었을 때 종료 코드 1 (변경 전후 비교 게이트용)
+
+# 저장소 모듈을 불러오기 전에 벤치마크용 환경 설정 (임시 캐시 디렉터리, 로컬 인덱스, 메모리 대화 기록, 추적 출력 끔)
+os.environ["CACHE_DIR"] = os.environ.get("BENCH_CACHE_DIR") or tempfile.mkdtemp(prefix="bench_chat_")
+os.environ["VECTOR_BACKEND"] = "local"
+os.environ["TRACE_EXPORTERS"] = ""
+os.environ.pop("CHAT_HISTORY_URL", None)
+
+# 모듈을 불러올 때 출력되는 메시지(현재 날짜 등)는 stderr 로 보냄 (stdout 에는 결과 JSON 만)
+with contextlib.redirect_stdout(sys.stderr):
+    import llm
+    import login
+    from answer_cache import AnswerCache
+    from notice_index import build_documents, index_documents
+    from digests import refresh_digests
+    from tracing import stage_stats
+    from benchmarks.fakes import (
+        FakeEmbeddings, FakeChatModel, FakeTranslatorBackend, FakeConnection,
+        make_notice_rows, fake_openai_module,
+    )
+
+QUESTIONS = [
+    "국가장학금 신청 언제까지야?",
+    "이번 주 공지 알려줘",
+    "수강신청 정정 기간 알려줘",
+    "기숙사 입사 신청 어떻게 해?",
+    "최근 공지사항 몇 개만 알려줘",
+    "졸업 요건 공지 있어?",
+    "등록금 분할 납부 신청 방법",
+    "어제 올라온 채용 설명회 공지",
+    "휴학 신청 서류 뭐 필요해?",
+    "이번 달 축제 부스 공지 알려줘",
+]
+
+FOLLOW_UPS = ["신청 기간 다시 알려줘", "링크도 줘", "그거 언제까지야?"]
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": int(len(values)), "mean": round(float(values.mean()), 2), "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2), "p99": round(float(p99), 2), "max": round(float(values.max()), 2)}
+
+# 가짜 공지를 색인하고 가짜 백엔드로 만든 파이프라인을 llm 모듈에 넣음
+def setup(args):
+    embeddings = FakeEmbeddings(dimensions=args.dimensions, latency_ms=args.embed_ms)
+    rows = make_notice_rows(args.notices)
+    index_documents(build_documents(rows), FakeEmbeddings(dimensions=args.dimensions), rebuild=True)
+
+    chat_model = FakeChatModel(first_token_ms=args.first_token_ms, tokens_per_sec=args.tokens_per_sec,
+                               answer_tokens=args.answer_tokens)
+    translator = FakeTranslatorBackend(latency_ms=args.translate_ms)
+    llm.set_pipeline(llm.RagPipeline(embeddings=embeddings, llm=chat_model, translator_backend=translator))
+    if args.digests:
+        refresh_digests(rows, llm=chat_model)
+    if not args.answer_cache:
+        llm.answer_cache = AnswerCache(max_entries=0)
+
+    login.create_connection = lambda: FakeConnection(rows)
+    login.openai = fake_openai_module(latency_ms=args.recommend_ms)
+    return {"embeddings": embeddings, "chat_model": chat_model, "translator": translator}
+
+# pages/chat.py 와 같은 순서로 한 세션의 질문들을 처리 (FAQ 의도 매칭 → 출처 공지 → 스트리밍 답변)
+def run_session(index, args, results, lock):
+    # english_ratio 비율만큼 영어 세션을 고르게 섞음
+    language = "English" if int((index + 1) * args.english_ratio) > int(index * args.english_ratio) else "한국어"
+    session_id = f"bench-{index}"
+    question = QUESTIONS[index % len(QUESTIONS)]
+    if index >= args.distinct_questions:
+        question = f"{question} ({index})"
+    for turn in range(args.turns):
+        message = question if turn == 0 else FOLLOW_UPS[(index + turn) % len(FOLLOW_UPS)]
+        start = time.perf_counter()
+        sources = ttft = None
+        error = None
+        try:
+            if llm.match_faq_intent(message, language) is None:
+                for event in llm.get_ai_events(message, language=language, session_id=session_id):
+                    if event["type"] == "sources" and sources is None:
+                        sources = (time.perf_counter() - start) * 1000
+                    elif event["type"] == "token" and ttft is None:
+                        ttft = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            error = type(e).__name__
+        with lock:
+            results.append({"latency_ms": (time.perf_counter() - start) * 1000, "sources_ms": sources, "ttft_ms": ttft,
+                            "error": error, "language": language})
+
+def run_chat(args):
+    results, lock = [], threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(run_session, i, args, results, lock) for i in range(args.requests)]:
+            future.result()
+    wall = time.perf_counter() - start
+    ok = [result for result in results if result["error"] is None]
+    errors = {}
+    for result in results:
+        if result["error"]:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "qps": round(len(ok) / wall, 2) if wall else None,
+        "latency_ms": percentiles([result["latency_ms"] for result in ok]),
+        "sources_ms": percentiles([result["sources_ms"] for result in ok if result["sources_ms"] is not None]),
+        "ttft_ms": percentiles([result["ttft_ms"] for result in ok if result["ttft_ms"] is not None]),
+    }
+
+def run_recommend(args):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(index):
+        start = time.perf_counter()
+        login.get_recommended_notices("컴퓨터공학부")
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.recommend_requests)))
+    wall = time.perf_counter() - start
+    return {"requests": len(latencies), "wall_seconds": round(wall, 3),
+            "qps": round(len(latencies) / wall, 2) if wall else None, "latency_ms": percentiles(latencies)}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 채팅 경로 부하/지연 벤치마크")
+    parser.add_argument("--requests", type=int, default=100, help="세션 수 (세션마다 --turns 개 질문)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=1, help="세션당 질문 수 (2 이상이면 후속 질문 재작성 포함)")
+    parser.add_argument("--distinct-questions", type=int, default=0,
+                        help="처음 N개 세션만 같은 질문 목록을 반복 (나머지는 서로 다른 질문)")
+    parser.add_argument("--english-ratio", type=float, default=0.0)
+    parser.add_argument("--answer-cache", action="store_true", help="답변 캐시 사용 (기본은 꺼서 전체 경로를 측정)")
+    parser.add_argument("--digests", action="store_true", help="오늘/이번 주/최근 공지 요약을 미리 만들어 사용")
+    parser.add_argument("--notices", type=int, default=300)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=60.0)
+    parser.add_argument("--first-token-ms", type=float, default=400.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--translate-ms", type=float, default=150.0)
+    parser.add_argument("--recommend-ms", type=float, default=1500.0)
+    parser.add_argument("--recommend-requests", type=int, default=20)
+    parser.add_argument("--max-p95-ms", type=float, help="채팅 전체 지연 p95 상한 (넘으면 종료 코드 1)")
+    parser.add_argument("--max-ttft-p95-ms", type=float, help="첫 토큰 시간 p95 상한 (넘으면 종료 코드 1)")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (없으면 표준 출력)")
+    parser.add_argument("--verbose", action="store_true", help="파이프라인 로그 출력")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # 파이프라인 로그는 --verbose 면 stderr 로, 아니면 버림 (stdout 에는 결과 JSON 만)
+    log = contextlib.redirect_stdout(sys.stderr if args.verbose else open(os.devnull, "w"))
+    with log:
+        backends = setup(args)
+        stage_stats.clear()
+        chat = run_chat(args)
+        stages = stage_stats.summary()
+        recommend = run_recommend(args) if args.recommend_requests else None
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "chat": chat,
+        "stages_ms": stages,
+        "recommend": recommend,
+        "backend_calls": {
+            "chat_model": backends["chat_model"].calls,
+            "embeddings": backends["embeddings"].calls,
+            "translator": backends["translator"].calls,
+        },
+        "answer_cache": llm.answer_cache.stats(),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    failures = []
+    if chat["errors"]:
+        failures.append(f"오류 {chat['errors']}")
+    if args.max_p95_ms and chat["latency_ms"] and chat["latency_ms"]["p95"] > args.max_p95_ms:
+        failures.append(f"지연 p95 {chat['latency_ms']['p95']}ms > {args.max_p95_ms}ms")
+    if args.max_ttft_p95_ms and chat["ttft_ms"] and chat["ttft_ms"]["p95"] > args.max_ttft_p95_ms:
+        failures.append(f"첫 토큰 p95 {chat['ttft_ms']['p95']}ms > {args.max_ttft_p95_ms}ms")
+    for failure in failures:
+        print(f"실패: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
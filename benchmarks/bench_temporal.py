@@ -0,0 +1,103 @@
+import sys
+import time
+from datetime import datetime
+from temporal import parse_time_range
+
+# 시간 표현 파서 정확도 확인용 질문 모음 및 마이크로 벤치마크
+# 실행: python -m benchmarks.bench_temporal
+# 기준 시각: 2024-11-27(수) 15:30
+
+NOW = datetime(2024, 11, 27, 15, 30)
+
+# (질문, 기대 시작일, 기대 종료일) - 시작일이 None 이면 날짜 필터가 없어야 함, 종료일이 None 이면 열린 범위
+CORPUS = [
+    ("오늘 공지 알려줘", "2024-11-27", "2024-11-27"),
+    ("어제 올라온 공지", "2024-11-26", "2024-11-26"),
+    ("그저께 공지 뭐 있었어?", "2024-11-25", "2024-11-25"),
+    ("최근 공지사항 몇 개만 알려줘", "2024-11-20", None),
+    ("최근 공지 3개만 알려줘", "2024-11-20", None),
+    ("3개만 알려줘", None, None),
+    ("장학금 공지 알려줘", None, None),
+    ("1학기 수강신청 공지", None, None),
+    ("수강신청 3일째 안 돼", None, None),
+    ("수강신청 안내일정 알려줘", None, None),
+    ("졸업 안내일정", None, None),
+    ("장학금 지금일정 알려줘", None, None),
+    ("오늘의 공지", "2024-11-27", "2024-11-27"),
+    ("어제자 공지", "2024-11-26", "2024-11-26"),
+    ("이번 주 공지", "2024-11-24", "2024-11-30"),
+    ("이번주에 올라온 공지", "2024-11-24", "2024-11-30"),
+    ("지난주 행사 공지", "2024-11-17", "2024-11-23"),
+    ("다음 주 일정 알려줘", None, None),
+    ("내일 마감인 공지", None, None),
+    ("이번 달 공지", "2024-11-01", "2024-11-30"),
+    ("지난달 장학금 공지", "2024-10-01", "2024-10-31"),
+    ("12월 공지", "2023-12-01", "2023-12-31"),
+    ("11월 공지 정리해줘", "2024-11-01", "2024-11-30"),
+    ("11월 25일 공지", "2024-11-25", "2024-11-25"),
+    ("12월 25일 공지", "2023-12-25", "2023-12-25"),
+    ("11월 28일 공지", "2023-11-28", "2023-11-28"),
+    ("2024년 11월 25일에 올라온 공지", "2024-11-25", "2024-11-25"),
+    ("25일 공지", "2024-11-25", "2024-11-25"),
+    ("2024-11-25 공지", "2024-11-25", "2024-11-25"),
+    ("2024.11.25 공지", "2024-11-25", "2024-11-25"),
+    ("3일 전 공지", "2024-11-24", "2024-11-24"),
+    ("7일 이내 공지", "2024-11-20", "2024-11-27"),
+    ("최근 3개월 공지", "2024-08-27", "2024-11-27"),
+    ("지난 2주 동안 올라온 공지", "2024-11-13", "2024-11-27"),
+    ("총 5일 동안 진행되는 캠프", None, None),
+    ("1일 1식 이벤트", None, None),
+    ("2월 30일 공지", None, None),
+    ("1/2 확률로 당첨", None, None),
+    ("25일에 올라온 공지", "2024-11-25", "2024-11-25"),
+    ("28일에 올라온 공지", "2024-10-28", "2024-10-28"),
+    ("31일 공지", "2024-10-31", "2024-10-31"),
+    ("올해 공지", "2024-01-01", "2024-12-31"),
+    ("2023년 공지", "2023-01-01", "2023-12-31"),
+    ("today's notices", "2024-11-27", "2024-11-27"),
+    ("notices from yesterday", "2024-11-26", "2024-11-26"),
+    ("anything this week?", "2024-11-24", "2024-11-30"),
+    ("next week events", None, None),
+    ("recent notices", "2024-11-20", None),
+    ("show me the latest 3 notices", "2024-11-20", None),
+    ("notices in december", "2023-12-01", "2023-12-31"),
+    ("nov 25 notices", "2024-11-25", "2024-11-25"),
+    ("dec 25 notices", "2023-12-25", "2023-12-25"),
+    ("11/25 notice", "2024-11-25", "2024-11-25"),
+    ("11/30 notice", "2023-11-30", "2023-11-30"),
+    ("may I ask about scholarships", None, None),
+    ("notices in May", "2024-05-01", "2024-05-31"),
+    ("notices from 2 weeks ago", "2024-11-10", "2024-11-16"),
+    ("notices in the past 3 days", "2024-11-24", "2024-11-27"),
+]
+
+def _describe(time_range):
+    if time_range is None:
+        return (None, None)
+    end = time_range.end.strftime("%Y-%m-%d") if time_range.end else None
+    return (time_range.start.strftime("%Y-%m-%d"), end)
+
+def check_corpus():
+    failures = 0
+    for message, expected_start, expected_end in CORPUS:
+        actual = _describe(parse_time_range(message, now=NOW))
+        if actual != (expected_start, expected_end):
+            failures += 1
+            print(f"실패: {message!r} -> {actual}, 기대값 {(expected_start, expected_end)}")
+    print(f"정확도: {len(CORPUS) - failures}/{len(CORPUS)}")
+    return failures
+
+def benchmark(iterations=2000):
+    messages = [message for message, _, _ in CORPUS]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in messages:
+            parse_time_range(message, now=NOW)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / (iterations * len(messages)) * 1e6
+    print(f"파싱 속도: {per_call_us:.2f}µs/질문 ({iterations * len(messages)}회)")
+
+if __name__ == "__main__":
+    failures = check_corpus()
+    benchmark()
+    sys.exit(1 if failures else 0)
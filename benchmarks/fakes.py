@@ -0,0 +1,187 @@
+import asyncio
+import random
+import re
+import time
+import types
+import unicodedata
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# 오프라인 벤치마크용 가짜 백엔드 (OpenAI 채팅/임베딩, Google 번역, 공지 DB)
+# 지연 시간과 토큰 속도를 조절할 수 있고, 같은 입력에는 항상 같은 결과를 돌려줌
+
+# 글자 2-gram 을 해시해서 dimensions 차원에 더한 벡터 (비슷한 문장은 비슷한 벡터가 되어 검색 품질도 볼 수 있음)
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dimensions=256, latency_ms=0.0, model="fake-embedding"):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.model = model
+        self.calls = 0
+
+    def _vector(self, text):
+        text = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text).lower())
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for i in range(len(text) - 1):
+            bigram = text[i:i + 2]
+            if bigram.strip():
+                code = zlib.crc32(bigram.encode("utf-8"))
+                vector[code % self.dimensions] += 1.0 if code & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return self._vector(text)
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._vector(text)
+
+_TITLE = re.compile(r"Title: (.*)\nLink: (.*)")
+
+# 첫 토큰 지연(first_token_ms)과 초당 토큰 수(tokens_per_sec)로 스트리밍하는 채팅 모델
+# - 질문 재작성 프롬프트에는 마지막 질문을 그대로 돌려줌
+# - 그 외에는 프롬프트 속 공지 제목/링크로 answer_tokens 길이의 답변을 만듦
+class FakeChatModel(BaseChatModel):
+    first_token_ms: float = 300.0
+    tokens_per_sec: float = 60.0
+    answer_tokens: int = 80
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _answer(self, messages):
+        if "standalone question" in str(messages[0].content):
+            return str(messages[-1].content)
+        notices = _TITLE.findall("\n".join(str(message.content) for message in messages))
+        words = ["요청하신", "공지를", "정리했어."]
+        for title, link in notices[:3]:
+            words += ["-", title.strip(), link.strip()]
+        filler = "자세한 내용은 링크에서 확인해줘.".split()
+        while len(words) < self.answer_tokens:
+            words += filler
+        return " ".join(words)
+
+    def _tokens(self, messages):
+        self.calls += 1
+        return re.findall(r"\S+\s*", self._answer(messages))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_ms / 1000 + len(tokens) / self.tokens_per_sec)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.first_token_ms / 1000 + len(tokens) / self.tokens_per_sec)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_ms / 1000)
+        for token in self._tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(1 / self.tokens_per_sec)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for token in self._tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(1 / self.tokens_per_sec)
+
+# translation.GoogleTranslatorBackend 대신 쓰는 번역 백엔드 (문장마다 latency_ms)
+class FakeTranslatorBackend:
+    name = "fake-translator"
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def translate(self, text):
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        return f"[en] {text}"
+
+# (분류, 질문에 쓰는 표현, 제목, 본문 첫 문장)
+TOPICS = [
+    ("장학", "장학금 신청", "국가장학금 신청 안내", "국가장학금 2차 신청 기간과 제출 서류를 안내합니다. 신청은 한국장학재단 누리집에서 합니다."),
+    ("수강신청", "수강신청 정정 기간", "수강신청 일정 안내", "수강신청 기간, 장바구니, 정정 기간을 안내합니다. 학년별 신청 시간을 확인하세요."),
+    ("기숙사", "기숙사 입사 신청", "기숙사 입사 신청 안내", "생활관 입사 신청 기간과 선발 기준, 납부 방법을 안내합니다."),
+    ("졸업", "졸업 요건", "졸업 요건 및 졸업 사정 안내", "졸업 학점, 졸업 인증, 졸업 사정 일정을 확인하세요."),
+    ("취업", "채용 설명회", "채용 설명회 개최 안내", "기업 채용 설명회 일정과 참가 신청 방법을 안내합니다."),
+    ("등록", "등록금 분할 납부", "등록금 납부 안내", "등록금 납부 기간과 분할 납부 신청, 환불 기준을 안내합니다."),
+    ("행사", "축제 부스 운영", "축제 부스 운영 안내", "대동제 기간 부스 운영 신청과 안전 수칙을 안내합니다."),
+    ("휴학", "휴학 신청 서류", "휴학 및 복학 신청 안내", "휴학, 복학 신청 기간과 제출 서류, 군휴학 처리 방법을 안내합니다."),
+]
+
+DEPARTMENTS = ["컴퓨터공학부", "기계전자공학부", "IT융합공학부", "산업시스템공학부", "사회과학부", "예술학부",
+               "크리에이티브 인문학부", "글로벌패션산업학부", "ICT디자인학부", "뷰티디자인매니지먼트학과",
+               "스마트제조혁신컨설팅학과", "상상력인재학부"]
+
+# swpre 행 형식 (id, title, link, content, date)의 가짜 공지 count 건 (now 기준 최근 days 일에 고르게 분포)
+# 공지 i 는 분류 TOPICS[i % 8], 학과 DEPARTMENTS[(i // 8) % 12] 이므로 같은 분류/학과 공지는 96건마다 반복됨
+def make_notice_rows(count=300, days=60, body_sentences=12, seed=0, now=None):
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    rows = []
+    for i in range(count):
+        topic, _, title, summary = TOPICS[i % len(TOPICS)]
+        department = DEPARTMENTS[(i // len(TOPICS)) % len(DEPARTMENTS)]
+        details = [f"{department} {topic} 관련 세부 사항 {j}번 항목을 확인하세요." for j in range(body_sentences)]
+        body = " ".join([f"{department} 학생 대상 공지입니다.", summary] + details
+                        + [f"문의: {department} 행정실 (상상관 {100 + i % 400}호)"])
+        date = (now - timedelta(days=rng.uniform(0, days))).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((str(i), f"[{topic}] {department} {title}", f"https://www.hansung.ac.kr/notice/{i}", body, date))
+    return rows
+
+# login.get_recommended_notices 가 쓰는 MySQL 연결과 openai 모듈 대신 쓰는 객체
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, dictionary=False):
+        return _FakeCursor(self.rows)
+
+    def close(self):
+        pass
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return [{"title": title, "link": link, "date": date} for _, title, link, _, date in self.rows[:30]]
+
+    def close(self):
+        pass
+
+def fake_openai_module(latency_ms=800.0):
+    def create(model, messages, **kwargs):
+        time.sleep(latency_ms / 1000)
+        notices = re.findall(r"- 제목: (.*)\n\s*링크: (.*)\n\s*날짜: (.*)", messages[-1]["content"])[:3]
+        content = "\n".join(f"- 제목: {title}\n- 링크: {link}\n- 날짜: {date}" for title, link, date in notices)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+            usage=types.SimpleNamespace(total_tokens=len(messages[-1]["content"]) // 2),
+        )
+    return types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)),
+        RateLimitError=openai.RateLimitError,
+    )
@@ -0,0 +1,187 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+
+# 골든 질문 세트(질문, 정답 공지 id)로 검색 설정별 품질과 비용을 비교하는 스윕
+# - 설정: k(고정 또는 적응형), 날짜 필터, 하이브리드(BM25) 사용, MMR 재정렬, 청크 크기, 임베딩 차원
+# - 지표: recall@k, hit@k, MRR, 컨텍스트 압축 후 프롬프트 토큰, 검색 지연
+# - 청크 크기/임베딩 차원 조합마다 로컬 인덱스 스냅샷(LocalVectorStore + BM25)을 만들어 네트워크 없이 검색
+# 실행: python -m benchmarks.sweep_retrieval --min-recall 0.8 --output sweep.json
+# 기본은 가짜 공지 + 가짜 임베딩(benchmarks/fakes.py), --rows 로 swpre 행 JSON 을 주면 실제 공지로 평가
+# (--embeddings openai 는 문서 임베딩에 비용이 들고, 질문 임베딩은 캐시되어 다시 실행할 때는 호출하지 않음)
+
+# 저장소 모듈을 불러오기 전에 벤치마크용 환경 설정
+os.environ["CACHE_DIR"] = os.environ.get("BENCH_CACHE_DIR") or tempfile.mkdtemp(prefix="sweep_retrieval_")
+os.environ["TRACE_EXPORTERS"] = ""
+
+from chunking import chunk_documents
+from config import EMBEDDING_MODEL, CONTEXT_TOKEN_BUDGET, CONTEXT_DOCUMENT_TOKEN_LIMIT, ADAPTIVE_MAX_K
+from context_packing import ContextPacker
+from lexical_index import LexicalIndex
+from local_index import LocalVectorStore
+from notice_index import build_documents
+from retrieval import HybridRetriever
+from temporal import parse_time_range
+from benchmarks.fakes import FakeEmbeddings, make_notice_rows
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden_retrieval.json")
+
+def load_golden(path):
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+    golden["now"] = datetime.strptime(golden["now"], "%Y-%m-%d %H:%M:%S") if golden.get("now") else datetime.now()
+    return golden
+
+def load_rows(args, golden):
+    if args.rows:
+        with open(args.rows, encoding="utf-8") as f:
+            return [tuple(row) for row in json.load(f)]
+    corpus = golden.get("corpus", {})
+    return make_notice_rows(corpus.get("notices", 192), days=corpus.get("days", 60), seed=corpus.get("seed", 0),
+                            now=golden["now"])
+
+def make_embeddings(kind, dimensions):
+    if kind == "fake":
+        return FakeEmbeddings(dimensions=dimensions)
+    from langchain_openai import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=dimensions),
+                            model=f"{EMBEDDING_MODEL}@{dimensions}")
+
+# 청크 크기/임베딩 차원 조합 하나의 로컬 인덱스 스냅샷
+def build_index(documents, embeddings, chunk_tokens):
+    chunks = chunk_documents(documents, chunk_tokens=chunk_tokens, overlap_tokens=chunk_tokens // 6)
+    texts = [chunk.page_content for chunk in chunks]
+    store = LocalVectorStore(embeddings)
+    store.add_vectors([chunk.id for chunk in chunks], texts, [chunk.metadata for chunk in chunks],
+                      embeddings.embed_documents(texts))
+    lexical_index = LexicalIndex()
+    lexical_index.add_documents(chunks)
+    return store, lexical_index, len(chunks)
+
+def search_kwargs_for(k, date_filter):
+    if k == "adaptive":
+        search_kwargs = {"k": 3, "max_k": ADAPTIVE_MAX_K, "token_budget": CONTEXT_TOKEN_BUDGET,
+                         "document_token_limit": CONTEXT_DOCUMENT_TOKEN_LIMIT}
+    else:
+        search_kwargs = {"k": k}
+    if date_filter:
+        search_kwargs["filter"] = date_filter
+    return search_kwargs
+
+# 설정 하나로 골든 질문 전체를 검색해서 지표 계산
+def evaluate(store, lexical_index, queries, now, k, use_date_filter, hybrid, rerank, packer):
+    recalls, hits, reciprocal_ranks, tokens, latencies, returned = [], [], [], [], [], []
+    for query in queries:
+        time_range = parse_time_range(query["question"], now=now) if use_date_filter else None
+        retriever = HybridRetriever(
+            vectorstore=store, lexical_index=lexical_index, use_lexical=hybrid, use_mmr=rerank,
+            search_kwargs=search_kwargs_for(k, time_range.to_filter() if time_range else None),
+        )
+        start = time.perf_counter()
+        documents = retriever.invoke(query["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        expected = set(query["expected"])
+        ids = [str(doc.metadata.get("parent_id", doc.id)) for doc in documents]
+        recalls.append(len(expected & set(ids)) / len(expected))
+        hits.append(1.0 if expected & set(ids) else 0.0)
+        reciprocal_ranks.append(next((1 / (rank + 1) for rank, doc_id in enumerate(ids) if doc_id in expected), 0.0))
+        returned.append(len(ids))
+        tokens.append(packer.pack(query["question"], documents)[1]["tokens_after"])
+    return {
+        "recall": round(float(np.mean(recalls)), 4),
+        "hit_rate": round(float(np.mean(hits)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "documents": round(float(np.mean(returned)), 2),
+        "prompt_tokens": round(float(np.mean(tokens)), 1),
+        "latency_ms": round(float(np.mean(latencies)), 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+    }
+
+def parse_list(value, convert=str):
+    return [convert(item.strip()) for item in value.split(",") if item.strip()]
+
+def parse_switch(value):
+    return [item == "on" for item in parse_list(value)]
+
+def parse_k(item):
+    return item if item == "adaptive" else int(item)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="검색 설정별 recall / 비용 스윕")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="골든 질문 세트 JSON")
+    parser.add_argument("--rows", help="swpre 행 [id, title, link, content, date] 목록 JSON (없으면 가짜 공지)")
+    parser.add_argument("--embeddings", choices=["fake", "openai"], default="fake")
+    parser.add_argument("--k", default="1,3,5,adaptive")
+    parser.add_argument("--date-filter", default="on,off")
+    parser.add_argument("--hybrid", default="on,off")
+    parser.add_argument("--rerank", default="on,off")
+    parser.add_argument("--chunk-tokens", default="150,300,600")
+    parser.add_argument("--dimensions", default="256,1024")
+    parser.add_argument("--min-recall", type=float, default=0.8, help="추천 설정이 만족해야 하는 평균 recall")
+    parser.add_argument("--output", help="결과 JSON 파일 경로")
+    parser.add_argument("--verbose", action="store_true", help="검색 로그 출력")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    golden = load_golden(args.golden)
+    documents = build_documents(load_rows(args, golden))
+    queries = golden["queries"]
+    packer = ContextPacker(context_token_budget=CONTEXT_TOKEN_BUDGET, document_token_limit=CONTEXT_DOCUMENT_TOKEN_LIMIT)
+
+    results = []
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    for dimensions in parse_list(args.dimensions, int):
+        embeddings = make_embeddings(args.embeddings, dimensions)
+        for chunk_tokens in parse_list(args.chunk_tokens, int):
+            with log:
+                store, lexical_index, chunk_count = build_index(documents, embeddings, chunk_tokens)
+            grid = itertools.product(parse_list(args.k, parse_k), parse_switch(args.date_filter),
+                                     parse_switch(args.hybrid), parse_switch(args.rerank))
+            for k, use_date_filter, hybrid, rerank in grid:
+                with log:
+                    metrics = evaluate(store, lexical_index, queries, golden["now"], k, use_date_filter, hybrid, rerank, packer)
+                config = {"dimensions": dimensions, "chunk_tokens": chunk_tokens, "chunks": chunk_count, "k": k,
+                          "date_filter": use_date_filter, "hybrid": hybrid, "rerank": rerank}
+                results.append({"config": config, **metrics})
+                print(f"dim={dimensions:<5} chunk={chunk_tokens:<4} k={str(k):<8} "
+                      f"date={'on ' if use_date_filter else 'off'} hybrid={'on ' if hybrid else 'off'} "
+                      f"rerank={'on ' if rerank else 'off'} | recall {metrics['recall']:.3f} hit {metrics['hit_rate']:.3f} "
+                      f"mrr {metrics['mrr']:.3f} | tokens {metrics['prompt_tokens']:7.1f} "
+                      f"latency {metrics['latency_ms']:6.2f}ms (p95 {metrics['latency_p95_ms']:.2f}ms)", file=sys.stderr)
+
+    # recall 기준을 만족하는 설정 중 프롬프트 토큰, 검색 지연, 임베딩 차원 순으로 가장 싼 설정
+    qualified = [result for result in results if result["recall"] >= args.min_recall]
+    best = min(qualified, key=lambda result: (result["prompt_tokens"], result["latency_ms"],
+                                               result["config"]["dimensions"]), default=None)
+    report = {
+        "golden": {"path": args.golden, "queries": len(queries), "corpus_rows": len(documents)},
+        "embeddings": args.embeddings,
+        "min_recall": args.min_recall,
+        "recommended": best,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if best is None:
+        print(f"recall {args.min_recall} 이상인 설정이 없습니다", file=sys.stderr)
+        return 1
+    print(f"추천 설정: {best['config']} (recall {best['recall']}, 토큰 {best['prompt_tokens']}, "
+          f"지연 {best['latency_ms']}ms)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import re
+from langchain_core.documents import Document
+from token_count import count_tokens, truncate_to_tokens
+
+# 공지 본문을 토큰 크기 기준으로 겹치게 나눠 청크 단위로 임베딩/색인
+# - 청크 id 는 '<공지 id>#<청크 번호>', 메타데이터에 parent_id 와 본문 내 글자 오프셋(chunk_start, chunk_end)을 저장
+# - 검색 시에는 청크를 공지별로 묶어 제목/링크 + 매칭된 청크만 돌려줌
+
+_PIECE_BOUNDARY = re.compile(r"(?<=[.!?。])\s+|(?<=다\.)|\n+")
+_HEADER = "Title: {title}\nLink: {link}\nContent: "
+GAP_MARKER = "(중략)"
+
+# 문장/줄 단위 조각의 (시작, 끝) 글자 오프셋 (문장 부호가 없는 긴 조각은 토큰 단위로 자름)
+def _pieces(text, max_tokens):
+    pieces = []
+    start = 0
+    for match in list(_PIECE_BOUNDARY.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        while start < end:
+            piece = text[start:end]
+            if count_tokens(piece) <= max_tokens:
+                pieces.append((start, end, count_tokens(piece)))
+                break
+            head = truncate_to_tokens(piece, max_tokens) or piece[:1]
+            pieces.append((start, start + len(head), count_tokens(head)))
+            start += len(head)
+        start = match.end() if match else len(text)
+    return [(s, e, tokens) for s, e, tokens in pieces if text[s:e].strip()]
+
+# 본문을 chunk_tokens 크기로, 앞 청크와 overlap_tokens 만큼 겹치게 나눠 (시작, 끝) 오프셋 목록 반환
+def chunk_spans(text, chunk_tokens=300, overlap_tokens=50):
+    pieces = _pieces(text, chunk_tokens)
+    spans = []
+    first = 0
+    while first < len(pieces):
+        last = first
+        total = pieces[first][2]
+        while last + 1 < len(pieces) and total + pieces[last + 1][2] <= chunk_tokens:
+            last += 1
+            total += pieces[last][2]
+        spans.append((pieces[first][0], pieces[last][1]))
+        if last + 1 >= len(pieces):
+            break
+        # 다음 청크는 이번 청크 끝부분 overlap_tokens 만큼을 다시 포함해서 시작
+        next_first = last + 1
+        overlap = 0
+        while next_first - 1 > first and overlap + pieces[next_first - 1][2] <= overlap_tokens:
+            next_first -= 1
+            overlap += pieces[next_first][2]
+        first = next_first
+    return spans
+
+# 공지 문서(build_documents 결과)를 청크 문서로 변환
+def chunk_documents(documents, chunk_tokens=300, overlap_tokens=50):
+    chunks = []
+    for document in documents:
+        title = document.metadata.get("title", "")
+        link = document.metadata.get("link", "")
+        header = _HEADER.format(title=title, link=link)
+        content = document.page_content
+        body = content[len(header):] if content.startswith(header) else content
+        spans = chunk_spans(body, chunk_tokens, overlap_tokens) or [(0, len(body))]
+        for index, (start, end) in enumerate(spans):
+            metadata = {
+                **document.metadata,
+                "parent_id": document.id,
+                "chunk_index": index,
+                "chunk_start": start,
+                "chunk_end": end,
+            }
+            # 청크마다 제목/링크를 붙여 임베딩이 어느 공지의 내용인지 잃지 않도록 함
+            chunks.append(Document(id=f"{document.id}#{index}", page_content=header + body[start:end], metadata=metadata))
+    return chunks
+
+_CHUNK_FIELDS = ("chunk_index", "chunk_start", "chunk_end")
+
+# 검색된 청크를 공지별로 묶음 (공지 순서는 가장 높은 순위의 청크 기준)
+# 같은 공지의 청크는 본문 순서대로 이어 붙이고, 겹치는 부분은 오프셋으로 잘라 한 번만 넣음
+def group_chunks(documents, max_chunks_per_parent=3):
+    groups = {}
+    for document in documents:
+        parent_id = document.metadata.get("parent_id")
+        if parent_id is None:
+            groups[("document", id(document))] = [document]
+            continue
+        chunks = groups.setdefault(("parent", parent_id), [])
+        if len(chunks) < max_chunks_per_parent:
+            chunks.append(document)
+
+    grouped = []
+    for (kind, parent_id), chunks in groups.items():
+        if kind == "document":
+            grouped.append(chunks[0])
+            continue
+        chunks = sorted(chunks, key=lambda doc: doc.metadata.get("chunk_index", 0))
+        metadata = {key: value for key, value in chunks[0].metadata.items() if key not in _CHUNK_FIELDS}
+        header = _HEADER.format(title=metadata.get("title", ""), link=metadata.get("link", ""))
+        content = ""
+        previous_index = previous_end = None
+        for chunk in chunks:
+            text = chunk.page_content[len(header):] if chunk.page_content.startswith(header) else chunk.page_content
+            index, start = chunk.metadata.get("chunk_index", 0), chunk.metadata.get("chunk_start", 0)
+            if previous_index is None:
+                content = (GAP_MARKER + "\n" if index > 0 else "") + text
+            elif index != previous_index + 1:
+                content += "\n" + GAP_MARKER + "\n" + text
+            elif start < previous_end:
+                content += text[previous_end - start:]
+            else:
+                content += " " + text
+            previous_index, previous_end = index, chunk.metadata.get("chunk_end", start + len(text))
+        metadata["chunks"] = [chunk.metadata.get("chunk_index", 0) for chunk in chunks]
+        grouped.append(Document(id=str(parent_id), page_content=header + content, metadata=metadata))
+    return grouped
@@ -1,3 +1,90 @@
+import json
+import os
+
+# 벡터 DB / 모델 설정
+INDEX_NAME = 'crawled-db-ver2'
+EMBEDDING_MODEL = 'text-embedding-3-large'
+CHAT_MODEL = 'gpt-4o-mini'
+
+# 로컬 캐시 파일 저장 경로
+CACHE_DIR = os.getenv('CACHE_DIR', '.cache')
+
+# 검색 백엔드: 'pinecone' (원격) 또는 'local' (로컬 NumPy 인덱스 스냅샷)
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'pinecone')
+LOCAL_INDEX_DIR = os.path.join(CACHE_DIR, 'local_index')
+
+# 적응형 검색 개수: 질문마다 점수 분포로 1~ADAPTIVE_MAX_K 건 선택 (기간 공지 나열 질문은 LISTING_MAX_K 건까지)
+ADAPTIVE_K = os.getenv('ADAPTIVE_K', '1') == '1'
+ADAPTIVE_MAX_K = int(os.getenv('ADAPTIVE_MAX_K', '5'))
+LISTING_MAX_K = int(os.getenv('LISTING_MAX_K', '10'))
+LISTING_DOCUMENT_TOKEN_LIMIT = int(os.getenv('LISTING_DOCUMENT_TOKEN_LIMIT', '200'))
+
+# 오늘/어제/이번 주/최근 공지 요약(digests.py): 요약에 넣는 최대 공지 수 / 공지당 본문 토큰 수
+DIGEST_MAX_NOTICES = int(os.getenv('DIGEST_MAX_NOTICES', '20'))
+DIGEST_NOTICE_TOKEN_LIMIT = int(os.getenv('DIGEST_NOTICE_TOKEN_LIMIT', '120'))
+
+# FAQ 의도 매칭 신뢰도 기준 (이 값 이상이면 LLM 없이 faq_content 로 바로 답변)
+FAQ_CONFIDENCE_THRESHOLD = float(os.getenv('FAQ_CONFIDENCE_THRESHOLD', '0.75'))
+
+# 공지 본문 청크 크기 / 앞 청크와 겹치는 토큰 수 (변경 시 upload.py 로 전체 재색인)
+CHUNK_TOKENS = int(os.getenv('CHUNK_TOKENS', '300'))
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '50'))
+
+# 대화 기록 저장소 (예: 'sqlite:///.cache/chat_history.db', 'mysql+mysqlconnector://user:pw@localhost/crawled')
+# 설정하지 않으면 프로세스 메모리에 보관
+CHAT_HISTORY_URL = os.getenv('CHAT_HISTORY_URL')
+CHAT_MAX_SESSIONS = int(os.getenv('CHAT_MAX_SESSIONS', '1000'))
+CHAT_MAX_MESSAGES = int(os.getenv('CHAT_MAX_MESSAGES', '20'))
+CHAT_IDLE_TTL_SECONDS = int(os.getenv('CHAT_IDLE_TTL_SECONDS', '3600'))
+
+# 대화 기록 압축: 최근 턴 수와 체인별 대화 기록 토큰 예산
+HISTORY_KEEP_TURNS = int(os.getenv('HISTORY_KEEP_TURNS', '3'))
+CONTEXTUALIZE_HISTORY_TOKEN_BUDGET = int(os.getenv('CONTEXTUALIZE_HISTORY_TOKEN_BUDGET', '800'))
+QA_HISTORY_TOKEN_BUDGET = int(os.getenv('QA_HISTORY_TOKEN_BUDGET', '1500'))
+
+# QA 프롬프트에 넣는 검색 문서 토큰 예산 (전체 / 문서당)
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '2000'))
+CONTEXT_DOCUMENT_TOKEN_LIMIT = int(os.getenv('CONTEXT_DOCUMENT_TOKEN_LIMIT', '800'))
+
+# OpenAI 모델별 분당 요청 수(rpm) / 분당 토큰 수(tpm) 한도 (계정 등급에 맞게 JSON 으로 덮어쓰기)
+OPENAI_RATE_LIMITS = {
+    'gpt-4o-mini': {'rpm': 500, 'tpm': 200000},
+    'gpt-4o': {'rpm': 500, 'tpm': 30000},
+    'text-embedding-3-large': {'rpm': 3000, 'tpm': 1000000},
+    **json.loads(os.getenv('OPENAI_RATE_LIMITS', '{}')),
+}
+# 속도 조절 버킷은 프로세스마다 따로라서 계정 한도를 프로세스 종류별로 나눔 (합이 1 을 넘지 않게)
+# 채팅 앱(Streamlit) 몫과 업로드 스크립트(upload.py / update_upload.py) 몫
+OPENAI_CHAT_PROCESS_SHARE = float(os.getenv('OPENAI_CHAT_PROCESS_SHARE', '0.8'))
+OPENAI_BATCH_PROCESS_SHARE = float(os.getenv('OPENAI_BATCH_PROCESS_SHARE', '0.2'))
+# 채팅 앱 안에서 배치 작업(대화 요약 등)이 쓸 수 있는 한도 비율, 대기열 길이 상한
+BATCH_RATE_SHARE = float(os.getenv('BATCH_RATE_SHARE', '0.5'))
+INTERACTIVE_QUEUE_LIMIT = int(os.getenv('INTERACTIVE_QUEUE_LIMIT', '100'))
+BATCH_QUEUE_LIMIT = int(os.getenv('BATCH_QUEUE_LIMIT', '1000'))
+# 채팅 요청이 한도 대기열에서 기다릴 수 있는 최대 시간 (넘을 것으로 예상되면 바로 거절)
+CHAT_QUEUE_DEADLINE_SECONDS = float(os.getenv('CHAT_QUEUE_DEADLINE_SECONDS', '20'))
+# 호출 전 토큰 추정에 더하는 예상 답변 토큰 수 (호출 후 실제 값으로 보정)
+EXPECTED_COMPLETION_TOKENS = int(os.getenv('EXPECTED_COMPLETION_TOKENS', '500'))
+
+# 공지 크롤러(crawler.py): 호스트당 동시 연결 수, 공지 본문 작업자 수, 단계 사이 대기열 길이,
+# RSS 페이지를 한 번에 가져오는 수, 재시도 횟수와 첫 재시도 대기(초, 지수 증가 + 무작위 흔들림), 요청 시간 제한(초)
+CRAWL_CONCURRENCY_PER_HOST = int(os.getenv('CRAWL_CONCURRENCY_PER_HOST', '8'))
+CRAWL_ARTICLE_WORKERS = int(os.getenv('CRAWL_ARTICLE_WORKERS', '16'))
+CRAWL_QUEUE_SIZE = int(os.getenv('CRAWL_QUEUE_SIZE', '100'))
+CRAWL_PAGE_BATCH = int(os.getenv('CRAWL_PAGE_BATCH', '4'))
+CRAWL_RETRIES = int(os.getenv('CRAWL_RETRIES', '3'))
+CRAWL_BACKOFF_SECONDS = float(os.getenv('CRAWL_BACKOFF_SECONDS', '0.5'))
+CRAWL_TIMEOUT_SECONDS = float(os.getenv('CRAWL_TIMEOUT_SECONDS', '30'))
+# 크롤링한 공지를 swpre 에 한 번에 저장(executemany + commit)하는 행 수
+SWPRE_BATCH_SIZE = int(os.getenv('SWPRE_BATCH_SIZE', '100'))
+
+# 채팅 요청 단계별 지연 추적: 내보내기('stdout', 'otlp' 쉼표 구분, 빈 값이면 끔), 단계별 지연 분포에 남길 최근 요청 수
+TRACE_EXPORTERS = os.getenv('TRACE_EXPORTERS', 'stdout')
+TRACE_WINDOW = int(os.getenv('TRACE_WINDOW', '1000'))
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'hansung-chatbot')
+# 관리자 화면(pages/admin.py)에 접근할 수 있는 사용자 이름 (쉼표 구분)
+ADMIN_USERNAMES = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
+
 answer_examples = [
 
     {
@@ -7,4 +94,4 @@ answer_examples = [
 """
     },
     
-]
\ No newline at end of file
+]
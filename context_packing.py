@@ -0,0 +1,153 @@
+import hashlib
+import re
+import unicodedata
+from langchain_core.documents import Document
+from lexical_index import tokenize
+from token_count import count_tokens, truncate_to_tokens
+
+# 검색된 공지를 QA 프롬프트에 넣기 전에 토큰 예산에 맞게 줄이는 단계
+# - 문서마다 토큰 수를 세고, 긴 문서(OCR 텍스트가 붙은 공지 등)는 질문과 관련 있는 문단만 남김
+# - 여러 문서에 반복되는 문단(학과 안내 문구, 연락처 등)은 처음 한 번만 넣음
+# - 검색 순위대로 전체 컨텍스트 예산이 찰 때까지 채움
+
+# 맨 앞의 제목/링크 머리말만 (본문에 'Link:' 나 'Content:' 가 있어도 첫 머리말에서 멈춤)
+_HEADER_PATTERN = re.compile(r"^(Title: .*?\nLink: [^\n]*\n)Content: ?", re.S)
+_PASSAGE_BOUNDARY = re.compile(r"\n+")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。])\s+|(?<=다\.)\s*|\s{2,}")
+_NORMALIZE_PATTERN = re.compile(r"[\W_]+")
+GAP_MARKER = "(중략)"
+
+def _split_header(text):
+    match = _HEADER_PATTERN.match(text)
+    if match is None:
+        return "", text
+    return match.group(1) + "Content: ", text[match.end():]
+
+# 본문을 문단으로 나눔 (줄바꿈 없이 이어 붙은 OCR 텍스트는 문장 단위로 다시 나눔)
+def split_passages(body, max_passage_tokens=120):
+    passages = []
+    for line in _PASSAGE_BOUNDARY.split(body):
+        line = line.strip()
+        if not line:
+            continue
+        if count_tokens(line) <= max_passage_tokens:
+            passages.append(line)
+            continue
+        buffer = ""
+        for sentence in _SENTENCE_BOUNDARY.split(line):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            candidate = f"{buffer} {sentence}" if buffer else sentence
+            if buffer and count_tokens(candidate) > max_passage_tokens:
+                passages.append(buffer)
+                candidate = sentence
+            # 문장 부호가 전혀 없는 긴 문장은 토큰 단위로 자름
+            while count_tokens(candidate) > max_passage_tokens:
+                head = truncate_to_tokens(candidate, max_passage_tokens)
+                if not head:
+                    break
+                passages.append(head)
+                candidate = candidate[len(head):].strip()
+            buffer = candidate
+        if buffer:
+            passages.append(buffer)
+    return passages
+
+def _fingerprint(passage):
+    normalized = _NORMALIZE_PATTERN.sub("", unicodedata.normalize("NFKC", passage).lower())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest() if normalized else None
+
+class ContextPacker:
+    def __init__(self, context_token_budget=2000, document_token_limit=800, min_document_tokens=80,
+                 max_passage_tokens=120):
+        self.context_token_budget = context_token_budget
+        self.document_token_limit = document_token_limit
+        self.min_document_tokens = min_document_tokens
+        self.max_passage_tokens = max_passage_tokens
+
+    # 질문 토큰(글자 2-gram)과 겹치는 정도로 문단 점수를 매김 (짧은 문단이 유리하지 않도록 길이로 나누지 않음)
+    @staticmethod
+    def _score(passage, query_tokens):
+        return len(query_tokens.intersection(tokenize(passage)))
+
+    def _trim_document(self, document, query_tokens, token_limit, seen):
+        header, body = _split_header(document.page_content)
+        header_tokens = count_tokens(header)
+
+        # 앞 문서에 이미 들어간 문단과 같은 문서 안에서 반복되는 문단(OCR 중복 등)은 제외
+        passages = []
+        duplicates = 0
+        current = set()
+        for passage in split_passages(body, self.max_passage_tokens):
+            fingerprint = _fingerprint(passage)
+            if fingerprint is not None and (fingerprint in seen or fingerprint in current):
+                duplicates += 1
+                continue
+            if fingerprint is not None:
+                current.add(fingerprint)
+            passages.append((passage, fingerprint, count_tokens(passage)))
+
+        if token_limit is None and not duplicates:
+            seen.update(current)
+            return document, 0
+
+        # 관련도 높은 문단부터 (같으면 앞쪽 문단부터) 예산 안에서 고르고, 원래 순서대로 이어 붙임
+        # token_limit 이 None 이면 중복 문단만 빼고 모두 유지
+        if token_limit is None:
+            selected = list(range(len(passages)))
+        else:
+            budget = token_limit - header_tokens
+            order = sorted(range(len(passages)), key=lambda i: (-self._score(passages[i][0], query_tokens), i))
+            selected = []
+            for i in order:
+                if passages[i][2] + 1 <= budget:
+                    selected.append(i)
+                    budget -= passages[i][2] + 1
+            selected.sort()
+
+        parts = []
+        previous = -1
+        for i in selected:
+            if i != previous + 1:
+                parts.append(GAP_MARKER)
+            parts.append(passages[i][0])
+            previous = i
+            if passages[i][1] is not None:
+                seen.add(passages[i][1])
+        if passages and previous != len(passages) - 1:
+            parts.append(GAP_MARKER)
+
+        content = header + "\n".join(parts)
+        return Document(page_content=content, metadata=document.metadata, id=document.id), duplicates
+
+    # 검색 순위대로 문서를 줄여 담고, (압축된 문서 목록, 통계) 반환
+    # document_token_limit 을 주면 이번 요청만 문서당 한도를 바꿈 (공지 나열 질문 등)
+    def pack(self, query, documents, document_token_limit=None):
+        document_token_limit = document_token_limit or self.document_token_limit
+        query_tokens = set(tokenize(query))
+        seen = set()
+        packed = []
+        stats = {"documents": len(documents), "packed": 0, "tokens_before": 0, "tokens_after": 0,
+                 "duplicates_removed": 0}
+        remaining = self.context_token_budget
+
+        for document in documents:
+            original_tokens = count_tokens(document.page_content)
+            stats["tokens_before"] += original_tokens
+            token_limit = min(document_token_limit, remaining)
+            if token_limit < self.min_document_tokens:
+                continue
+            # 예산 안에 들어가는 문서도 앞 문서와 중복되는 문단은 뺌
+            trimmed, duplicates = self._trim_document(
+                document, query_tokens, None if original_tokens <= token_limit else token_limit, seen
+            )
+            tokens = count_tokens(trimmed.page_content)
+            packed.append(trimmed)
+            remaining -= tokens
+            stats["packed"] += 1
+            stats["tokens_after"] += tokens
+            stats["duplicates_removed"] += duplicates
+
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        return packed, stats
@@ -0,0 +1,286 @@
+import asyncio
+import random
+import time
+from collections import namedtuple
+from datetime import datetime
+import aiohttp
+from bs4 import BeautifulSoup as bs
+from config import (
+    CRAWL_CONCURRENCY_PER_HOST, CRAWL_ARTICLE_WORKERS, CRAWL_QUEUE_SIZE, CRAWL_PAGE_BATCH,
+    CRAWL_RETRIES, CRAWL_BACKOFF_SECONDS, CRAWL_TIMEOUT_SECONDS,
+)
+from fetch_state import content_hash
+
+# 한성대 공지 게시판 RSS 크롤러 (crawl.py / update_crawl.py / comgong_crawl.py 공통)
+# - RSS 페이지 → 공지 본문 요청 → 파싱 → DB 저장을 길이가 제한된 대기열로 이은 asyncio 파이프라인
+#   (뒤 단계가 밀리면 앞 단계가 대기열에서 기다리므로 메모리에 쌓이지 않음)
+# - 세션 하나의 연결 풀을 재사용(keep-alive)하고 호스트당 동시 연결 수를 제한
+# - 연결 오류, 시간 초과, 429/5xx 응답은 지수적으로 늘어나는 대기 + 무작위 흔들림(jitter) 후 재시도
+# - 파싱과 DB 저장은 스레드에서 실행해 이벤트 루프(다른 요청)를 막지 않음
+# - stop_paging 을 주면 RSS 페이지 하나가 조건을 만족할 때 그 뒤 페이지는 가져오지 않음 (증분 크롤링)
+# - fetch_state(FetchStateStore)를 주면 공지 본문은 조건부 요청으로 가져오고, 304 이거나 본문 해시가 같으면 저장하지 않음
+#   (요청 상태는 메모리에 모았다가 NoticeWriter 가 공지와 같은 배치로 저장)
+# - 끝나면 초당 페이지 수(RSS + 공지 본문)를 출력
+
+BASE_DOMAIN = "https://www.hansung.ac.kr"
+
+# 재시도하는 응답 코드
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# 공지 본문 HTML 에서 (본문 텍스트, 첫 이미지 URL) 추출
+def parse_article(html):
+    soup = bs(html, 'html.parser')
+    view_con_div = soup.find('div', class_='view-con')
+
+    content = ""
+    image_url = None
+    if view_con_div:
+        content = view_con_div.get_text(strip=True)
+
+        # 이미지 URL을 찾기 (content와 상관없이 이미지 URL을 추출)
+        image_tag = view_con_div.find('img')
+        if image_tag and 'src' in image_tag.attrs:
+            image_url = image_tag['src']
+    else:
+        content = "No content found"
+
+    return content, image_url
+
+# pubDate 문자열을 datetime 으로 변환 (알 수 없는 형식이면 None)
+def parse_pub_date(text):
+    for date_format in ('%Y-%m-%d %H:%M:%S.%f',      # 형식: 'YYYY-MM-DD HH:MM:SS.s'
+                        '%Y-%m-%d %H:%M:%S',         # 형식: 'YYYY-MM-DD HH:MM:SS'
+                        '%a, %d %b %Y %H:%M:%S %Z'):  # RFC 822 형식
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    return None
+
+# RSS XML 에서 공지 목록 [{"title", "link", "date"}] 추출 (상대 링크는 base_domain 기준 절대 주소로)
+def parse_rss(xml, base_domain=BASE_DOMAIN):
+    items = []
+    for article in bs(xml, 'xml').find_all('item'):
+        title = article.find('title').get_text(strip=True) if article.find('title') else "No Title"
+        link = article.find('link').get_text() if article.find('link') else "No Link"
+        pub_date = article.find('pubDate').get_text(strip=True) if article.find('pubDate') else "No Date"
+
+        date = parse_pub_date(pub_date)
+        if date is None:
+            print(f"날짜 형식 오류: {pub_date}")
+            continue
+        if link.startswith("/"):
+            link = f"{base_domain}{link}"
+        items.append({"title": title, "link": link, "date": date})
+    return items
+
+class FetchError(Exception):
+    pass
+
+# 응답 (304 Not Modified 면 text 는 None)
+Page = namedtuple("Page", ["status", "text", "etag", "last_modified"])
+
+class CrawlStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.rss_pages = 0
+        self.articles = 0
+        self.saved = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes = 0
+
+    def pages_per_sec(self):
+        elapsed = time.perf_counter() - self.start
+        return (self.rss_pages + self.articles) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"RSS {self.rss_pages}쪽, 공지 본문 {self.articles}건, 저장 {self.saved}건, 변경 없음 {self.unchanged}건, "
+                f"건너뜀 {self.skipped}건, "
+                f"재시도 {self.retries}회, 실패 {self.failures}건 | {time.perf_counter() - self.start:.1f}초, "
+                f"{self.pages_per_sec():.1f} pages/s, {self.bytes / 1e6:.1f}MB")
+
+# Retry-After 헤더(초)가 있으면 그만큼 기다림 (최대 60초)
+def _retry_after(response):
+    try:
+        return min(float(response.headers.get("Retry-After", 0)), 60.0)
+    except ValueError:
+        return 0.0
+
+class Fetcher:
+    def __init__(self, session, stats, retries=CRAWL_RETRIES, backoff_seconds=CRAWL_BACKOFF_SECONDS):
+        self.session = session
+        self.stats = stats
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+
+    async def fetch(self, url):
+        return (await self.fetch_page(url)).text
+
+    # etag / last_modified 를 주면 조건부 요청 (바뀌지 않았으면 서버가 본문 없이 304 응답)
+    async def fetch_page(self, url, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        error = None
+        for attempt in range(self.retries + 1):
+            delay = self.backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status in RETRY_STATUSES:
+                        error = f"HTTP {response.status}"
+                        delay = max(delay, _retry_after(response))
+                    elif response.status == 304:
+                        return Page(304, None, etag, last_modified)
+                    else:
+                        response.raise_for_status()
+                        body = await response.read()
+                        self.stats.bytes += len(body)
+                        return Page(response.status, body.decode(response.charset or "utf-8", errors="replace"),
+                                    response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            except aiohttp.ClientResponseError as e:
+                # 404 같은 다시 요청해도 같은 응답은 재시도하지 않음
+                raise FetchError(f"{url}: HTTP {e.status}") from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            if attempt < self.retries:
+                self.stats.retries += 1
+                await asyncio.sleep(delay)
+        raise FetchError(f"{url}: {error}")
+
+class NoticeCrawler:
+    # save(record): 공지 하나({"title", "link", "date", "content", "image"})를 저장, False 를 반환하면 건너뛴 것으로 셈
+    # accept(item): RSS 항목({"title", "link", "date"}) 중 본문을 가져올 항목만 True
+    # stop_paging(items): RSS 페이지 하나의 항목 목록을 보고 True 면 그 페이지까지만 처리
+    # fetch_state: 링크별 요청 상태 (record 에 "content_hash", "previous_hash", "etag", "last_modified" 가 더해짐)
+    def __init__(self, save, accept=None, base_domain=BASE_DOMAIN, stop_paging=None, fetch_state=None,
+                 concurrency_per_host=CRAWL_CONCURRENCY_PER_HOST, article_workers=CRAWL_ARTICLE_WORKERS,
+                 queue_size=CRAWL_QUEUE_SIZE, page_batch=CRAWL_PAGE_BATCH, retries=CRAWL_RETRIES,
+                 backoff_seconds=CRAWL_BACKOFF_SECONDS, timeout_seconds=CRAWL_TIMEOUT_SECONDS):
+        self.save = save
+        self.accept = accept
+        self.base_domain = base_domain
+        self.stop_paging = stop_paging
+        self.fetch_state = fetch_state
+        self.concurrency_per_host = concurrency_per_host
+        self.article_workers = article_workers
+        self.queue_size = queue_size
+        self.page_batch = page_batch
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.stats = CrawlStats()
+
+    async def _rss_page(self, fetcher, url):
+        try:
+            xml = await fetcher.fetch(url)
+        except FetchError as e:
+            self.stats.failures += 1
+            print(f"RSS 페이지 요청 실패: {e}")
+            return []
+        self.stats.rss_pages += 1
+        return await asyncio.to_thread(parse_rss, xml, self.base_domain)
+
+    # RSS 페이지를 page_batch 쪽씩 동시에 가져와 페이지 순서대로 본문 대기열에 넣음
+    async def _feed(self, fetcher, feed_urls, articles):
+        for start in range(0, len(feed_urls), self.page_batch):
+            batch = feed_urls[start:start + self.page_batch]
+            for page_number, items in enumerate(await asyncio.gather(*(self._rss_page(fetcher, url) for url in batch)),
+                                                start + 1):
+                for item in items:
+                    if self.accept is None or self.accept(item):
+                        await articles.put(item)
+                    else:
+                        self.stats.skipped += 1
+                if self.stop_paging and self.stop_paging(items):
+                    print(f"RSS {page_number}쪽에서 페이지 순회 중단 (남은 {len(feed_urls) - page_number}쪽 생략)")
+                    return
+
+    async def _article_worker(self, fetcher, articles, records):
+        while (item := await articles.get()) is not None:
+            state = (self.fetch_state.get(item["link"]) if self.fetch_state else None) or {}
+            try:
+                page = await fetcher.fetch_page(item["link"], state.get("etag"), state.get("last_modified"))
+                self.stats.articles += 1
+                if self.stats.articles % 100 == 0:
+                    print(f"진행: {self.stats.summary()}")
+                if page.status == 304:
+                    self.stats.unchanged += 1
+                    continue
+                content, image_url = await asyncio.to_thread(parse_article, page.text)
+            except Exception as e:
+                self.stats.failures += 1
+                print(f"공지 본문 처리 실패: {e}")
+                continue
+
+            record = {**item, "content": content, "image": image_url}
+            if self.fetch_state:
+                record.update(content_hash=content_hash(content, image_url), etag=page.etag,
+                              last_modified=page.last_modified, previous_hash=state.get("content_hash"))
+                # 본문이 그대로면 공지는 저장하지 않음 (ETag 등이 바뀌었으면 요청 상태만 갱신)
+                if record["content_hash"] == record["previous_hash"]:
+                    self.stats.unchanged += 1
+                    if (page.etag, page.last_modified) == (state.get("etag"), state.get("last_modified")):
+                        continue
+                    record["unchanged"] = True
+            await records.put(record)
+
+    # DB 저장은 작업 하나가 순서대로 처리 (DB 연결은 동시에 쓰지 않음)
+    async def _writer(self, records):
+        while (record := await records.get()) is not None:
+            if record.get("unchanged"):
+                self.fetch_state.update(record, False)
+                continue
+            saved = await asyncio.to_thread(self.save, record) is not False
+            if self.fetch_state:
+                self.fetch_state.update(record, saved)
+            if not saved:
+                self.stats.skipped += 1
+                continue
+            self.stats.saved += 1
+            print(f"제목: {record['title']}")
+            print(f"링크: {record['link']}")
+            print(f"내용: {record['content'][:100]}...")  # 내용의 앞 100자만 출력
+            print(f"이미지 URL: {record['image']}")
+            print(f"게시 날짜: {record['date']}")
+            print("-" * 40)  # 구분선 출력
+
+    async def _pipeline(self, fetcher, feed_urls, articles, records):
+        workers = [asyncio.create_task(self._article_worker(fetcher, articles, records))
+                   for _ in range(self.article_workers)]
+        try:
+            await self._feed(fetcher, feed_urls, articles)
+            for _ in workers:
+                await articles.put(None)
+            await asyncio.gather(*workers)
+            await records.put(None)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _run(self, feed_urls):
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency_per_host, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            fetcher = Fetcher(session, self.stats, self.retries, self.backoff_seconds)
+            articles = asyncio.Queue(self.queue_size)
+            records = asyncio.Queue(self.queue_size)
+            pipeline = asyncio.create_task(self._pipeline(fetcher, feed_urls, articles, records))
+            writer = asyncio.create_task(self._writer(records))
+            # 저장 중 오류가 나면 앞 단계가 대기열에서 계속 기다리지 않도록 바로 멈춤
+            done, pending = await asyncio.wait({pipeline, writer}, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                task.result()
+
+    def crawl(self, feed_urls):
+        self.stats = CrawlStats()
+        asyncio.run(self._run(list(feed_urls)))
+        print(f"크롤링 완료: {self.stats.summary()}")
+        return self.stats
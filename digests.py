@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from config import CACHE_DIR, CHAT_MODEL, DIGEST_MAX_NOTICES, DIGEST_NOTICE_TOKEN_LIMIT, EXPECTED_COMPLETION_TOKENS
+from notice_index import build_documents, source_notices
+from rate_limit import acquire, BATCH
+from temporal import keyword_range, parse_time_range, split_keyword
+from token_count import count_tokens, truncate_to_tokens
+
+# 오늘 / 어제 / 이번 주 / 최근 공지 요약 (가장 많이 들어오는 기간 공지 나열 질문용)
+# - 크롤링 후 업로드 스크립트(upload.py / update_upload.py)에서 기간별, 언어별 요약 답변을 미리 만들어 파일에 저장
+# - 기간에 속한 공지들의 지문(id, 내용)이 바뀐 기간만 다시 만듦 (새 공지가 없으면 LLM 호출 없음)
+# - 채팅 경로는 '이번 주 공지 알려줘' 같은 질문이면 검색/생성 없이 저장된 요약으로 바로 답변
+#   (날짜가 바뀌었는데 아직 다시 만들지 않은 요약은 쓰지 않고 기존 RAG 경로로 답변)
+
+DIGEST_PATH = os.path.join(CACHE_DIR, "digests.json")
+
+# 요약을 만드는 기간 (temporal 키워드 label → 한국어, 영어 이름)
+DIGEST_WINDOWS = {
+    "today": ("오늘", "today"),
+    "yesterday": ("어제", "yesterday"),
+    "this_week": ("이번 주", "this week"),
+    "recent": ("최근 일주일", "in the past week"),
+}
+DIGEST_LANGUAGES = ("한국어", "English")
+
+digest_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system",
+         "당신은 한성대학교 공지사항 챗봇입니다. 아래는 {window} 게시된 공지 목록입니다 (전체 {total}건 중 최근 {shown}건). "
+         "학생이 '{window} 공지 알려줘' 라고 물었을 때의 답변으로 정리하세요. "
+         "공지마다 제목, 게시일, 한 문장 요약, 링크를 적고 목록에 없는 내용은 지어내지 마세요. {instruction}"),
+        ("human", "{notices}"),
+    ]
+)
+
+_INSTRUCTIONS = {"한국어": "답변은 한국어로 작성하세요.", "English": "Write the answer in English."}
+_EMPTY_ANSWERS = {"한국어": "{window} 올라온 공지가 없어.", "English": "No notices were posted {window}."}
+
+# 기간 표현을 뺀 나머지가 '공지 (다/좀/몇 개) 알려줘', '공지 뭐 있어?' 같은 일반적인 표현뿐인 질문만 요약으로 답변
+_NOTICE_WORD = re.compile(r"공지|notice|announcement")
+_GENERIC_WORD = re.compile(
+    r"(?:공지사항|공지|올라온|올라왔|새로|새|나온|게시된|뭐|무슨|어떤|있어|있나|있니|있는지|있을까|있었|알려|보여|정리|"
+    r"해|줘|주세요|줄래|좀|몇|개|만|다|전부|모두|목록|리스트|들|요|거|것|중|에|의|은|는|이|가|을|를)+"
+    r"|what|which|are|is|were|was|there|any|all|the|new|posted|show|tell|list|give|me|us|please|"
+    r"notices?|announcements?|s|of|from|for|in|on"
+)
+
+# 요약으로 답할 수 있는 질문이면 기간 label 반환 (아니면 None)
+def digest_window(message):
+    time_range = parse_time_range(message)
+    if time_range is None or time_range.label not in DIGEST_WINDOWS:
+        return None
+    _, rest = split_keyword(message)
+    if not _NOTICE_WORD.search(rest):
+        return None
+    if not all(_GENERIC_WORD.fullmatch(word) for word in re.findall(r"\w+", rest)):
+        return None
+    return time_range.label
+
+def _in_range(document, condition):
+    timestamp = document.metadata["expiry_date"]
+    return timestamp >= condition["$gte"] and ("$lte" not in condition or timestamp <= condition["$lte"])
+
+# 기간 범위 + 기간에 속한 공지(id, 내용)의 지문 (새 공지가 들어오거나 날짜가 바뀌면 달라짐)
+def window_fingerprint(time_range, documents):
+    digest = hashlib.sha1(json.dumps(time_range.to_filter(), sort_keys=True).encode("utf-8"))
+    for document in sorted(documents, key=lambda document: str(document.id)):
+        digest.update(f"{document.id}\x00{document.page_content}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+# 요약 기간 전체(가장 이른 시작일 이후)에 걸치는 swpre 행
+def fetch_window_rows(cursor, now=None):
+    start = min(keyword_range(label, now).start for label in DIGEST_WINDOWS)
+    cursor.execute("SELECT id, title, link, content, date FROM swpre WHERE date >= %s", (start,))
+    return cursor.fetchall()
+
+class DigestStore:
+    def __init__(self, path=DIGEST_PATH):
+        self.path = path
+        self._digests = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    # 업로드 스크립트가 파일을 갱신하면 다음 조회 때 다시 읽음 (채팅 프로세스 재시작 불필요)
+    def load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._digests = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"공지 요약 파일을 읽을 수 없습니다: {e}")
+                    self._digests = {}
+                self._mtime = mtime
+            return self._digests
+
+    def save(self, digests):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(digests, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+    # 지금 기간과 같은 범위로 만든 요약만 반환 ({"label", "answer", "sources", "built_at"} 또는 None)
+    def get(self, label, language, now=None):
+        entry = self.load().get(label)
+        if entry is None or entry["filter"] != keyword_range(label, now).to_filter():
+            return None
+        answer = entry["answers"].get(language)
+        if not answer:
+            return None
+        return {"label": label, "answer": answer, "sources": entry["sources"], "built_at": entry["built_at"]}
+
+    def match(self, message, language, now=None):
+        label = digest_window(message)
+        return self.get(label, language, now) if label else None
+
+digest_store = DigestStore()
+
+class DigestBuilder:
+    def __init__(self, llm=None, store=None, max_notices=DIGEST_MAX_NOTICES, notice_token_limit=DIGEST_NOTICE_TOKEN_LIMIT):
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+            llm = ChatOpenAI(model=CHAT_MODEL)
+        self.chain = digest_prompt | llm | StrOutputParser()
+        self.store = store or digest_store
+        self.max_notices = max_notices
+        self.notice_token_limit = notice_token_limit
+
+    def _summarize(self, window, language, documents, total):
+        notices = "\n\n".join(
+            f"게시일: {datetime.fromtimestamp(document.metadata['expiry_date']).strftime('%Y-%m-%d')}\n"
+            f"{truncate_to_tokens(document.page_content, self.notice_token_limit)}"
+            for document in documents
+        )
+        # 요약 생성은 배치 대기열로 보내 채팅 요청이 쓸 한도를 남겨둠
+        reservation = acquire(CHAT_MODEL, count_tokens(notices) + EXPECTED_COMPLETION_TOKENS, lane=BATCH)
+        answer = self.chain.invoke({
+            "window": window, "total": total, "shown": len(documents),
+            "instruction": _INSTRUCTIONS[language], "notices": notices,
+        }).strip()
+        reservation.settle(count_tokens(notices) + count_tokens(answer))
+        return answer
+
+    # rows: 요약 기간에 걸치는 swpre 행 (fetch_window_rows), 다시 만든 기간 label 목록 반환
+    def refresh(self, rows, now=None):
+        now = now or datetime.now()
+        documents = build_documents(rows)
+        digests = dict(self.store.load())
+        rebuilt = []
+        for label, names in DIGEST_WINDOWS.items():
+            time_range = keyword_range(label, now)
+            condition = time_range.to_filter()["expiry_date"]
+            in_window = sorted((document for document in documents if _in_range(document, condition)),
+                               key=lambda document: document.metadata["expiry_date"], reverse=True)
+            fingerprint = window_fingerprint(time_range, in_window)
+            if digests.get(label, {}).get("fingerprint") == fingerprint:
+                continue
+
+            shown = in_window[:self.max_notices]
+            answers = {}
+            for language, window in zip(DIGEST_LANGUAGES, names):
+                if shown:
+                    answers[language] = self._summarize(names[0], language, shown, len(in_window))
+                else:
+                    answers[language] = _EMPTY_ANSWERS[language].format(window=window)
+            digests[label] = {
+                "filter": time_range.to_filter(),
+                "fingerprint": fingerprint,
+                "notices": len(in_window),
+                "built_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "answers": answers,
+                "sources": source_notices(shown),
+            }
+            rebuilt.append(label)
+
+        if rebuilt:
+            self.store.save(digests)
+        print(f"공지 요약: {', '.join(rebuilt) if rebuilt else '새 공지 없음 (다시 만든 기간 없음)'}")
+        return rebuilt
+
+# 업로드 후 호출: 새 공지가 들어온 기간의 요약만 다시 만듦
+def refresh_digests(rows, now=None, llm=None):
+    return DigestBuilder(llm=llm).refresh(rows, now)
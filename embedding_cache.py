@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import CACHE_DIR
+
+# 질문 정규화: 공백/대소문자/끝 문장부호 차이는 같은 질문으로 봄
+def normalize_query(text):
+    text = unicodedata.normalize("NFKC", text).strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" ?!.~")
+
+# 질문 임베딩 캐시: 메모리 LRU + SQLite 영구 저장소 (Streamlit 재시작 후에도 유지)
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model, path=None, max_memory_entries=2048, max_disk_entries=50000):
+        self.embeddings = embeddings
+        self.model = model
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _key(self, text):
+        return hashlib.sha1(f"{self.model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    # 메모리에는 float32 배열로 보관 (파이썬 float 리스트보다 약 1/8 크기), LangChain 에 돌려줄 때만 리스트로 변환
+    def _get_memory(self, key):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def _get_disk(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def _get(self, key):
+        vector = self._get_memory(key)
+        return vector if vector is not None else self._get_disk(key)
+
+    def _put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                (key, vector.tobytes(), time.time()),
+            )
+            self._db.commit()
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._prune_disk()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # 디스크 용량 제한: 오래 사용되지 않은 임베딩부터 삭제
+    def _prune_disk(self):
+        self._writes_since_prune = 0
+        count = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN "
+                "(SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self._db.commit()
+
+    def embed_query(self, text):
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is not None:
+            return vector.tolist()
+        vector = self.embeddings.embed_query(text)
+        self._put(key, vector)
+        return vector
+
+    # 메모리 캐시는 바로 확인하고, SQLite 읽기/쓰기는 스레드에서 실행해 이벤트 루프를 막지 않음
+    async def aembed_query(self, text):
+        key = self._key(text)
+        vector = self._get_memory(key)
+        if vector is None:
+            vector = await asyncio.to_thread(self._get_disk, key)
+        if vector is not None:
+            return vector.tolist()
+        vector = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self._put, key, vector)
+        return vector
+
+    # 문서 임베딩은 캐시하지 않고 그대로 전달
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_size": len(self._memory),
+            }
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+from config import CACHE_DIR
+from temporal import parse_time_range
+
+# 자주 묻는 질문(pages/chat.py 의 faq_content) 의도 매칭
+# - 키워드만으로 확실한 짧은 질문은 임베딩 없이 바로 매칭 (마이크로초 단위)
+# - 그 외에는 질문 임베딩과 미리 계산해 둔 의도 예시 임베딩의 유사도 + 키워드 가점으로 판단
+#   (질문 임베딩은 RAG 경로에서도 같은 캐시를 쓰므로 RAG 로 넘어가도 추가 호출이 없음)
+
+# 의도별 faq_content 키 (언어별), 키워드, 임베딩용 예시 질문
+FAQ_INTENTS = {
+    "campus_map": {
+        "keys": {"한국어": "🗺️ 캠퍼스맵", "English": "🗺️ Campus Map"},
+        "keywords": ["캠퍼스맵", "캠퍼스 맵", "캠퍼스 지도", "학교 지도", "교내 지도", "campus map"],
+        "examples": ["캠퍼스맵 보여줘", "학교 지도 어디서 볼 수 있어?", "건물 위치 알려줘",
+                     "Where can I see the campus map?"],
+    },
+    "cafeteria": {
+        "keys": {"한국어": "🍴 학식", "English": "🍴 Cafeteria"},
+        "keywords": ["학식", "학생식당", "학생 식당", "cafeteria", "dining hall"],
+        "examples": ["학식 운영 시간 알려줘", "학생식당 몇 시까지 해?", "학식 메뉴 뭐야",
+                     "What are the cafeteria hours?"],
+    },
+    "tuition": {
+        "keys": {"한국어": "💰 등록금", "English": "💰 Tuition"},
+        "keywords": ["등록금", "수업료", "학비", "tuition"],
+        "examples": ["등록금 얼마야?", "등록금 납부 기간 알려줘", "공대 등록금 금액",
+                     "How much is the tuition?"],
+    },
+    "facility": {
+        "keys": {"한국어": "📝 시설 예약", "English": "📝 Facility"},
+        "keywords": ["시설 예약", "시설예약", "스터디룸", "세미나실", "상상베이스", "면접실",
+                     "facility reservation", "study room"],
+        "examples": ["스터디룸 예약 어떻게 해?", "세미나실 빌리고 싶어", "3D 프린터 어디서 써?",
+                     "How do I reserve a study room?"],
+    },
+}
+
+# 공지 검색이 필요한 질문으로 보이는 표현 (키워드만으로 바로 답하지 않음)
+_NOTICE_CUES = re.compile(r"공지|장학|마감|환불|분할|휴학|복학|notice|deadline|scholarship|refund")
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text).lower()).strip()
+
+class FaqIntentMatcher:
+    def __init__(self, embedding, intents=FAQ_INTENTS, threshold=0.75, keyword_bonus=0.15,
+                 max_keyword_only_chars=30, path=None):
+        self.embedding = embedding
+        self.intents = intents
+        self.threshold = threshold
+        self.keyword_bonus = keyword_bonus
+        self.max_keyword_only_chars = max_keyword_only_chars
+        self._path = path or os.path.join(CACHE_DIR, "faq_intents.npz")
+        self._intent_ids = None
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    def _fingerprint(self):
+        examples = {intent_id: intent["examples"] for intent_id, intent in self.intents.items()}
+        model = getattr(self.embedding, "model", "")
+        return hashlib.sha1(json.dumps([model, examples], ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # 의도 예시 임베딩 (예시가 바뀌지 않으면 파일에서 읽어 재시작 후에도 호출 없음)
+    # 첫 질문들이 동시에 들어와도 한 번만 계산/저장하도록 잠금
+    def _load_vectors(self):
+        if self._vectors is not None:
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._load_vectors_locked()
+
+    def _load_vectors_locked(self):
+        fingerprint = self._fingerprint()
+        try:
+            data = np.load(self._path)
+            if str(data["fingerprint"]) == fingerprint:
+                self._intent_ids, self._vectors = list(data["intent_ids"]), data["vectors"]
+                return
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+        intent_ids = [intent_id for intent_id, intent in self.intents.items() for _ in intent["examples"]]
+        examples = [example for intent in self.intents.values() for example in intent["examples"]]
+        vectors = np.asarray(self.embedding.embed_documents(examples), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        with open(self._path + ".tmp", "wb") as f:
+            np.savez(f, fingerprint=fingerprint, intent_ids=np.array(intent_ids), vectors=vectors)
+        os.replace(self._path + ".tmp", self._path)
+        self._intent_ids, self._vectors = intent_ids, vectors
+
+    def _keyword_hits(self, text):
+        return [intent_id for intent_id, intent in self.intents.items()
+                if any(keyword in text for keyword in intent["keywords"])]
+
+    # (의도 id, 신뢰도, 판단 방식) 반환, 확신할 수 없으면 None
+    def match(self, question):
+        start = time.perf_counter()
+        text = _normalize(question)
+        hits = self._keyword_hits(text)
+
+        # 짧고 한 가지 의도만 가리키며 공지/날짜 표현이 없는 질문은 키워드만으로 판단
+        if (len(hits) == 1 and len(text) <= self.max_keyword_only_chars
+                and not _NOTICE_CUES.search(text) and parse_time_range(text) is None):
+            result = (hits[0], 1.0, "keyword")
+        else:
+            self._load_vectors()
+            query = np.asarray(self.embedding.embed_query(question), dtype=np.float32)
+            similarities = self._vectors @ (query / (np.linalg.norm(query) or 1.0))
+            scores = {}
+            for intent_id, similarity in zip(self._intent_ids, similarities):
+                scores[intent_id] = max(scores.get(intent_id, -1.0), float(similarity))
+            for intent_id in hits:
+                scores[intent_id] += self.keyword_bonus
+            intent_id = max(scores, key=scores.get)
+            result = (intent_id, scores[intent_id], "embedding")
+
+        print(f"FAQ 의도 매칭: {result[0]} ({result[2]}, 신뢰도 {result[1]:.2f}), "
+              f"{(time.perf_counter() - start) * 1e6:.0f}µs")
+        if result[1] < self.threshold:
+            return None
+        return result
+
+    def faq_key(self, intent_id, language):
+        return self.intents[intent_id]["keys"].get(language)
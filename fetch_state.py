@@ -0,0 +1,111 @@
+import hashlib
+from datetime import datetime
+
+# 공지 링크별 마지막 요청 상태 (ETag, Last-Modified, 본문 해시)
+# - 다시 크롤링할 때 조건부 요청(If-None-Match / If-Modified-Since)을 보내고, 304 이거나 본문 해시가 같으면
+#   파싱 이후 작업과 DB 저장을 건너뜀
+# - 새로 들어왔거나 본문이 바뀐 공지는 ocr_pending / embed_pending 으로 표시해서
+#   update_ocrmac.py (OCR) 와 update_upload.py (임베딩) 가 그 공지만 처리함
+# - link_hash 는 MySQL 의 SHA2(link, 256) 과 같은 값으로 swpre.link_hash (고유 인덱스)와 조인
+
+CREATE_FETCH_STATE_QUERY = """
+CREATE TABLE IF NOT EXISTS swpre_fetch_state (
+    link_hash CHAR(64) PRIMARY KEY,
+    link TEXT,
+    etag VARCHAR(255),
+    last_modified VARCHAR(64),
+    content_hash CHAR(64),
+    checked_at DATETIME,
+    changed_at DATETIME,
+    ocr_pending TINYINT NOT NULL DEFAULT 0,
+    embed_pending TINYINT NOT NULL DEFAULT 0
+)
+"""
+
+UPSERT_FETCH_STATE_QUERY = """
+INSERT INTO swpre_fetch_state
+    (link_hash, link, etag, last_modified, content_hash, checked_at, ocr_pending, embed_pending)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    etag = VALUES(etag), last_modified = VALUES(last_modified), content_hash = VALUES(content_hash),
+    checked_at = VALUES(checked_at),
+    ocr_pending = ocr_pending OR VALUES(ocr_pending), embed_pending = embed_pending OR VALUES(embed_pending)
+"""
+
+def link_hash(link):
+    return hashlib.sha256(link.encode("utf-8")).hexdigest()
+
+# 파싱한 본문과 이미지 URL 의 해시 (HTML 전체가 아니라서 조회수 같은 값이 바뀌어도 같음)
+def content_hash(content, image_url):
+    return hashlib.sha256(f"{content}\x00{image_url or ''}".encode("utf-8")).hexdigest()
+
+# 처리할 공지 조회 (pending: 'ocr_pending' 또는 'embed_pending', columns: swpre 열 목록)
+# (행 목록, 조회 시각) 반환, 조회 시각은 처리 후 clear_pending 에 그대로 넘김
+# (changed_at 과 같은 DB 시계로 비교하도록 조회 시각도 DB 의 NOW())
+def select_pending(cursor, pending, columns):
+    cursor.execute(CREATE_FETCH_STATE_QUERY)
+    cursor.execute("SELECT NOW()")
+    selected_at = cursor.fetchone()[0]
+    cursor.execute(f"""
+        SELECT {', '.join(f's.{column}' for column in columns)} FROM swpre s
+        JOIN swpre_fetch_state f ON f.link_hash = s.link_hash
+        WHERE f.{pending} = 1
+    """)
+    return cursor.fetchall(), selected_at
+
+# 처리가 끝난 공지의 표시를 지움
+# 조회 이후에 크롤링이 다시 바뀌었다고 표시한 공지(changed_at 이 조회 시각 이후)는 남겨서 다음 실행 때 다시 처리
+# (NOW() 는 초 단위이므로 조회 시각과 같은 초에 바뀐 공지도 남김)
+def clear_pending(db, pending, links, selected_at, batch_size=500):
+    links = list(links)
+    selected_at = selected_at.replace(microsecond=0)
+    cursor = db.cursor()
+    for start in range(0, len(links), batch_size):
+        hashes = [link_hash(link) for link in links[start:start + batch_size]]
+        cursor.execute(f"UPDATE swpre_fetch_state SET {pending} = 0 "
+                       f"WHERE link_hash IN ({', '.join(['%s'] * len(hashes))}) AND changed_at < %s",
+                       [*hashes, selected_at])
+    db.commit()
+    cursor.close()
+
+class FetchStateStore:
+    def __init__(self, db):
+        self.cursor = db.cursor()
+        self.cursor.execute(CREATE_FETCH_STATE_QUERY)
+        self._states = {}
+        self._buffer = []
+        self._changed = []
+
+    # 크롤링 전에 전체 상태를 한 번에 읽음 (크롤링 중 조회는 메모리에서, DB 연결은 저장 단계만 사용)
+    def load(self):
+        self.cursor.execute("SELECT link_hash, etag, last_modified, content_hash FROM swpre_fetch_state")
+        self._states = {row[0]: {"etag": row[1], "last_modified": row[2], "content_hash": row[3]}
+                        for row in self.cursor.fetchall()}
+        return self
+
+    def get(self, link):
+        return self._states.get(link_hash(link))
+
+    # 요청 결과 기록 (changed 면 OCR / 임베딩 대상으로 표시), DB 에는 flush 때 한 번에 저장
+    def update(self, record, changed):
+        key = link_hash(record["link"])
+        self._buffer.append((key, record["link"], record.get("etag"), record.get("last_modified"), record["content_hash"],
+                             datetime.now(), int(changed), int(changed)))
+        if changed:
+            self._changed.append(key)
+        self._states[key] = {"etag": record.get("etag"), "last_modified": record.get("last_modified"),
+                             "content_hash": record["content_hash"]}
+
+    # 모아 둔 요청 상태를 저장 (commit 은 호출한 쪽에서 바로 이어서, 저장한 행 수 반환)
+    # changed_at 은 버퍼에 넣은 시각이 아니라 DB 에 쓰는 시각(NOW())으로 기록해야
+    # 그 사이에 실행된 select_pending 의 조회 시각보다 뒤가 되어 clear_pending 이 이 표시를 지우지 않음
+    def flush(self, batch_size=500):
+        rows, self._buffer = self._buffer, []
+        changed, self._changed = self._changed, []
+        if rows:
+            self.cursor.executemany(UPSERT_FETCH_STATE_QUERY, rows)
+        for start in range(0, len(changed), batch_size):
+            keys = changed[start:start + batch_size]
+            self.cursor.execute(f"UPDATE swpre_fetch_state SET changed_at = NOW() "
+                                f"WHERE link_hash IN ({', '.join(['%s'] * len(keys))})", keys)
+        return len(rows)
@@ -0,0 +1,78 @@
+import asyncio
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from token_count import count_message_tokens, truncate_to_tokens
+
+# 대화 기록 압축
+# - 최근 keep_turns 턴은 그대로 두고, 그 이전 대화는 기록 맨 앞의 요약 메시지 하나로 접어 넣음
+# - 요약은 매번 새로 만들지 않고 (이전 요약 + 새로 접히는 대화) 만으로 갱신함
+# - 프롬프트에 넣을 때는 체인별 토큰 예산에 맞춰 오래된 턴부터 뺌
+
+SUMMARY_PREFIX = "이전 대화 요약: "
+
+summary_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system",
+         "당신은 학생과 한성대학교 공지사항 챗봇의 대화를 요약합니다. "
+         "기존 요약과 새로 추가된 대화를 합쳐 요약을 갱신하세요. "
+         "이후 질문을 이해하는 데 필요한 정보(언급된 공지 제목, 날짜, 링크, 학생의 관심사)는 유지하고 "
+         "5문장 이내로 작성하세요."),
+        ("human", "기존 요약:\n{summary}\n\n새로 추가된 대화:\n{conversation}"),
+    ]
+)
+
+def is_summary_message(message):
+    return isinstance(message, SystemMessage) and message.content.startswith(SUMMARY_PREFIX)
+
+def split_summary(messages):
+    if messages and is_summary_message(messages[0]):
+        return messages[0], list(messages[1:])
+    return None, list(messages)
+
+def _format_conversation(messages):
+    return "\n".join(f"{'학생' if message.type == 'human' else '챗봇'}: {message.content}" for message in messages)
+
+# 토큰 예산 안에 들어오도록 요약 메시지 + 최근 턴만 남김 (오래된 턴부터 질문/답변 쌍 단위로 제외)
+def fit_history_to_budget(messages, token_budget):
+    summary, turns = split_summary(messages)
+    prefix = [summary] if summary else []
+    while turns and count_message_tokens(prefix + turns) > token_budget:
+        turns = turns[2:]
+    if prefix and count_message_tokens(prefix) > token_budget:
+        prefix = [SystemMessage(content=truncate_to_tokens(summary.content, max(token_budget - 4, 0)))]
+    return prefix + turns
+
+class HistoryCompactor:
+    def __init__(self, llm, keep_turns=3, fold_batch_turns=3, summary_token_limit=400):
+        self.keep_turns = keep_turns
+        self.fold_batch_turns = fold_batch_turns
+        self.summary_token_limit = summary_token_limit
+        self.summary_chain = summary_prompt | llm | StrOutputParser()
+
+    # 접어야 할 턴이 fold_batch_turns 만큼 쌓였을 때만 요약 LLM 을 호출함 (매 턴 호출 방지)
+    def needs_compaction(self, messages):
+        _, turns = split_summary(messages)
+        return len(turns) > 2 * (self.keep_turns + self.fold_batch_turns)
+
+    async def acompact(self, history):
+        messages = await history.aget_messages()
+        if not self.needs_compaction(messages):
+            return False
+
+        summary, turns = split_summary(messages)
+        folded = turns[:len(turns) - 2 * self.keep_turns]
+        new_summary = await self.summary_chain.ainvoke({
+            "summary": summary.content[len(SUMMARY_PREFIX):] if summary else "(없음)",
+            "conversation": _format_conversation(folded),
+        })
+        new_summary = truncate_to_tokens(new_summary.strip(), self.summary_token_limit)
+
+        # 접은 부분(기존 요약 + 접은 턴)만 새 요약으로 한 번에 교체 (요약하는 동안 추가된 메시지는 그대로 유지)
+        prefix = ([summary] if summary else []) + folded
+        if not await asyncio.to_thread(history.replace_prefix, prefix, [SystemMessage(content=SUMMARY_PREFIX + new_summary)]):
+            return False
+        compacted = await history.aget_messages()
+        print(f"대화 기록 압축: 메시지 {len(prefix)}개 → 요약 1개, "
+              f"현재 {len(compacted)}개 ({count_message_tokens(compacted)} 토큰)")
+        return True
@@ -0,0 +1,164 @@
+import math
+import os
+import pickle
+import re
+import threading
+import unicodedata
+from collections import Counter
+from langchain_core.documents import Document
+from config import CACHE_DIR
+
+LEXICAL_INDEX_PATH = os.path.join(CACHE_DIR, "lexical_index.pkl")
+
+_WORD_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL_PATTERN = re.compile(r"[가-힣]+")
+
+# 한국어는 띄어쓰기/조사 변형이 많아 글자 2-gram 단위로, 영문/숫자는 단어 단위로 토큰화
+# ("프로그래밍캠프", "프로그래밍 캠프에" 가 같은 토큰들을 공유하도록)
+def tokenize(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for word in _WORD_PATTERN.findall(text):
+        if _HANGUL_PATTERN.fullmatch(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+# 메타데이터가 Pinecone 스타일 필터 ({"expiry_date": {"$gte": .., "$lte": ..}})를 만족하는지 확인
+def matches_filter(metadata, filter):
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if value is None:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$eq" and not value == operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+# 공지 제목/본문에 대한 BM25 역색인 (업로드 시 증분 갱신, 파일로 저장)
+# 역색인/문서/전체 길이는 (postings, docs, total_length) 튜플 하나로 들고 있어서, 다시 읽을 때 참조 하나만 바꾸면
+# 검색 중인 스레드는 옛 색인이나 새 색인 중 하나만 온전히 봄
+class LexicalIndex:
+    def __init__(self, k1=1.2, b=0.75, path=None):
+        self.k1 = k1
+        self.b = b
+        self._path = path
+        self._loaded_mtime = None
+        self._reload_lock = threading.Lock()
+        self._state = ({}, {}, 0)
+
+    def __len__(self):
+        return len(self._state[1])
+
+    # 제목은 본문보다 가중치를 두기 위해 두 번 색인
+    def _document_terms(self, document):
+        title = document.metadata.get("title", "")
+        return Counter(tokenize(f"{title} {title} {document.page_content}"))
+
+    # 문서 추가 (같은 id가 있으면 교체)
+    def add_documents(self, documents):
+        for document in documents:
+            self._remove(document.id)
+            postings, docs, total_length = self._state
+            terms = self._document_terms(document)
+            length = sum(terms.values())
+            docs[document.id] = (terms, length, document.metadata, document.page_content)
+            for term, tf in terms.items():
+                postings.setdefault(term, {})[document.id] = tf
+            self._state = (postings, docs, total_length + length)
+
+    # 공지 단위로 삭제 (청크 문서와 청크로 나누기 전의 공지 문서 모두)
+    def delete_parents(self, parent_ids):
+        parent_ids = set(parent_ids)
+        stale = [doc_id for doc_id, entry in self._state[1].items()
+                 if doc_id in parent_ids or entry[2].get("parent_id") in parent_ids]
+        for doc_id in stale:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        postings, docs, total_length = self._state
+        entry = docs.pop(doc_id, None)
+        if entry is None:
+            return
+        terms, length, _, _ = entry
+        for term in terms:
+            term_postings = postings.get(term)
+            if term_postings is not None:
+                term_postings.pop(doc_id, None)
+                if not term_postings:
+                    del postings[term]
+        self._state = (postings, docs, total_length - length)
+
+    def search(self, query, k=4, filter=None):
+        self._reload_if_stale()
+        all_postings, docs, total_length = self._state
+        if not docs:
+            return []
+        n_docs = len(docs)
+        avg_length = total_length / n_docs
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = all_postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                length = docs[doc_id][1]
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+
+        results = []
+        for doc_id, score in scores.most_common():
+            _, _, metadata, text = docs[doc_id]
+            if not matches_filter(metadata, filter):
+                continue
+            results.append((Document(id=doc_id, page_content=text, metadata=dict(metadata)), score))
+            if len(results) >= k:
+                break
+        return results
+
+    def save(self, path=LEXICAL_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self._state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path=LEXICAL_INDEX_PATH):
+        index = cls(path=path)
+        index._reload_if_stale()
+        return index
+
+    # 업로드 스크립트가 색인을 갱신하면 다음 검색 때 다시 읽어옴 (동시에 알아챈 검색 스레드 중 한 스레드만 읽음)
+    def _reload_if_stale(self):
+        if self._path is None:
+            return
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with self._reload_lock:
+            if mtime == self._loaded_mtime:
+                return
+            with open(self._path, "rb") as f:
+                postings, docs, total_length = pickle.load(f)
+            self._state = (postings, docs, total_length)
+            self._loaded_mtime = mtime
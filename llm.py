@@ -1,219 +1,499 @@
 import asyncio
+import inspect
+import openai
+from contextlib import contextmanager
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
-from deep_translator import GoogleTranslator
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from datetime import datetime, timedelta
-import re
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import ConfigurableField
+from datetime import datetime
+from config import (
+    INDEX_NAME, EMBEDDING_MODEL, CHAT_MODEL, VECTOR_BACKEND, LOCAL_INDEX_DIR,
+    CHAT_HISTORY_URL, CHAT_MAX_SESSIONS, CHAT_MAX_MESSAGES, CHAT_IDLE_TTL_SECONDS,
+    HISTORY_KEEP_TURNS, CONTEXTUALIZE_HISTORY_TOKEN_BUDGET, QA_HISTORY_TOKEN_BUDGET,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_DOCUMENT_TOKEN_LIMIT, ADAPTIVE_K, ADAPTIVE_MAX_K, LISTING_MAX_K,
+    LISTING_DOCUMENT_TOKEN_LIMIT, FAQ_CONFIDENCE_THRESHOLD, CHAT_QUEUE_DEADLINE_SECONDS, EXPECTED_COMPLETION_TOKENS,
+)
+from answer_cache import AnswerCache, date_filter_key, replay_stream
+from embedding_cache import CachedEmbeddings, normalize_query
+from local_index import LocalVectorStore
+from lexical_index import LexicalIndex, LEXICAL_INDEX_PATH
+from retrieval import HybridRetriever, is_listing_query
+from temporal import parse_time_range
+from translation import GoogleTranslatorBackend, StreamingTranslator
+from session_store import create_session_store
+from history_compaction import HistoryCompactor, fit_history_to_budget
+from token_count import count_message_tokens, count_tokens
+from context_packing import ContextPacker
+from faq_intent import FaqIntentMatcher
+from singleflight import SingleFlight
+from notice_index import source_notices
+from digests import digest_store
+from tracing import Trace, activate, record_stage
+from rate_limit import GovernedEmbeddings, aacquire, get_governor, INTERACTIVE, BATCH
+import threading
+import time
 
-# 세션 저장소 및 현재 날짜 설정
-store = {}
+# 세션 저장소 및 현재 날짜 설정 (세션 수/메시지 수 상한, 유휴 세션 삭제)
+session_store = create_session_store(
+    CHAT_HISTORY_URL,
+    max_sessions=CHAT_MAX_SESSIONS,
+    max_messages=CHAT_MAX_MESSAGES,
+    idle_ttl_seconds=CHAT_IDLE_TTL_SECONDS,
+)
 current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 print(f"현재 날짜 및 시간: {current_date}")
 
 # 세션 히스토리 관리
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
+    return session_store.get(session_id)
 
 # 타임스탬프 값을 보기쉽게 변환함
 def format_timestamp_to_date(timestamp):
     return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
+# 질문 속 시간 표현을 게시일(expiry_date) 필터로 변환
 def get_date_filter(user_message):
-    today = datetime.now()
-    current_year = today.year
-    current_month = today.month
-
-    # 정규식: "11월 25일", "25일" 같은 표현을 포착
-    match = re.search(r"(?:(\d{4})[년\s\-\.]?)?\s*(?:(\d{1,2})[월\s\-\.]?)?\s*(\d{1,2})[일]?", user_message)
-    
-    # '오늘' 처리
-    if "오늘" in user_message or "today" in user_message :
-        start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1) - timedelta(seconds=1)
-        date_filter = {"expiry_date": {"$gte": int(start_of_day.timestamp()), "$lte": int(end_of_day.timestamp())}}
-        print(f"\n오늘 표현 필터 : {date_filter}")
-        print(f"오늘 시작 : {format_timestamp_to_date(int(start_of_day.timestamp()))}, "
-              f"오늘 종료 : {format_timestamp_to_date(int(end_of_day.timestamp()))}")
-        return date_filter
-    
-    # '어제' 처리
-    elif "어제" in user_message or "yesterday" in user_message :
-        start_of_yesterday = (today - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_yesterday = start_of_yesterday + timedelta(days=1) - timedelta(seconds=1)
-        date_filter = {"expiry_date": {"$gte": int(start_of_yesterday.timestamp()), "$lte": int(end_of_yesterday.timestamp())}}
-        print(f"\n어제 표현 필터 : {date_filter}")
-        print(f"어제 시작 : {format_timestamp_to_date(int(start_of_yesterday.timestamp()))}, "
-              f"어제 종료 : {format_timestamp_to_date(int(end_of_yesterday.timestamp()))}")
-        return date_filter
-
-    # 정규식: "11월 25일", "25일" 같은 표현을 정확히 매칭
-    match = re.search(r"(?:(\d{4})[년\s\-\.]?)?\s*(?:(\d{1,2})[월\s\-\.]?)?\s*(\d{1,2})[일]?", user_message)
-
-    if match:
-        try:
-            # 연도, 월, 일 추출 및 기본값 설정
-            year = int(match.group(1)) if match.group(1) else current_year
-            month = int(match.group(2)) if match.group(2) else current_month
-            day = int(match.group(3))
-
-            # 날짜 유효성 검사 및 처리
-            specific_date = datetime(year, month, day)
-
-            # 타임스탬프 계산
-            start_of_day = specific_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_day = start_of_day + timedelta(days=1) - timedelta(seconds=1)
-
-            date_filter = {
-                "expiry_date": {
-                    "$gte": int(start_of_day.timestamp()),
-                    "$lte": int(end_of_day.timestamp())
-                }
-            }
-            print(f"\n사용자 입력 날짜: {specific_date.strftime('%Y-%m-%d')}")
-            print(f"날짜 지정 필터: {date_filter}")
-            return date_filter
-
-        except ValueError:
-            print("날짜 계산 중 오류 발생: 유효하지 않은 날짜입니다.")
-            
-    # 이외의 질문 처리: 기본적으로 "" 필터 사용
-    elif "최근" in user_message or "최신" in user_message or "recent" in user_message or "latest" in user_message:
-        start_date = today - timedelta(days=7)
-        date_filter = {"expiry_date": {"$gte": int(start_date.timestamp())}}
-        print(f"\n최근 공지 필터 : {date_filter}")
-        return date_filter
-    
-    elif "이번 주" in user_message or "이번주" in user_message or "this week" in user_message:
-        # 이번 주의 시작일 (일요일)
-        start_of_week = today - timedelta(days=today.weekday() + 1)  # 일요일로 이동
-        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        # 이번 주의 끝일 (토요일)
-        end_of_week = start_of_week + timedelta(days=6) + timedelta(hours=23, minutes=59, seconds=59)
-
-        date_filter = {"expiry_date": {"$gte": int(start_of_week.timestamp()), "$lte": int(end_of_week.timestamp())}}
-        print(f"\n이번 주 표현 필터 : {date_filter}")
-        print(f"이번 주 시작 : {format_timestamp_to_date(int(start_of_week.timestamp()))}, "
-              f"이번 주 종료 : {format_timestamp_to_date(int(end_of_week.timestamp()))}")
-        return date_filter
-
-# 임베딩 및 Pinecone 검색 설정
-def get_retriever(user_message):
-    
-    embedding = OpenAIEmbeddings(model='text-embedding-3-large')
-    index_name = 'crawled-db-ver2'
-    database = PineconeVectorStore.from_existing_index(index_name=index_name, embedding=embedding)
-
-    # 날짜 필터 적용
-    date_filter = get_date_filter(user_message)
+    time_range = parse_time_range(user_message)
+    if time_range is None:
+        return None
+
+    date_filter = time_range.to_filter()
+    condition = date_filter["expiry_date"]
+    print(f"\n날짜 표현 필터 ({time_range.label}) : {date_filter}")
+    print(f"필터 시작 : {format_timestamp_to_date(condition['$gte'])}, "
+          f"필터 종료 : {format_timestamp_to_date(condition['$lte']) if '$lte' in condition else '현재'}")
+    return date_filter
+
+# 검색 설정 (질문마다 달라지는 날짜 필터와 검색 개수 적용)
+def get_search_kwargs(date_filter, listing=False):
     search_kwargs = {"k": 3}  # 기본 검색 설정
     if date_filter:
         search_kwargs["filter"] = date_filter  # 날짜 필터 추가
-    
-    retriever = database.as_retriever(search_kwargs=search_kwargs)
-    return retriever
+    if ADAPTIVE_K:
+        # 점수 분포로 개수를 정하고, 컨텍스트 토큰 예산을 넘지 않게 자름
+        search_kwargs.update(max_k=ADAPTIVE_MAX_K, token_budget=CONTEXT_TOKEN_BUDGET,
+                             document_token_limit=CONTEXT_DOCUMENT_TOKEN_LIMIT)
+        if date_filter and listing:
+            # 기간 공지 나열 질문은 점수가 고르게 낮으므로 급락 기준 없이 더 많이 담고, 공지마다 앞부분만 넣음
+            search_kwargs.update(max_k=LISTING_MAX_K, min_k=3, min_similarity=0.1, score_cliff=1.0,
+                                 document_token_limit=LISTING_DOCUMENT_TOKEN_LIMIT)
+    return search_kwargs
 
 # LLM 모델 설정
-def get_llm(model='gpt-4o-mini'):
+def get_llm(model=CHAT_MODEL):
 
     llm_cache = ChatOpenAI(model=model)
     return llm_cache
 
-# 히스토리 인식 검색기 생성
-def get_history_retriever(user_message):
-    llm = get_llm()
-    retriever = get_retriever(user_message)
-    
-    contextualize_q_system_prompt = (
-        "Given a chat history and the latest user question "
-        "which might reference context in the chat history, "
-        "formulate a standalone question which can be understood "
-        "without the chat history. Do NOT answer the question, "
-        "just reformulate it if needed and otherwise return it as is"
-    )
-    
-    contextualize_q_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", contextualize_q_system_prompt),
-            MessagesPlaceholder("chat_history"),
-            ("human", "{input}"),
-        ]
-    )
-    
-    history_aware_retriever = create_history_aware_retriever(
-        llm, retriever, contextualize_q_prompt
-    )
-    return history_aware_retriever
-
-# RAG 체인 생성
-def get_rag_chain(user_message):
-    llm = get_llm()
-    history_aware_retriever = get_history_retriever(user_message)
-    # 시스템 프롬프트 설정
-    system_prompt = (
-        f"오늘 날짜는 {current_date}입니다. "
-        "당신의 이름은 상상부기이고, 학생들에게 한성대학교 공지사항을 요약해주는 챗봇입니다. 학생에게 친근한 말투로, 반말모드로 답변해주세요."
-        "답변 시 URL 링크를 포함해 주세요."
-    )
-
-    # QA 프롬프트 생성 (context 변수 추가)
-    qa_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            MessagesPlaceholder("chat_history"),
-            ("human", "{input}"),
-            ("ai", "{context}"),
-        ]
-    )
-
-    # 문서 결합 체인 생성
-    question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
-
-    # RAG 체인 생성
-    rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
-
-    # 대화형 RAG 체인 생성
-    conversational_rag_chain = RunnableWithMessageHistory(
-        rag_chain,
-        get_session_history,
-        input_messages_key="input",
-        history_messages_key="chat_history",
-        output_messages_key="answer",
-    ).pick('answer')
-
-    return conversational_rag_chain
-
-# AI 응답 생성
-def get_ai_response(user_message, language="한국어"):
-
-    rag_chain = get_rag_chain(user_message)
-
-    ai_response_stream = rag_chain.stream(
-        {"input": user_message},
-        config={"configurable": {"session_id": "abc123"}}
-    )
-
-    if language == "English":
-        def translated_stream():
-            translator = GoogleTranslator(source="ko", target="en")
-            buffer = ""
-            for chunk in ai_response_stream:
-                buffer += chunk
-                if len(buffer) > 100:
-                    yield translator.translate(buffer)
-                    buffer = ""
-            if buffer:
-                yield translator.translate(buffer)
-        return translated_stream()
-
-    return ai_response_stream
+# RAG 파이프라인: 임베딩/벡터DB/LLM 클라이언트와 프롬프트를 프로세스당 한 번만 생성해 재사용함
+# (embeddings, llm, translator_backend 를 넘기면 OpenAI/Google 대신 사용 - 오프라인 벤치마크용)
+class RagPipeline:
+    def __init__(self, embeddings=None, llm=None, translator_backend=None):
+        # 반복 질문의 임베딩은 캐시에서 바로 반환 (OpenAI 호출 생략, 캐시에 없을 때만 한도 대기열을 거침)
+        self.embedding = CachedEmbeddings(
+            GovernedEmbeddings(embeddings or OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL,
+                               deadline=CHAT_QUEUE_DEADLINE_SECONDS),
+            model=EMBEDDING_MODEL,
+        )
+        # 로컬 인덱스 스냅샷을 쓰면 검색이 네트워크 왕복 없이 프로세스 안에서 끝남
+        if VECTOR_BACKEND == 'local':
+            self.database = LocalVectorStore.load(LOCAL_INDEX_DIR, self.embedding)
+        else:
+            self.database = PineconeVectorStore.from_existing_index(index_name=INDEX_NAME, embedding=self.embedding)
+        self.llm = llm or get_llm()
+
+        # 벡터 검색 + BM25 하이브리드 검색기
+        # 날짜 필터는 질문마다 config로 주입할 수 있도록 search_kwargs를 설정 가능 필드로 둠
+        self.lexical_index = LexicalIndex.load(LEXICAL_INDEX_PATH)
+        self.retriever = HybridRetriever(
+            vectorstore=self.database,
+            lexical_index=self.lexical_index,
+            search_kwargs={"k": 3},
+        ).configurable_fields(
+            search_kwargs=ConfigurableField(id="search_kwargs")
+        )
+
+        contextualize_q_system_prompt = (
+            "Given a chat history and the latest user question "
+            "which might reference context in the chat history, "
+            "formulate a standalone question which can be understood "
+            "without the chat history. Do NOT answer the question, "
+            "just reformulate it if needed and otherwise return it as is"
+        )
+
+        self.contextualize_q_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", contextualize_q_system_prompt),
+                MessagesPlaceholder("chat_history"),
+                ("human", "{input}"),
+            ]
+        )
+
+        # 시스템 프롬프트 설정
+        system_prompt = (
+            f"오늘 날짜는 {current_date}입니다. "
+            "당신의 이름은 상상부기이고, 학생들에게 한성대학교 공지사항을 요약해주는 챗봇입니다. 학생에게 친근한 말투로, 반말모드로 답변해주세요."
+            "답변 시 URL 링크를 포함해 주세요."
+        )
+
+        # QA 프롬프트 생성 (context 변수 추가)
+        self.qa_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system_prompt),
+                MessagesPlaceholder("chat_history"),
+                ("human", "{input}"),
+                ("ai", "{context}"),
+            ]
+        )
+
+        # 질문 재작성 체인 (대화 기록이 있을 때만 사용)
+        self.contextualize_chain = self.contextualize_q_prompt | self.llm | StrOutputParser()
+
+        # 문서 결합 체인 생성
+        self.question_answer_chain = create_stuff_documents_chain(self.llm, self.qa_prompt)
+
+        # 검색 문서를 컨텍스트 토큰 예산에 맞게 줄이는 단계 (검색과 문서 결합 체인 사이)
+        self.context_packer = ContextPacker(
+            context_token_budget=CONTEXT_TOKEN_BUDGET,
+            document_token_limit=CONTEXT_DOCUMENT_TOKEN_LIMIT,
+        )
+
+        # FAQ 의도 매칭기 (자주 묻는 질문은 RAG 없이 faq_content 로 답변)
+        self.faq_matcher = FaqIntentMatcher(self.embedding, threshold=FAQ_CONFIDENCE_THRESHOLD)
+
+        # 대화 기록 압축기 (오래된 턴을 요약으로 접음)
+        self.compactor = HistoryCompactor(self.llm, keep_turns=HISTORY_KEEP_TURNS)
+
+        # 영어 모드 번역기 (문장 단위 백그라운드 번역 + 번역 메모리)
+        self.translator = StreamingTranslator(translator_backend or GoogleTranslatorBackend(source="ko", target="en"))
+
+    # 대화 기록을 참고해 독립적인 질문으로 재작성
+    async def acontextualize(self, user_message, chat_history):
+        if not chat_history:
+            return user_message
+        prompt_tokens = count_message_tokens(
+            self.contextualize_q_prompt.format_messages(input=user_message, chat_history=chat_history))
+        # 재작성 결과는 질문 길이 정도이므로 질문 토큰 수를 예상 답변 토큰으로 씀
+        reservation = await acquire_chat(prompt_tokens + count_tokens(user_message) + 50)
+        with rate_limited_call():
+            question = await self.contextualize_chain.ainvoke({"input": user_message, "chat_history": chat_history})
+        reservation.settle(prompt_tokens + count_tokens(question))
+        return question
+
+    async def aretrieve(self, query, date_filter=None, listing=False):
+        config = {"configurable": {"search_kwargs": get_search_kwargs(date_filter, listing)}}
+        return await self.retriever.ainvoke(query, config=config)
+
+    # 질문과 관련 있는 문단만 남기고 중복 문단을 빼서 컨텍스트 예산 안으로 담음
+    def pack_context(self, query, documents, listing=False):
+        document_token_limit = LISTING_DOCUMENT_TOKEN_LIMIT if listing else None
+        packed, stats = self.context_packer.pack(query, documents, document_token_limit)
+        print(f"컨텍스트 압축: 문서 {stats['packed']}/{stats['documents']}건, "
+              f"{stats['tokens_before']} → {stats['tokens_after']} 토큰 "
+              f"({stats['tokens_saved']} 토큰 절약, 중복 문단 {stats['duplicates_removed']}개 제거)")
+        return packed
+
+    async def astream_answer(self, user_message, chat_history, documents):
+        prompt_tokens = count_message_tokens(self.qa_prompt.format_messages(
+            input=user_message, chat_history=chat_history,
+            context="\n\n".join(document.page_content for document in documents),
+        ))
+        reservation = await acquire_chat(prompt_tokens + EXPECTED_COMPLETION_TOKENS)
+        answer_tokens = 0
+        with rate_limited_call():
+            async for chunk in self.question_answer_chain.astream(
+                {"input": user_message, "chat_history": chat_history, "context": documents}
+            ):
+                answer_tokens += count_tokens(chunk)
+                yield chunk
+        reservation.settle(prompt_tokens + answer_tokens)
+
+    # 대화 기록 요약은 배치 대기열로 보내 채팅 요청보다 뒤에 처리
+    async def acompact_history(self, history):
+        messages = await history.aget_messages()
+        await acquire_chat(count_message_tokens(messages) + self.compactor.summary_token_limit, lane=BATCH)
+        with rate_limited_call():
+            return await self.compactor.acompact(history)
+
+# 채팅 모델 한도 대기열 통과 (마감 안에 통과할 수 없으면 RateLimitRejected)
+async def acquire_chat(tokens, lane=INTERACTIVE):
+    start = time.perf_counter()
+    reservation = await aacquire(CHAT_MODEL, tokens, lane, CHAT_QUEUE_DEADLINE_SECONDS if lane == INTERACTIVE else None)
+    record_stage("queue_wait", (time.perf_counter() - start) * 1000, lane=lane, tokens=tokens)
+    return reservation
+
+# OpenAI 가 429 를 돌려주면 잠시 채팅 모델 호출을 멈춤 (재시도는 클라이언트가 이미 했으므로 대기열만 늦춤)
+@contextmanager
+def rate_limited_call(model=CHAT_MODEL, cooldown_seconds=5):
+    try:
+        yield
+    except openai.RateLimitError:
+        governor = get_governor(model)
+        if governor:
+            governor.cooldown(cooldown_seconds)
+        print(f"OpenAI 호출 한도 초과({model}): {cooldown_seconds}초 동안 대기열을 멈춥니다")
+        raise
+
+# 채팅 화면에 보여줄 예상 대기 (앞선 대기 요청 수, 초), 한도를 관리하지 않는 모델이면 None
+def estimate_chat_wait():
+    governor = get_governor(CHAT_MODEL)
+    if governor is None:
+        return None
+    return governor.estimate_wait(CONTEXT_TOKEN_BUDGET + QA_HISTORY_TOKEN_BUDGET + EXPECTED_COMPLETION_TOKENS)
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+# 답변 캐시 (임베딩이 충분히 비슷한 질문은 검색/생성 없이 캐시된 답변을 재생)
+answer_cache = AnswerCache()
+
+# 처리 중인 같은 질문의 생성 공유 (몰리는 시간대에 같은 질문이 동시에 들어올 때)
+answer_flights = SingleFlight()
+
+# 프로세스 전역 파이프라인 반환 (최초 호출 시에만 생성)
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RagPipeline()
+    return _pipeline
+
+# 프로세스 전역 파이프라인 교체 (벤치마크에서 가짜 백엔드 파이프라인을 넣을 때)
+def set_pipeline(pipeline):
+    global _pipeline
+    with _pipeline_lock:
+        _pipeline = pipeline
+
+# 질문이 FAQ 의도에 확실히 해당하면 faq_content 키 반환 (아니면 None 이고 RAG 로 답변)
+# 질문 임베딩이 한도 초과(RateLimitRejected)나 OpenAI 오류로 실패해도 None 을 반환
+# (RAG 경로에서 같은 오류를 다시 만나면 채팅 화면의 기존 처리대로 안내)
+def match_faq_intent(user_message, language="한국어"):
+    pipeline = get_pipeline()
+    try:
+        match = pipeline.faq_matcher.match(user_message)
+    except Exception as e:
+        print(f"FAQ 의도 매칭 실패, RAG 로 답변: {e!r}")
+        return None
+    if match is None:
+        return None
+    return pipeline.faq_matcher.faq_key(match[0], language)
+
+# FAQ 로 답한 대화도 후속 질문 재작성에 쓰이도록 대화 기록에 남김
+def record_exchange(user_message, answer, session_id="default"):
+    get_session_history(session_id).add_messages([HumanMessage(content=user_message), AIMessage(content=answer)])
+
+# AI 응답 이벤트 스트림 (비동기): 출처 공지 → 답변 토큰 → 메타데이터 순서의 dict
+# - {"type": "sources", "sources": [{"title", "link", "date"}, ...]}: 검색이 끝나자마자 (답변 생성 전)
+# - {"type": "token", "text": ...}: 답변 조각
+# - {"type": "done", "answer", "cached", "digest", "flight_leader", "trace_id", "elapsed_ms"}: 답변이 끝난 뒤 한 번
+# 요청마다 단계별 지연을 추적하고, 출처 공지까지의 시간(sources)과 첫 토큰까지의 시간(ttft)을 기록
+async def aget_ai_events(user_message, language="한국어", session_id="default"):
+    trace = activate(Trace("chat", language=language, session_id=session_id))
+    answer_chunks = []
+    first_token = True
+    try:
+        async for event in _aanswer(trace, user_message, language, session_id):
+            if event["type"] == "sources":
+                trace.add_span("sources", trace.elapsed_ms(), start=trace.start, documents=len(event["sources"]))
+            elif event["type"] == "token":
+                if first_token:
+                    first_token = False
+                    trace.add_span("ttft", trace.elapsed_ms(), start=trace.start)
+                answer_chunks.append(event["text"])
+            yield event
+        yield {
+            "type": "done",
+            "answer": "".join(answer_chunks),
+            "cached": trace.attributes.get("cache_hit", False),
+            "digest": trace.attributes.get("digest"),
+            "flight_leader": trace.attributes.get("flight_leader"),
+            "trace_id": trace.trace_id,
+            "elapsed_ms": round(trace.elapsed_ms(), 1),
+        }
+    finally:
+        trace.finish()
+
+# AI 응답 생성 (비동기): 답변 토큰만 비동기 이터레이터로 반환
+async def aget_ai_response(user_message, language="한국어", session_id="default"):
+    events = aget_ai_events(user_message, language, session_id)
+    try:
+        async for event in events:
+            if event["type"] == "token":
+                yield event["text"]
+    finally:
+        await events.aclose()
+
+async def _aanswer(trace, user_message, language, session_id):
+
+    setup_start = time.perf_counter()
+    pipeline = get_pipeline()
+    history = get_session_history(session_id)
+
+    # 오늘/어제/이번 주/최근 공지 나열 질문은 업로드 때 미리 만든 요약으로 바로 답변 (검색/생성 없음)
+    digest = digest_store.match(user_message, language)
+    trace.set(digest=digest["label"] if digest else None)
+    if digest is not None:
+        print(f"공지 요약으로 답변: {digest['label']} ({digest['built_at']} 생성)")
+        yield {"type": "sources", "sources": digest["sources"]}
+        for piece in replay_stream(digest["answer"]):
+            yield {"type": "token", "text": piece}
+        await history.aadd_messages([HumanMessage(content=user_message), AIMessage(content=digest["answer"])])
+        return
+
+    # 서로 독립적인 작업은 동시에 진행: 대화 기록 로드, 원 질문 임베딩, 날짜 파싱
+    # (원 질문 임베딩은 답변 캐시 조회에 쓰이고, 재작성 결과가 같으면 검색에서 캐시로 재사용됨)
+    history_task = asyncio.create_task(trace.timed("history", history.aget_messages()))
+    embed_task = asyncio.create_task(trace.timed("embed", pipeline.embedding.aembed_query(user_message)))
+    date_filter = get_date_filter(user_message)
+    chat_history = await history_task
+
+    # 체인별 토큰 예산에 맞춰 대화 기록을 줄임 (요약 + 최근 턴)
+    rewrite_history = fit_history_to_budget(chat_history, CONTEXTUALIZE_HISTORY_TOKEN_BUDGET)
+    qa_history = fit_history_to_budget(chat_history, QA_HISTORY_TOKEN_BUDGET)
+    if chat_history:
+        print(f"대화 기록 토큰: {count_message_tokens(chat_history)} → "
+              f"재작성 {count_message_tokens(rewrite_history)}, 답변 {count_message_tokens(qa_history)}")
+
+    # 질문 재작성 LLM 호출도 임베딩과 겹쳐서 진행
+    rewrite = pipeline.acontextualize(user_message, rewrite_history)
+    rewrite_task = asyncio.create_task(trace.timed("rewrite", rewrite, skipped=not rewrite_history))
+    query_vector = await embed_task
+
+    # 유사한 질문의 답변이 캐시에 있으면 검색/생성 없이 바로 재생
+    # (대화 기록이 있으면 '그거 언제까지야?' 같은 후속 질문의 뜻이 세션마다 다르므로 캐시를 쓰지 않음)
+    cached = answer_cache.lookup(query_vector, date_filter, language) if not qa_history else None
+    trace.set(cache_hit=cached is not None)
+    if cached is not None:
+        rewrite_task.cancel()
+        # 시작 전에 취소된 태스크는 재작성 코루틴을 한 번도 실행하지 않으므로 직접 닫음 ('never awaited' 경고 방지)
+        if inspect.getcoroutinestate(rewrite) == inspect.CORO_CREATED:
+            rewrite.close()
+        cached_answer, cached_sources = cached
+        print(f"답변 캐시 적중: {answer_cache.stats()}, 임베딩 캐시: {pipeline.embedding.stats()}")
+        await history.aadd_messages([HumanMessage(content=user_message), AIMessage(content=cached_answer)])
+        yield {"type": "sources", "sources": cached_sources}
+        for piece in replay_stream(cached_answer):
+            yield {"type": "token", "text": piece}
+        return
+
+    standalone_question = await rewrite_task
+
+    # 대화 기록이 없는 세션의 같은 질문(정규화된 질문, 날짜 필터, 언어)은 진행 중인 생성 하나를 함께 받음
+    # (대화 기록이 있으면 답변 프롬프트에 그 세션의 기록이 들어가므로 공유하지 않음)
+    flight_key = None
+    if not qa_history:
+        flight_key = (normalize_query(standalone_question), date_filter_key(date_filter), language)
+
+    async def generate(flight):
+        listing = bool(date_filter) and is_listing_query(user_message)
+        documents = await trace.timed("retrieve", pipeline.aretrieve(standalone_question, date_filter, listing))
+        with trace.span("pack") as span:
+            documents = pipeline.pack_context(standalone_question, documents, listing)
+            span.set(documents=len(documents))
+        print(f"질문 준비 시간: {(time.perf_counter() - setup_start) * 1000:.1f}ms")
+
+        # 답변 생성 전에 출처 공지부터 보냄 (합류한 구독자도 스트림 앞부분에서 같이 받음)
+        sources = source_notices(documents)
+        yield {"type": "sources", "sources": sources}
+
+        # 대화 기록에는 한국어 원문 답변을, 답변 캐시에는 사용자에게 보여준 답변을 저장
+        answer_chunks = []
+        generation = {}
+
+        # LLM 스트림의 첫 토큰 지연과 초당 토큰 수를 기록
+        async def answer_stream():
+            start, start_time, first_token_ms, tokens = time.perf_counter(), time.time(), None, 0
+            async for chunk in pipeline.astream_answer(user_message, qa_history, documents):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    generation["first_token"] = time.perf_counter()
+                answer_chunks.append(chunk)
+                tokens += count_tokens(chunk)
+                yield chunk
+            duration_ms = (time.perf_counter() - start) * 1000
+            streaming_seconds = (duration_ms - (first_token_ms or 0.0)) / 1000
+            trace.add_span("generate", duration_ms, start=start_time, first_token_ms=round(first_token_ms or 0.0, 1),
+                           tokens=tokens, tokens_per_sec=round(tokens / streaming_seconds, 1) if streaming_seconds > 0 else None)
+            generation["end"] = time.perf_counter()
+
+        if language == "English":
+            output_stream = pipeline.translator.atranslate_stream(answer_stream())
+        else:
+            output_stream = answer_stream()
+        output_chunks = []
+        first_output = None
+        async for chunk in output_stream:
+            if first_output is None:
+                first_output = time.perf_counter()
+            output_chunks.append(chunk)
+            yield {"type": "token", "text": chunk}
+
+        # 번역이 더하는 지연: 첫 토큰 → 첫 번역 문장, 생성 종료 → 마지막 번역 문장
+        if language == "English" and "end" in generation:
+            tail_ms = (time.perf_counter() - generation["end"]) * 1000
+            trace.add_span("translate", tail_ms, first_chunk_delay_ms=round(
+                (first_output - generation["first_token"]) * 1000, 1) if first_output and "first_token" in generation else None)
+
+        flight.value = "".join(answer_chunks)
+        if not qa_history:
+            answer_cache.store(query_vector, date_filter, language, "".join(output_chunks), sources)
+
+    flight, stream, leader = answer_flights.join(flight_key, generate)
+    trace.set(flight_leader=leader)
+    async for event in stream:
+        yield event
+
+    # 합류한 세션도 각자 자기 대화 기록에 질문/답변을 남김
+    await history.aadd_messages([HumanMessage(content=user_message), AIMessage(content=flight.value)])
+
+    # 오래된 턴 요약은 답변이 끝난 뒤 백그라운드에서 진행 (응답 지연에 포함되지 않도록)
+    if pipeline.compactor.needs_compaction(await history.aget_messages()):
+        run_in_background(pipeline.acompact_history(history))
+
+_background_tasks = set()
+
+# 응답 스트림과 무관하게 끝까지 실행될 백그라운드 작업 등록
+def run_in_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+_loop = None
+_loop_lock = threading.Lock()
+
+# 동기 호출용 이벤트 루프 (백그라운드 스레드에서 프로세스당 하나만 실행)
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return _loop
+
+# 비동기 이터레이터를 백그라운드 이벤트 루프에서 돌리며 동기 제너레이터로 변환
+def iterate_in_loop(async_iterator):
+    loop = get_event_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(async_iterator.__anext__(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        asyncio.run_coroutine_threadsafe(async_iterator.aclose(), loop)
+
+# AI 응답 이벤트 스트림 (pages/chat.py 에서 출처 카드와 답변을 그리는 동기 래퍼)
+def get_ai_events(user_message, language="한국어", session_id="default"):
+    return iterate_in_loop(aget_ai_events(user_message, language, session_id))
+
+# AI 응답 생성 (답변 토큰만 필요한 곳의 동기 래퍼)
+def get_ai_response(user_message, language="한국어", session_id="default"):
+    return iterate_in_loop(aget_ai_response(user_message, language, session_id))
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+from collections import namedtuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# 검색에 쓰는 데이터 묶음 (다시 읽을 때는 새 묶음을 만든 뒤 참조 하나만 바꿔서, 검색 중인 스레드가
+# 새 id 목록과 옛 벡터 행렬처럼 섞인 상태를 보지 않게 함)
+_Snapshot = namedtuple("_Snapshot", ["ids", "texts", "metadatas", "timestamps", "vectors"])
+
+# Pinecone 'crawled-db-ver2' 인덱스를 프로세스 내에서 흉내내는 NumPy 기반 벡터 저장소
+# - 문서는 expiry_date 오름차순으로 정렬해 보관하고, 날짜 필터는 정렬된 타임스탬프 배열의
+#   이진 탐색으로 연속 구간을 잘라낸 뒤 그 구간만 내적 계산함
+class LocalVectorStore(VectorStore):
+    def __init__(self, embedding, ids=None, texts=None, metadatas=None, vectors=None, path=None):
+        self._embedding = embedding
+        self._path = path
+        self._loaded_mtime = None
+        self._reload_lock = threading.Lock()
+        self._set_data(ids or [], texts or [], metadatas or [], vectors)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _set_data(self, ids, texts, metadatas, vectors):
+        timestamps = np.array([int(m.get("expiry_date", 0)) for m in metadatas], dtype=np.int64)
+        order = np.argsort(timestamps, kind="stable")
+        if vectors is None or len(ids) == 0:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        else:
+            vectors = np.asarray(vectors, dtype=np.float32)[order]
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        self._data = _Snapshot([ids[i] for i in order], [texts[i] for i in order],
+                               [metadatas[i] for i in order], timestamps[order], vectors)
+
+    def __len__(self):
+        return len(self._data.ids)
+
+    # 임베딩이 이미 계산된 문서를 추가 (같은 id는 덮어씀)
+    def add_vectors(self, ids, texts, metadatas, vectors):
+        data = self._data
+        replaced = set(ids)
+        keep = [i for i, doc_id in enumerate(data.ids) if doc_id not in replaced]
+        old_vectors = data.vectors[keep] if len(keep) else np.zeros((0, len(vectors[0]) if vectors else 0), dtype=np.float32)
+        new_vectors = np.asarray(vectors, dtype=np.float32)
+        merged = np.concatenate([old_vectors, new_vectors]) if len(old_vectors) else new_vectors
+        self._set_data(
+            [data.ids[i] for i in keep] + list(ids),
+            [data.texts[i] for i in keep] + list(texts),
+            [data.metadatas[i] for i in keep] + list(metadatas),
+            merged,
+        )
+        return list(ids)
+
+    def delete(self, ids=None, **kwargs):
+        data = self._data
+        removed = set(ids or [])
+        keep = [i for i, doc_id in enumerate(data.ids) if doc_id not in removed]
+        self._data = _Snapshot(
+            [data.ids[i] for i in keep],
+            [data.texts[i] for i in keep],
+            [data.metadatas[i] for i in keep],
+            data.timestamps[keep],
+            data.vectors[keep] if len(keep) else np.zeros((0, 0), dtype=np.float32),
+        )
+        return True
+
+    # 공지 단위로 삭제 (청크 문서와 청크로 나누기 전의 공지 문서 모두)
+    def delete_parents(self, parent_ids):
+        parent_ids = set(parent_ids)
+        data = self._data
+        self.delete([doc_id for doc_id, metadata in zip(data.ids, data.metadatas)
+                     if doc_id in parent_ids or metadata.get("parent_id") in parent_ids])
+
+    # 공지별 저장된 문서 id (청크 id 와 청크로 나누기 전의 공지 id), 저장된 문서가 없는 공지는 빠짐
+    def ids_by_parent(self, parent_ids):
+        parent_ids = set(parent_ids)
+        grouped = {}
+        data = self._data
+        for doc_id, metadata in zip(data.ids, data.metadatas):
+            parent_id = doc_id if doc_id in parent_ids else metadata.get("parent_id")
+            if parent_id in parent_ids:
+                grouped.setdefault(parent_id, []).append(doc_id)
+        return grouped
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(len(self) + i) for i in range(len(texts))]
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(ids, texts, metadatas, vectors)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    # 날짜 필터 범위에 해당하는 문서 구간 [start, end) 계산
+    def _filter_range(self, data, filter):
+        start, end = 0, len(data.ids)
+        if not filter:
+            return start, end, None
+        mask = None
+        for key, condition in filter.items():
+            if key == "expiry_date" and isinstance(condition, dict):
+                if "$gte" in condition:
+                    start = max(start, int(np.searchsorted(data.timestamps, condition["$gte"], side="left")))
+                if "$gt" in condition:
+                    start = max(start, int(np.searchsorted(data.timestamps, condition["$gt"], side="right")))
+                if "$lte" in condition:
+                    end = min(end, int(np.searchsorted(data.timestamps, condition["$lte"], side="right")))
+                if "$lt" in condition:
+                    end = min(end, int(np.searchsorted(data.timestamps, condition["$lt"], side="left")))
+            else:
+                # 그 외 메타데이터 조건은 일치 여부만 지원 ({"link": "..."} 또는 {"link": {"$eq": "..."}})
+                value = condition.get("$eq") if isinstance(condition, dict) else condition
+                matches = np.array([m.get(key) == value for m in data.metadatas], dtype=bool)
+                mask = matches if mask is None else mask & matches
+        return start, max(start, end), mask
+
+    # 검색에 쓴 스냅샷과 상위 k개 문서의 (위치, 점수) 목록
+    def _top_k(self, embedding, k, filter):
+        self._reload_if_stale()
+        data = self._data
+        start, end, mask = self._filter_range(data, filter)
+        if end <= start:
+            return data, []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = data.vectors[start:end] @ query
+        if mask is not None:
+            scores = np.where(mask[start:end], scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return data, [(start + i, float(scores[i])) for i in top if scores[i] != -np.inf]
+
+    @staticmethod
+    def _document(data, position):
+        return Document(id=data.ids[position], page_content=data.texts[position], metadata=dict(data.metadatas[position]))
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, **kwargs):
+        data, hits = self._top_k(embedding, k, filter)
+        return [(self._document(data, position), score) for position, score in hits]
+
+    # 재정렬(MMR)용: 문서와 함께 저장된 (정규화된) 벡터를 반환
+    def similarity_search_with_vectors(self, embedding, k=4, filter=None):
+        data, hits = self._top_k(embedding, k, filter)
+        return [(self._document(data, position), data.vectors[position]) for position, _ in hits]
+
+    def get_vectors(self, ids):
+        self._reload_if_stale()
+        data = self._data
+        wanted = set(ids)
+        return {doc_id: data.vectors[i] for i, doc_id in enumerate(data.ids) if doc_id in wanted}
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    # 스냅샷 저장: 벡터는 float32 .npy, 문서/메타데이터는 JSON
+    def save(self, path):
+        # 검색 중인 프로세스가 반쯤 쓰인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+        os.makedirs(path, exist_ok=True)
+        data = self._data
+        vectors_path = os.path.join(path, "vectors.npy")
+        documents_path = os.path.join(path, "documents.json")
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, data.vectors)
+        with open(documents_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": data.ids, "texts": data.texts, "metadatas": data.metadatas}, f, ensure_ascii=False)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(documents_path + ".tmp", documents_path)
+
+    @classmethod
+    def load(cls, path, embedding):
+        store = cls(embedding, path=path)
+        store._reload_if_stale()
+        return store
+
+    # 업로드 스크립트가 스냅샷을 갱신하면 다음 검색 때 다시 읽어옴
+    # 여러 검색 스레드가 동시에 바뀐 것을 알아채도 한 스레드만 읽도록 잠금
+    def _reload_if_stale(self):
+        if self._path is None:
+            return
+        documents_path = os.path.join(self._path, "documents.json")
+        try:
+            mtime = os.stat(documents_path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with self._reload_lock:
+            if mtime == self._loaded_mtime:
+                return
+            with open(documents_path, encoding="utf-8") as f:
+                data = json.load(f)
+            vectors = np.load(os.path.join(self._path, "vectors.npy"))
+            self._set_data(data["ids"], data["texts"], data["metadatas"], vectors)
+            self._loaded_mtime = mtime
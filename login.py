@@ -1,8 +1,12 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import mysql.connector
 from mysql.connector import Error
 import openai
 from datetime import datetime
+from config import CHAT_QUEUE_DEADLINE_SECONDS, EXPECTED_COMPLETION_TOKENS
+from rate_limit import acquire, get_governor
+from token_count import count_tokens
 
 # 데이터베이스 연결 함수
 def create_connection():
@@ -114,15 +118,20 @@ def get_recommended_notices(department):
     - 날짜: [공지 날짜]
     """
 
-    # OpenAI API 호출
+    # OpenAI API 호출 (gpt-4o 한도 대기열을 거쳐서 호출, 한도를 넘으면 추천 없이 진행)
+    system_content = "당신은 대학 공지사항 추천 전문가입니다."
     try:
+        reservation = acquire("gpt-4o", count_tokens(system_content) + count_tokens(prompt) + EXPECTED_COMPLETION_TOKENS,
+                              deadline=CHAT_QUEUE_DEADLINE_SECONDS)
         response = openai.chat.completions.create(
             model="gpt-4o",  # GPT-4 모델 사용
             messages=[
-                {"role": "system", "content": "당신은 대학 공지사항 추천 전문가입니다."},
+                {"role": "system", "content": system_content},
                 {"role": "user", "content": prompt}
             ]
         )
+        if response.usage:
+            reservation.settle(response.usage.total_tokens)
 
         # GPT의 추천 결과 파싱
         recommendations = response.choices[0].message.content
@@ -146,6 +155,12 @@ def get_recommended_notices(department):
                 recommended_notices.append(notice)
 
         return recommended_notices
+    except openai.RateLimitError as e:
+        governor = get_governor("gpt-4o")
+        if governor:
+            governor.cooldown(5)
+        print("OpenAI API 호출 한도 초과:", str(e))
+        return []
     except Exception as e:
         print("OpenAI API 호출 중 오류 발생:", str(e))
         return []
@@ -167,6 +182,14 @@ def login_and_save_notices(username, password):
         st.session_state['logged_in'] = False
         st.session_state['recommended_notices'] = []
 
+# 대화 기록을 구분할 세션 키 (로그인 사용자는 아이디, 아니면 Streamlit 브라우저 세션)
+def get_chat_session_id():
+    user = st.session_state.get('user')
+    if st.session_state.get('logged_in') and user:
+        return f"user:{user['username']}"
+    ctx = get_script_run_ctx()
+    return f"session:{ctx.session_id}" if ctx else "session:default"
+
 # Streamlit 앱 구성
 def main():
     st.markdown("<h1 style='text-align: center; color: #4B7BE5;'>📚 SchoolCatch</h1>", unsafe_allow_html=True)
@@ -0,0 +1,126 @@
+import time
+from datetime import datetime
+from langchain_core.documents import Document
+from langchain_pinecone import PineconeVectorStore
+from config import INDEX_NAME, VECTOR_BACKEND, LOCAL_INDEX_DIR, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from chunking import chunk_documents
+from local_index import LocalVectorStore
+from lexical_index import LexicalIndex, LEXICAL_INDEX_PATH
+from answer_cache import bump_index_version
+
+# swpre 행(id, title, link, content, date)을 벡터 DB 문서로 변환 (Pinecone / 로컬 인덱스 공통 형식)
+def build_documents(rows):
+    documents = []
+    for id, title, link, content, pub_date in rows:
+        # 날짜를 UNIX 타임스탬프로 변환
+        date_object = datetime.strptime(str(pub_date)[:19], "%Y-%m-%d %H:%M:%S")
+        unix_timestamp = int(time.mktime(date_object.replace(hour=0, minute=0, second=0, microsecond=0).timetuple()))
+
+        # 문서 내용 생성
+        combined_content = f"Title: {title}\nLink: {link}\nContent: {content}"
+        metadata = {
+            'title': title,
+            'link': link,
+            'expiry_date': unix_timestamp  # UNIX 타임스탬프 저장
+        }
+        documents.append(Document(page_content=combined_content, metadata=metadata, id=str(id)))
+    return documents
+
+# 답변과 함께 보여줄 출처 공지 (제목, 링크, 게시일), 청크가 여러 개 뽑힌 공지는 한 번만
+def source_notices(documents):
+    sources, seen = [], set()
+    for doc in documents:
+        link = doc.metadata.get("link")
+        if not link or link in seen:
+            continue
+        seen.add(link)
+        expiry_date = doc.metadata.get("expiry_date")
+        sources.append({
+            "title": doc.metadata.get("title", ""),
+            "link": link,
+            "date": datetime.fromtimestamp(expiry_date).strftime("%Y-%m-%d") if expiry_date else None,
+        })
+    return sources
+
+# 새 청크를 올린 뒤 남은 기존 벡터 id (이전 청크 중 이번에 덮어쓰지 않은 번호, 청크로 나누기 전의 공지 단위 벡터)
+# - 다시 색인하는 공지: 로컬 인덱스 스냅샷에 있는 기존 청크 id 로 계산 (Pinecone 조회 없음),
+#   스냅샷에 없는 공지만 접두어('<공지 id>#')로 조회
+# - rebuild: 인덱스 전체 id 를 한 번 훑어 이번에 올리지 않은 id 전부
+def stale_pinecone_ids(index, parent_ids, new_ids, known_ids=None, rebuild=False):
+    if rebuild:
+        return [doc_id for ids in index.list() for doc_id in ids if doc_id not in new_ids]
+    known_ids = known_ids or {}
+    stale = []
+    for parent_id in parent_ids:
+        if parent_id in known_ids:
+            candidates = known_ids[parent_id]
+        else:
+            candidates = [doc_id for ids in index.list(prefix=f"{parent_id}#") for doc_id in ids]
+        stale.extend(doc_id for doc_id in [parent_id, *candidates] if doc_id not in new_ids)
+    return list(dict.fromkeys(stale))
+
+# Pinecone 인덱스에 미리 계산한 벡터를 업서트 (langchain_pinecone과 같은 'text' 메타데이터 키 사용)
+# 먼저 올리고 나서 남은 기존 벡터를 지우므로 색인 중에도 검색할 수 있음 (인덱스가 비는 구간 없음)
+# rebuild=True 이면 이번에 올리지 않은 벡터를 모두 지움
+def upsert_to_pinecone(documents, vectors, parent_ids, known_ids=None, rebuild=False, batch_size=100,
+                       delete_batch_size=1000):
+    index = PineconeVectorStore.get_pinecone_index(INDEX_NAME)
+    records = [
+        (doc.id, vector, {**doc.metadata, "text": doc.page_content})
+        for doc, vector in zip(documents, vectors)
+    ]
+    for i in range(0, len(records), batch_size):
+        index.upsert(vectors=records[i:i + batch_size])
+
+    stale = stale_pinecone_ids(index, parent_ids, {doc.id for doc in documents}, known_ids, rebuild)
+    for i in range(0, len(stale), delete_batch_size):
+        index.delete(ids=stale[i:i + delete_batch_size])
+
+# 공지를 벡터 인덱스(Pinecone, 로컬 인덱스 스냅샷, BM25 역색인)에서 삭제 (DB 에서 지운 공지)
+def delete_documents(parent_ids, embedding):
+    parent_ids = [str(parent_id) for parent_id in parent_ids]
+    if not parent_ids:
+        return
+    local_store = LocalVectorStore.load(LOCAL_INDEX_DIR, embedding)
+    if VECTOR_BACKEND == 'pinecone':
+        index = PineconeVectorStore.get_pinecone_index(INDEX_NAME)
+        stale = stale_pinecone_ids(index, parent_ids, set(), local_store.ids_by_parent(parent_ids))
+        for i in range(0, len(stale), 1000):
+            index.delete(ids=stale[i:i + 1000])
+
+    local_store.delete_parents(parent_ids)
+    local_store.save(LOCAL_INDEX_DIR)
+    lexical_index = LexicalIndex.load(LEXICAL_INDEX_PATH)
+    lexical_index.delete_parents(parent_ids)
+    lexical_index.save(LEXICAL_INDEX_PATH)
+    bump_index_version()
+
+# 공지를 토큰 크기 청크로 나누고 한 번만 임베딩해서 Pinecone, 로컬 인덱스 스냅샷, BM25 역색인에 함께 저장
+# rebuild=True 이면 인덱스를 새로 만들고, 아니면 다시 색인하는 공지의 기존 청크만 교체함
+# 반환값은 저장한 청크 수
+def index_documents(documents, embedding, rebuild=False):
+    if not documents:
+        return 0
+    parent_ids = [doc.id for doc in documents]
+    chunks = chunk_documents(documents, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = embedding.embed_documents(texts)
+
+    local_store = LocalVectorStore(embedding) if rebuild else LocalVectorStore.load(LOCAL_INDEX_DIR, embedding)
+    if VECTOR_BACKEND == 'pinecone':
+        upsert_to_pinecone(chunks, vectors, parent_ids, known_ids=local_store.ids_by_parent(parent_ids), rebuild=rebuild)
+
+    local_store.delete_parents(parent_ids)
+    local_store.add_vectors([chunk.id for chunk in chunks], texts, [chunk.metadata for chunk in chunks], vectors)
+    local_store.save(LOCAL_INDEX_DIR)
+
+    # BM25 역색인도 같은 청크로 갱신 (하이브리드 검색용)
+    lexical_index = LexicalIndex() if rebuild else LexicalIndex.load(LEXICAL_INDEX_PATH)
+    lexical_index.delete_parents(parent_ids)
+    lexical_index.add_documents(chunks)
+    lexical_index.save(LEXICAL_INDEX_PATH)
+
+    # 새 공지가 반영되었으므로 챗봇의 답변 캐시를 무효화
+    bump_index_version()
+
+    return len(chunks)
@@ -0,0 +1,117 @@
+from config import SWPRE_BATCH_SIZE
+from fetch_state import CREATE_FETCH_STATE_QUERY, link_hash
+
+# 크롤링한 공지를 swpre 에 배치 단위로 저장
+# - 행을 모았다가 batch_size 건마다 executemany 한 번, commit 한 번 (요청 상태도 같은 배치로 저장)
+# - 링크 해시(link_hash) 고유 인덱스로 같은 공지를 다시 크롤링해도 행이 늘지 않음
+# - 요청 상태(fetch_state)가 있으면 upsert: 크롤러가 본문 해시가 바뀐 공지만 넘기고 OCR / 임베딩 대상으로 표시하므로
+#   덮어쓴 본문(update_ocrmac.py 가 붙인 OCR 텍스트 포함)은 다음 OCR / 업로드에서 다시 만들어짐
+# - 요청 상태가 없으면(crawl.py / comgong_crawl.py 전체 크롤링) 이미 있는 공지는 건드리지 않음 (INSERT IGNORE)
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS swpre (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(255),
+    link TEXT,
+    link_hash CHAR(64),
+    content TEXT,
+    image TEXT,
+    date DATETIME,
+    UNIQUE KEY uq_swpre_link_hash (link_hash)
+)
+"""
+
+UPSERT_QUERY = """
+INSERT INTO swpre (title, link, link_hash, content, image, date) VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE title = VALUES(title), content = VALUES(content), image = VALUES(image)
+"""
+
+INSERT_IGNORE_QUERY = """
+INSERT IGNORE INTO swpre (title, link, link_hash, content, image, date) VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+# 마이그레이션에서 지운 중복 공지 id (update_upload.py 가 벡터 인덱스에서 지운 뒤 비움)
+CREATE_REMOVED_QUERY = """
+CREATE TABLE IF NOT EXISTS swpre_removed (
+    id INT PRIMARY KEY
+)
+"""
+
+# 테이블이 없으면 생성 (공지 테이블, 링크별 요청 상태 테이블)
+def ensure_table(db):
+    cursor = db.cursor()
+    cursor.execute(CREATE_TABLE_QUERY)
+    cursor.execute(CREATE_FETCH_STATE_QUERY)
+    cursor.execute(CREATE_REMOVED_QUERY)
+    _migrate_link_hash(db, cursor)
+    cursor.close()
+
+# link_hash 열이 없던 기존 테이블: 열 추가 → 값 채움 → 같은 링크로 중복 저장된 행 정리(먼저 저장된 행만 남김) → 고유 인덱스
+# 지운 행의 id 는 swpre_removed 에 남겨서 벡터 인덱스(Pinecone, 로컬 스냅샷, BM25)에서도 지우도록 함
+def _migrate_link_hash(db, cursor):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'swpre' AND column_name = 'link_hash'
+    """)
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute("ALTER TABLE swpre ADD COLUMN link_hash CHAR(64) AFTER link")
+    cursor.execute("UPDATE swpre SET link_hash = SHA2(link, 256)")
+    cursor.execute("INSERT IGNORE INTO swpre_removed (id) "
+                   "SELECT s1.id FROM swpre s1 JOIN swpre s2 ON s1.link_hash = s2.link_hash AND s1.id > s2.id")
+    cursor.execute("DELETE s1 FROM swpre s1 JOIN swpre s2 ON s1.link_hash = s2.link_hash AND s1.id > s2.id")
+    print(f"같은 링크로 중복 저장된 공지 {cursor.rowcount}건 정리")
+    db.commit()
+    cursor.execute("ALTER TABLE swpre ADD UNIQUE INDEX uq_swpre_link_hash (link_hash)")
+
+# 벡터 인덱스에서 지워야 할 공지 id
+def select_removed(cursor):
+    cursor.execute(CREATE_REMOVED_QUERY)
+    cursor.execute("SELECT id FROM swpre_removed")
+    return [str(row[0]) for row in cursor.fetchall()]
+
+def clear_removed(db, ids, batch_size=500):
+    ids = list(ids)
+    cursor = db.cursor()
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        cursor.execute(f"DELETE FROM swpre_removed WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+    db.commit()
+    cursor.close()
+
+class NoticeWriter:
+    def __init__(self, db, fetch_state=None, batch_size=SWPRE_BATCH_SIZE):
+        self.db = db
+        self.cursor = db.cursor()
+        self.fetch_state = fetch_state
+        self.batch_size = batch_size
+        self.written = 0
+        self.batches = 0
+        self._rows = []
+
+    # 저장된 공지의 링크 해시 전체 (증분 크롤링에서 새 공지 / 기존 공지를 행마다 조회하지 않고 구분)
+    def existing_links(self):
+        self.cursor.execute("SELECT link_hash FROM swpre")
+        return {row[0] for row in self.cursor.fetchall()}
+
+    # record: {"title", "link", "content", "image", "date"} (crawler.NoticeCrawler 의 save 로 그대로 넘길 수 있음)
+    def add(self, record):
+        self._rows.append((record["title"], record["link"], link_hash(record["link"]), record["content"],
+                           record["image"], record["date"]))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        rows, self._rows = self._rows, []
+        if rows:
+            self.cursor.executemany(UPSERT_QUERY if self.fetch_state else INSERT_IGNORE_QUERY, rows)
+        states = self.fetch_state.flush() if self.fetch_state else 0
+        if rows or states:
+            self.db.commit()
+            self.written += len(rows)
+            self.batches += 1
+            print(f"공지 {len(rows)}건 저장 (요청 상태 {states}건, 누적 {self.written}건 / {self.batches}회 커밋)")
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
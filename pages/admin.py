@@ -0,0 +1,27 @@
+import streamlit as st
+from config import ADMIN_USERNAMES, TRACE_WINDOW
+from tracing import stage_stats
+
+# 관리자 화면: 채팅 요청 단계별 지연 분포 (이 프로세스가 처리한 최근 요청 기준)
+st.set_page_config(page_title="한성대학교 챗봇 관리자")
+
+user = st.session_state.get('user')
+if not (st.session_state.get('logged_in') and user and user['username'] in ADMIN_USERNAMES):
+    st.error("관리자만 볼 수 있는 페이지입니다.")
+    st.stop()
+
+st.title("단계별 지연")
+st.caption(f"단계마다 최근 {TRACE_WINDOW}건 기준 (ms). chat.sources 는 출처 공지 카드까지, chat.ttft 는 첫 토큰까지, chat 은 답변 전체 시간입니다.")
+
+if st.button("새로고침"):
+    st.rerun()
+
+summary = stage_stats.summary()
+if not summary:
+    st.info("아직 기록된 요청이 없습니다.")
+else:
+    st.dataframe(
+        [{"단계": stage, **values} for stage, values in summary.items()],
+        use_container_width=True,
+        hide_index=True,
+    )
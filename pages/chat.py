@@ -1,6 +1,9 @@
 from dotenv import load_dotenv
 import streamlit as st
-from llm import get_ai_response
+import textwrap
+from llm import get_ai_events, match_faq_intent, record_exchange, estimate_chat_wait
+from rate_limit import RateLimitRejected
+from login import get_chat_session_id
 from PIL import Image
 from datetime import datetime
 import mysql.connector  # 공지사항 관리를 위한 데이터베이스 사용
@@ -18,6 +21,41 @@ def get_recent_notices(limit=3):
     cursor.execute("SELECT title, link, date FROM swpre ORDER BY date DESC LIMIT %s", (limit,))
     return cursor.fetchall() 
 
+# 답변에 참고한 공지 카드 (답변 생성 전에 검색 결과로 먼저 보여줌, 최근 공지 카드와 같은 모양을 가로로 배치)
+def show_source_cards(sources, language):
+    if not sources:
+        return
+    st.caption("참고한 공지" if language == '한국어' else "Related notices")
+    for column, source in zip(st.columns(min(len(sources), 3)), sources[:3]):
+        formatted_date = ""
+        if source.get("date"):
+            date = datetime.strptime(source["date"], "%Y-%m-%d")
+            formatted_date = date.strftime("%Y년 %m월 %d일") if language == '한국어' else date.strftime("%B %d, %Y")
+        column.markdown(
+            f"""
+            <div class = "source_notice" style='
+                border: 1px solid #ddd; 
+                border-radius: 8px; 
+                padding: 8px; 
+                margin-bottom: 8px; 
+            '>
+                <h5 style='margin: 0; font-size: 0.85em; text-align: center;'>{source["title"]}</h5>
+                <p style='margin: 6px 0; font-size: 0.75em; text-align: center;'>{formatted_date}</p>
+                <a href='{source["link"]}' target='_blank' style='
+                    text-decoration: none; 
+                    color: white; 
+                    background-color: #007BFF; 
+                    padding: 4px 8px; 
+                    border-radius: 4px; 
+                    font-size: 0.75em; 
+                    display: block; 
+                    text-align: center;
+                '>{'공지 보기' if language == '한국어' else 'View Notice'}</a>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
 icon_image = Image.open("./hansungbu.png")
 
 # 사용자 지정 아이콘으로 페이지 구성 설정
@@ -709,6 +747,81 @@ for i, (button_text, content) in enumerate(faq_content[language].items()):
                 if key != button_text:
                     st.session_state.faq_buttons[key] = False
 
+# FAQ 항목 내용 표시 (버튼을 눌렀을 때와 채팅 질문이 FAQ 의도로 매칭됐을 때 같은 화면)
+def show_faq_content(faq_key, language):
+    content = faq_content[language][faq_key]
+
+    # 시설 예약 섹션의 경우 추가적인 스타일 적용
+    if faq_key in ["📝 시설 예약", "📝 Facility"]:
+        sections = content.split("####")[1:]  # Split into individual sections
+        st.markdown("<div class='facility-container'>", unsafe_allow_html=True)
+        
+        for section in sections:
+            section_lines = section.strip().split("\n")
+            section_title = section_lines[0].strip()
+            section_content = "<br>".join(
+        line.strip().replace(
+            "https://", "<a href='https://"
+        ).replace(
+            ".do", ".do' target='_blank'>link</a>"
+        )
+        for line in section_lines[1:]
+    )
+
+            st.markdown(
+                f"""
+                <div class="facility-item" style="
+                    border: 1px solid #ddd;
+                    border-radius: 12px;
+                    padding: 20px;
+                    margin-bottom: 15px;
+                    background-color: #f7f7f7;
+                    box-shadow: 0 4px 10px rgba(0, 0, 0, 0.15);
+                ">
+                    <h4 style="color: #007BFF; margin-bottom: 10px; text-align: center;">{section_title}</h4>
+                    <p style="color: #555; line-height: 1.6; text-align: left; margin: 0;">{section_content}</p>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+        
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        # Default handling for other sections
+        st.markdown(
+            f"""
+            <div class="faq-content">
+                {content}
+            """,
+            unsafe_allow_html=True,
+        )
+
+    # 캠퍼스 맵
+    if faq_key in ["🗺️ 캠퍼스맵", "🗺️ Campus Map"]:
+        st.image(
+            "./image/map.png",
+            caption="한성대학교 캠퍼스맵" if language == '한국어' else "Hansung University Campus Map",
+            use_column_width=True
+        )
+
+    # 학식 사진 갤러리
+    if faq_key in ["🍴 학식", "🍴 Cafeteria"]:
+        st.markdown("#### 학식 사진" if language == '한국어' else "Cafeteria Photo")
+
+     # 각 이미지를 한 줄에 하나씩 세로로 표시
+        st.image(
+        "./image/10.jpg",
+         use_column_width=True
+      )
+        st.image(
+        "./image/11.jpg",
+        use_column_width=True
+    )
+        st.image(
+        "./image/12.jpg",
+        use_column_width=True
+    )
+
 for button_text, is_clicked in st.session_state.faq_buttons.items():
     if is_clicked:
         faq_key = button_text if language == '한국어' else {
@@ -722,79 +835,8 @@ for button_text, is_clicked in st.session_state.faq_buttons.items():
             st.error("해당 항목에 대한 정보를 찾을 수 없습니다." if language == "한국어" else "No information found for the selected category.")
             continue
 
-        content = faq_content[language][faq_key]
+        show_faq_content(faq_key, language)
 
-        # 시설 예약 섹션의 경우 추가적인 스타일 적용
-        if faq_key in ["📝 시설 예약", "📝 Facility"]:
-            sections = content.split("####")[1:]  # Split into individual sections
-            st.markdown("<div class='facility-container'>", unsafe_allow_html=True)
-            
-            for section in sections:
-                section_lines = section.strip().split("\n")
-                section_title = section_lines[0].strip()
-                section_content = "<br>".join(
-            line.strip().replace(
-                "https://", "<a href='https://"
-            ).replace(
-                ".do", ".do' target='_blank'>link</a>"
-            )
-            for line in section_lines[1:]
-        )
-
-                st.markdown(
-                    f"""
-                    <div class="facility-item" style="
-                        border: 1px solid #ddd;
-                        border-radius: 12px;
-                        padding: 20px;
-                        margin-bottom: 15px;
-                        background-color: #f7f7f7;
-                        box-shadow: 0 4px 10px rgba(0, 0, 0, 0.15);
-                    ">
-                        <h4 style="color: #007BFF; margin-bottom: 10px; text-align: center;">{section_title}</h4>
-                        <p style="color: #555; line-height: 1.6; text-align: left; margin: 0;">{section_content}</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            st.markdown("</div>", unsafe_allow_html=True)
-        else:
-            # Default handling for other sections
-            st.markdown(
-                f"""
-                <div class="faq-content">
-                    {content}
-                """,
-                unsafe_allow_html=True,
-            )
-
-        # 캠퍼스 맵
-        if faq_key in ["🗺️ 캠퍼스맵", "🗺️ Campus Map"]:
-            st.image(
-                "./image/map.png",
-                caption="한성대학교 캠퍼스맵" if language == '한국어' else "Hansung University Campus Map",
-                use_column_width=True
-            )
-
-        # 학식 사진 갤러리
-        if faq_key in ["🍴 학식", "🍴 Cafeteria"]:
-            st.markdown("#### 학식 사진" if language == '한국어' else "Cafeteria Photo")
-
-         # 각 이미지를 한 줄에 하나씩 세로로 표시
-            st.image(
-            "./image/10.jpg",
-             use_column_width=True
-          )
-            st.image(
-            "./image/11.jpg",
-            use_column_width=True
-        )
-            st.image(
-            "./image/12.jpg",
-            use_column_width=True
-        )
-            
 # 스타일 유지
 st.markdown("""
     <style>
@@ -921,6 +963,10 @@ if 'message_list' not in st.session_state:
 
 for message in st.session_state.message_list:
     with st.chat_message(message["role"]):
+        if message.get("faq_key") in faq_content[language]:
+            show_faq_content(message["faq_key"], language)
+            continue
+        show_source_cards(message.get("sources"), language)
         st.write(message["content"])
 
 # 사용자 입력 처리
@@ -930,10 +976,42 @@ if user_question := st.chat_input(placeholder="한성대에 관련된 궁금한
         st.write(user_question)
     st.session_state.message_list.append({"role": "user", "content": user_question})
 
-    # AI 응답 생성
-    spinner_message = "답변을 생성하는 중입니다..." if language == "한국어" else "Generating a response..."
-    with st.spinner(spinner_message):  # 언어에 따라 스피너 메시지 변경
-        ai_response = get_ai_response(user_question, language=language)  # 언어 인자 전달
+    # 자주 묻는 질문(학식, 캠퍼스맵, 등록금, 시설 예약)은 LLM 없이 FAQ 내용으로 바로 답변
+    faq_key = match_faq_intent(user_question, language)
+    # (버튼을 눌렀을 때와 같이 캠퍼스맵, 학식 사진도 표시)
+    if faq_key in faq_content[language]:
+        ai_message = textwrap.dedent(faq_content[language][faq_key]).strip()
         with st.chat_message("ai"):
-            ai_message = st.write_stream(ai_response)
-        st.session_state.message_list.append({"role": "ai", "content": ai_message})
+            show_faq_content(faq_key, language)
+        record_exchange(user_question, ai_message, session_id=get_chat_session_id())
+        st.session_state.message_list.append({"role": "ai", "content": ai_message, "faq_key": faq_key})
+    else:
+        # AI 응답 생성
+        spinner_message = "답변을 생성하는 중입니다..." if language == "한국어" else "Generating a response..."
+        # 요청이 몰려 OpenAI 한도 대기열에서 기다려야 하면 예상 대기 시간을 함께 보여줌
+        wait = estimate_chat_wait()
+        if wait is not None and wait[1] >= 1:
+            spinner_message += (f" (대기 {wait[0]}명, 약 {wait[1]:.0f}초)" if language == "한국어"
+                                else f" ({wait[0]} waiting, about {wait[1]:.0f}s)")
+        try:
+            with st.spinner(spinner_message):  # 언어에 따라 스피너 메시지 변경
+                ai_events = get_ai_events(user_question, language=language, session_id=get_chat_session_id())  # 언어 인자 및 사용자별 세션 전달
+                with st.chat_message("ai"):
+                    # 검색이 끝나면 출처 공지 카드를 먼저 그리고, 답변 토큰은 그 아래에 스트리밍
+                    source_area = st.container()
+                    answer = {"sources": []}
+
+                    def answer_tokens():
+                        for event in ai_events:
+                            if event["type"] == "sources":
+                                answer["sources"] = event["sources"]
+                                with source_area:
+                                    show_source_cards(event["sources"], language)
+                            elif event["type"] == "token":
+                                yield event["text"]
+
+                    ai_message = st.write_stream(answer_tokens())
+                st.session_state.message_list.append({"role": "ai", "content": ai_message, "sources": answer["sources"]})
+        except RateLimitRejected:
+            st.warning("지금 질문이 너무 많아요. 잠시 후 다시 시도해 주세요." if language == "한국어"
+                       else "Too many questions right now. Please try again in a moment.")
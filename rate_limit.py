@@ -0,0 +1,301 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from langchain_core.embeddings import Embeddings
+from config import (
+    OPENAI_RATE_LIMITS, OPENAI_CHAT_PROCESS_SHARE, OPENAI_BATCH_PROCESS_SHARE, BATCH_RATE_SHARE,
+    INTERACTIVE_QUEUE_LIMIT, BATCH_QUEUE_LIMIT,
+)
+from token_count import count_tokens
+
+# OpenAI 호출 속도 조절기 (모델별 분당 요청 수 / 분당 토큰 수 버킷)
+# - 호출 전에 tiktoken 으로 추정한 토큰 수만큼 버킷에서 차감하고, 부족하면 대기열에서 기다림
+# - 대화(interactive) 대기열이 배치(batch, 업로드 임베딩 등)보다 항상 먼저 처리되고,
+#   배치는 버킷의 BATCH_RATE_SHARE 까지만 써서 대화 요청의 여유분을 남김
+# - 대기열 길이에 상한을 두고, 마감 시간 안에 처리될 수 없는 요청은 기다리지 않고 바로 거절함
+# - 버킷은 프로세스 안에서만 공유되고 프로세스끼리는 조율하지 않으므로, 계정 한도를 프로세스 종류별로 나눠 씀
+#   (채팅 앱은 OPENAI_CHAT_PROCESS_SHARE, use_batch_process_limits() 를 호출한 업로드 스크립트는 OPENAI_BATCH_PROCESS_SHARE)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+class RateLimitRejected(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Bucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # amount 를 차감한 뒤에도 reserve 이상 남을 때까지 걸리는 시간
+    def seconds_until(self, amount, reserve=0.0):
+        return max(0.0, (amount + reserve - self.level) / self.rate)
+
+class _Waiter:
+    def __init__(self, tokens, lane, deadline, loop=None):
+        self.tokens = tokens
+        self.lane = lane
+        self.deadline = deadline
+        self.error = None
+        self.event = threading.Event() if loop is None else None
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self, error=None):
+        self.error = error
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+# 호출 후 실제 토큰 수로 버킷을 보정하기 위한 예약 정보
+class Reservation:
+    def __init__(self, governor, tokens):
+        self._governor = governor
+        self.tokens = tokens
+
+    def settle(self, actual_tokens):
+        self._governor._adjust(self.tokens - actual_tokens)
+        self.tokens = actual_tokens
+
+class RateGovernor:
+    def __init__(self, name, rpm, tpm, batch_share=BATCH_RATE_SHARE,
+                 max_queue=None):
+        self.name = name
+        self.batch_share = batch_share
+        self.max_queue = max_queue or {INTERACTIVE: INTERACTIVE_QUEUE_LIMIT, BATCH: BATCH_QUEUE_LIMIT}
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._queues = {lane: deque() for lane in LANES}
+        self._cooldown_until = 0.0
+        self._condition = threading.Condition()
+        self._thread = None
+        self.granted = 0
+        self.rejected = 0
+
+    def _reserve(self, lane, bucket):
+        return 0.0 if lane == INTERACTIVE else bucket.capacity * (1 - self.batch_share)
+
+    def _clamp(self, tokens, lane):
+        # 버킷보다 큰 요청도 언젠가는 통과하도록 한 번에 쓸 수 있는 양으로 자름
+        return min(tokens, self._tokens.capacity - self._reserve(lane, self._tokens))
+
+    # 지금 요청 하나(tokens)를 통과시키려면 기다려야 하는 시간
+    def _wait_for(self, tokens, lane, now):
+        return max(
+            self._cooldown_until - now,
+            self._requests.seconds_until(1, self._reserve(lane, self._requests)),
+            self._tokens.seconds_until(tokens, self._reserve(lane, self._tokens)),
+        )
+
+    # 같은 우선순위 이상의 대기 요청을 모두 처리한 뒤 이 요청이 통과할 때까지의 예상 시간
+    def _estimate_locked(self, tokens, lane, now):
+        ahead = [w for lane_name in LANES[:LANES.index(lane) + 1] for w in self._queues[lane_name]]
+        ahead_tokens = sum(w.tokens for w in ahead) + tokens
+        return max(
+            self._cooldown_until - now,
+            self._requests.seconds_until(len(ahead) + 1, self._reserve(lane, self._requests)),
+            self._tokens.seconds_until(ahead_tokens, self._reserve(lane, self._tokens)),
+        ), len(ahead)
+
+    # 채팅 화면에 보여줄 (앞선 대기 요청 수, 예상 대기 시간(초))
+    def estimate_wait(self, tokens, lane=INTERACTIVE):
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            wait, position = self._estimate_locked(self._clamp(tokens, lane), lane, now)
+            return position, wait
+
+    def _refill(self, now):
+        self._requests.refill(now)
+        self._tokens.refill(now)
+
+    def _consume(self, tokens):
+        self._requests.level -= 1
+        self._tokens.level -= tokens
+        self.granted += 1
+
+    def _enqueue(self, tokens, lane, deadline, loop=None):
+        if lane not in self._queues:
+            raise ValueError(f"알 수 없는 대기열: {lane}")
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            tokens = self._clamp(tokens, lane)
+            waiter = _Waiter(tokens, lane, now + deadline if deadline is not None else None, loop)
+
+            # 앞선 대기 요청이 없고 버킷에 여유가 있으면 바로 통과
+            if not any(self._queues[name] for name in LANES[:LANES.index(lane) + 1]) \
+                    and self._wait_for(tokens, lane, now) <= 0:
+                self._consume(tokens)
+                waiter.wake()
+                return waiter
+
+            if len(self._queues[lane]) >= self.max_queue[lane]:
+                self.rejected += 1
+                raise RateLimitRejected(f"{self.name} 대기열이 가득 찼습니다", retry_after=self._estimate_locked(tokens, lane, now)[0])
+            wait, _ = self._estimate_locked(tokens, lane, now)
+            if deadline is not None and wait > deadline:
+                self.rejected += 1
+                raise RateLimitRejected(f"{self.name} 예상 대기 {wait:.1f}초가 마감 {deadline:.1f}초를 넘습니다", retry_after=wait)
+
+            self._queues[lane].append(waiter)
+            self._ensure_dispatcher()
+            self._condition.notify_all()
+            return waiter
+
+    def _cancel(self, waiter):
+        with self._condition:
+            queue = self._queues[waiter.lane]
+            if waiter in queue:
+                queue.remove(waiter)
+                self._condition.notify_all()
+                return True
+            return False
+
+    def acquire(self, tokens, lane=INTERACTIVE, deadline=None):
+        waiter = self._enqueue(tokens, lane, deadline)
+        waiter.event.wait()
+        if waiter.error is not None:
+            raise waiter.error
+        return Reservation(self, waiter.tokens)
+
+    async def aacquire(self, tokens, lane=INTERACTIVE, deadline=None):
+        waiter = self._enqueue(tokens, lane, deadline, loop=asyncio.get_running_loop())
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # 대기 중에 요청이 취소되면 대기열에서 빼고, 이미 통과했다면 차감한 토큰을 돌려줌
+            if not self._cancel(waiter) and waiter.error is None:
+                self._adjust(waiter.tokens, requests=1)
+            raise
+        if waiter.error is not None:
+            raise waiter.error
+        return Reservation(self, waiter.tokens)
+
+    # 429 응답을 받으면 잠시 모든 요청을 멈춤
+    def cooldown(self, seconds):
+        with self._condition:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def _adjust(self, tokens, requests=0):
+        with self._condition:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + tokens)
+            self._requests.level = min(self._requests.capacity, self._requests.level + requests)
+            self._condition.notify_all()
+
+    def _ensure_dispatcher(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch_loop, name=f"rate-governor-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while True:
+                self._condition.wait(timeout=self._dispatch())
+
+    # 우선순위 순서로 통과 가능한 요청을 깨우고, 다음에 확인할 때까지의 시간을 반환
+    def _dispatch(self):
+        now = time.monotonic()
+        self._refill(now)
+        next_check = None
+
+        for lane in LANES:
+            queue = self._queues[lane]
+            # 마감 시간이 지난 요청은 거절
+            for waiter in [w for w in queue if w.deadline is not None and w.deadline < now]:
+                queue.remove(waiter)
+                self.rejected += 1
+                waiter.wake(RateLimitRejected(f"{self.name} 대기 시간이 마감을 넘었습니다"))
+            while queue:
+                wait = self._wait_for(queue[0].tokens, lane, now)
+                if wait > 0:
+                    next_check = wait
+                    break
+                waiter = queue.popleft()
+                self._consume(waiter.tokens)
+                waiter.wake()
+            if queue:
+                # 높은 우선순위 요청이 기다리는 동안 낮은 우선순위는 통과시키지 않음
+                deadlines = [w.deadline - now for name in LANES for w in self._queues[name] if w.deadline is not None]
+                if deadlines:
+                    next_check = min(next_check, max(min(deadlines), 0.0))
+                return max(next_check, 0.001)
+        return None
+
+_governors = {}
+_governors_lock = threading.Lock()
+# 이 프로세스가 쓰는 계정 한도 비율과 프로세스 안에서 배치 대기열이 쓸 수 있는 비율
+_process_share = OPENAI_CHAT_PROCESS_SHARE
+_batch_share = BATCH_RATE_SHARE
+
+# 업로드 스크립트 시작 시 호출: 버킷을 배치 프로세스 몫으로 만들고, 채팅 요청이 없으므로 배치 대기열이 전부 사용
+def use_batch_process_limits():
+    global _process_share, _batch_share
+    with _governors_lock:
+        _process_share = OPENAI_BATCH_PROCESS_SHARE
+        _batch_share = 1.0
+        _governors.clear()
+
+# 모델별 속도 조절기 (OPENAI_RATE_LIMITS 에 없는 모델은 제한하지 않음)
+def get_governor(model):
+    with _governors_lock:
+        governor = _governors.get(model)
+        if governor is None and model in OPENAI_RATE_LIMITS:
+            limits = OPENAI_RATE_LIMITS[model]
+            governor = RateGovernor(model, rpm=limits["rpm"] * _process_share, tpm=limits["tpm"] * _process_share,
+                                    batch_share=_batch_share)
+            _governors[model] = governor
+        return governor
+
+class _NoReservation:
+    def settle(self, actual_tokens):
+        pass
+
+def acquire(model, tokens, lane=INTERACTIVE, deadline=None):
+    governor = get_governor(model)
+    return governor.acquire(tokens, lane, deadline) if governor else _NoReservation()
+
+async def aacquire(model, tokens, lane=INTERACTIVE, deadline=None):
+    governor = get_governor(model)
+    return await governor.aacquire(tokens, lane, deadline) if governor else _NoReservation()
+
+# 임베딩 호출 전 속도 조절 (문서 임베딩은 batch_size 개씩 나눠서 배치 대기열로)
+class GovernedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model, lane=INTERACTIVE, deadline=None, batch_size=100):
+        self.embeddings = embeddings
+        self.model = model
+        self.lane = lane
+        self.deadline = deadline
+        self.batch_size = batch_size
+
+    def embed_query(self, text):
+        acquire(self.model, count_tokens(text), self.lane, self.deadline)
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text):
+        await aacquire(self.model, count_tokens(text), self.lane, self.deadline)
+        return await self.embeddings.aembed_query(text)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            acquire(self.model, sum(count_tokens(text) for text in batch), BATCH)
+            vectors.extend(self.embeddings.embed_documents(batch))
+        return vectors
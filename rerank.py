@@ -0,0 +1,86 @@
+import time
+import numpy as np
+from langchain_core.documents import Document
+from langchain_pinecone import PineconeVectorStore
+
+# 후보를 넉넉히 가져온 뒤 MMR(maximal marginal relevance)로 서로 다른 공지 k건을 고르는 재정렬 단계
+# (같은 공지의 재게시, 학과 게시판이 본 게시판을 그대로 옮긴 공지 등이 k칸을 모두 차지하지 않도록)
+
+DAY = 86400
+
+# 벡터 검색 결과를 (문서, 벡터) 목록으로 반환 (재정렬에 쓸 벡터를 같은 요청에서 함께 받음)
+def search_with_vectors(vectorstore, query_vector, k, filter=None):
+    if hasattr(vectorstore, "similarity_search_with_vectors"):
+        return vectorstore.similarity_search_with_vectors(query_vector, k=k, filter=filter)
+    if isinstance(vectorstore, PineconeVectorStore):
+        results = vectorstore._index.query(
+            vector=query_vector, top_k=k, include_metadata=True, include_values=True,
+            namespace=vectorstore._namespace, filter=filter,
+        )
+        pairs = []
+        for match in results["matches"]:
+            metadata = dict(match["metadata"])
+            text = metadata.pop(vectorstore._text_key, None)
+            if text is None:
+                continue
+            pairs.append((Document(id=match["id"], page_content=text, metadata=metadata), match["values"]))
+        return pairs
+    # 벡터를 돌려주지 않는 저장소는 재정렬 없이 검색만 함
+    return [(doc, None) for doc in vectorstore.similarity_search_by_vector(query_vector, k=k, filter=filter)]
+
+# BM25 에서만 찾은 후보의 벡터를 id 로 조회
+def fetch_vectors(vectorstore, ids):
+    if not ids:
+        return {}
+    if hasattr(vectorstore, "get_vectors"):
+        return vectorstore.get_vectors(ids)
+    if isinstance(vectorstore, PineconeVectorStore):
+        response = vectorstore._index.fetch(ids=list(ids), namespace=vectorstore._namespace)
+        return {doc_id: record["values"] for doc_id, record in response["vectors"].items()}
+    return {}
+
+# 게시일 기준 최신도 (half_life_days 가 지날 때마다 절반)
+def recency_scores(timestamps, half_life_days=30, now=None):
+    now = time.time() if now is None else now
+    age_days = np.maximum(now - np.asarray(timestamps, dtype=np.float64), 0) / DAY
+    return np.power(0.5, age_days / half_life_days)
+
+# 질문 벡터와 후보 벡터들의 코사인 유사도
+def cosine_scores(query_vector, candidate_vectors):
+    vectors = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    query = np.asarray(query_vector, dtype=np.float32)
+    return vectors @ (query / (np.linalg.norm(query) or 1.0))
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+# MMR 선택 순서 반환: 매 단계 lambda_mult * 관련도 - (1 - lambda_mult) * (이미 고른 후보와의 최대 유사도) 가 가장 큰 후보
+# 후보 간 유사도 행렬은 한 번만 계산하고, 단계마다 최대 유사도 벡터만 갱신함
+def mmr_order(query_vector, candidate_vectors, k, lambda_mult=0.5, recency=None, recency_weight=0.0):
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    n = len(vectors)
+    if n == 0:
+        return []
+    vectors = _normalize(vectors)
+    query = np.asarray(query_vector, dtype=np.float32)
+    relevance = vectors @ (query / (np.linalg.norm(query) or 1.0))
+    if recency is not None and recency_weight:
+        relevance = (1 - recency_weight) * relevance + recency_weight * np.asarray(recency, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = []
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(k, n)):
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return selected
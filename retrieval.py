@@ -0,0 +1,209 @@
+import asyncio
+import re
+import time
+from typing import Any, Optional
+from pydantic import ConfigDict
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from chunking import group_chunks
+from lexical_index import LexicalIndex
+from rerank import search_with_vectors, fetch_vectors, cosine_scores, recency_scores, mmr_order
+from token_count import count_tokens
+from temporal import widen_filter
+from tracing import record_stage
+
+# 문서 식별 키 (Pinecone/로컬/BM25 결과를 같은 공지로 묶기 위해 링크 기준, 청크는 청크 번호까지 구분)
+def document_key(document):
+    if "chunk_index" in document.metadata:
+        return f"{document.metadata.get('parent_id')}#{document.metadata['chunk_index']}"
+    return document.metadata.get("link") or document.id or document.page_content
+
+_LISTING_PATTERN = re.compile(
+    r"(다|전부|모두|모든|전체|싹|목록|리스트)\s*(알려|보여|정리|뭐|있)|뭐\s*(뭐\s*)?있|공지들|어떤\s*공지|무슨\s*공지|"
+    r"\b(all|list|every|any)\b"
+)
+
+# 기간 안의 공지를 나열해 달라는 질문인지 ("이번 주 공지 다 알려줘", "최근 공지 뭐 있어?")
+def is_listing_query(message):
+    return bool(_LISTING_PATTERN.search(message.lower()))
+
+# 청크가 속한 공지 식별 키
+def parent_key(document):
+    return document.metadata.get("parent_id") or document_key(document)
+
+# Reciprocal Rank Fusion: 여러 검색 결과의 순위를 1 / (rrf_k + rank) 합으로 합침
+def reciprocal_rank_fusion(result_lists, rrf_k=60):
+    scores = {}
+    documents = {}
+    for results in result_lists:
+        for rank, document in enumerate(results):
+            key = document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked]
+
+# 벡터 검색 + BM25(글자 n-gram) 검색 결과를 RRF로 합치는 검색기
+# 청크 단위로 색인된 경우 합친 결과를 공지별로 묶어 공지 k건을 돌려줌
+# 후보는 fetch_k 건까지 넉넉히 가져오고 MMR 로 비슷한 공지가 겹치지 않게 k건을 고름
+# search_kwargs 에 max_k 가 k 보다 크면 점수 분포와 토큰 예산으로 질문마다 1~max_k 건을 고름 (적응형 k)
+class HybridRetriever(BaseRetriever):
+    vectorstore: VectorStore
+    lexical_index: Optional[LexicalIndex] = None
+    search_kwargs: dict = {"k": 3}
+    fetch_k: int = 20
+    max_chunks_per_parent: int = 3
+    rrf_k: int = 60
+    use_lexical: bool = True
+    use_mmr: bool = True
+    mmr_lambda: float = 0.5
+    recency_weight: float = 0.1
+    recency_half_life_days: float = 30.0
+    widen_steps_days: tuple = (1, 3, 7, 30)
+    min_similarity: float = 0.25
+    score_cliff: float = 0.08
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 질문 임베딩은 요청마다 한 번만 만들고 날짜 범위를 넓혀 다시 검색할 때도 그대로 씀
+    def _search(self, query, query_vector, k, date_filter):
+        fetch_k = max(k, self.fetch_k)
+
+        start = time.perf_counter()
+        vector_results = search_with_vectors(self.vectorstore, query_vector, fetch_k, date_filter)
+        vector_docs = [doc for doc, _ in vector_results]
+        record_stage("retrieve.vector", (time.perf_counter() - start) * 1000, results=len(vector_docs))
+
+        lexical_docs = []
+        if self.use_lexical and self.lexical_index is not None:
+            start = time.perf_counter()
+            lexical_docs = [doc for doc, _ in self.lexical_index.search(query, k=fetch_k, filter=date_filter)]
+            record_stage("retrieve.lexical", (time.perf_counter() - start) * 1000, results=len(lexical_docs))
+
+        start = time.perf_counter()
+        fused = reciprocal_rank_fusion([vector_docs, lexical_docs], rrf_k=self.rrf_k)
+        documents = group_chunks(fused, self.max_chunks_per_parent)
+        record_stage("retrieve.fusion", (time.perf_counter() - start) * 1000)
+
+        # 공지마다 가장 순위가 높은 청크의 벡터로 질문 유사도(score)를 매기고 MMR 로 서로 다른 공지 k건을 앞에 둠
+        start = time.perf_counter()
+        candidate_vectors = self._candidate_vectors(documents, fused, vector_results)
+        if candidate_vectors is not None:
+            for doc, score in zip(documents, cosine_scores(query_vector, candidate_vectors)):
+                doc.metadata["score"] = round(float(score), 4)
+            if self.use_mmr and len(documents) > k:
+                recency = None
+                if self.recency_weight:
+                    recency = recency_scores([doc.metadata.get("expiry_date", 0) for doc in documents],
+                                             self.recency_half_life_days)
+                order = mmr_order(query_vector, candidate_vectors, k, self.mmr_lambda, recency, self.recency_weight)
+                chosen = set(order)
+                documents = [documents[i] for i in order] + [doc for i, doc in enumerate(documents) if i not in chosen]
+        record_stage("retrieve.mmr", (time.perf_counter() - start) * 1000)
+        return documents
+
+    # 공지별 대표 벡터 (BM25 에서만 찾은 후보는 id 로 조회, 하나라도 없으면 None)
+    def _candidate_vectors(self, documents, fused, vector_results):
+        vectors = {}
+        for doc, vector in vector_results:
+            if vector is not None:
+                vectors.setdefault(document_key(doc), vector)
+        best_chunk = {}
+        for doc in fused:
+            best_chunk.setdefault(parent_key(doc), doc)
+        missing = [best_chunk[parent_key(doc)] for doc in documents
+                   if document_key(best_chunk[parent_key(doc)]) not in vectors]
+        if missing:
+            fetched = fetch_vectors(self.vectorstore, [doc.id for doc in missing if doc.id])
+            for doc in missing:
+                if doc.id in fetched:
+                    vectors[document_key(doc)] = fetched[doc.id]
+
+        candidate_vectors = [vectors.get(document_key(best_chunk[parent_key(doc)])) for doc in documents]
+        if any(vector is None for vector in candidate_vectors):
+            return None
+        return candidate_vectors
+
+    # 적응형 k: 점수가 min_similarity 아래로 떨어지거나 직전 점수보다 score_cliff 이상 급락하면 멈추고,
+    # 문서 토큰 합이 token_budget 을 넘지 않을 때까지만 담음 (최소 min_k 건)
+    def _adaptive_cut(self, documents, min_k):
+        min_similarity = self.search_kwargs.get("min_similarity", self.min_similarity)
+        score_cliff = self.search_kwargs.get("score_cliff", self.score_cliff)
+        token_budget = self.search_kwargs.get("token_budget")
+        document_token_limit = self.search_kwargs.get("document_token_limit")
+
+        start = time.perf_counter()
+        scores = [doc.metadata.get("score") for doc in documents]
+        reason = "max_k"
+        if any(score is None for score in scores):
+            reason = "no_scores"
+            documents = documents[:max(min_k, self.search_kwargs.get("k", 3))]
+        else:
+            # 몇 건을 담을지는 점수 분포로 정하고, 문서는 MMR 순서의 앞에서부터 그만큼 담음
+            # (점수 임계값으로 거르면 MMR 이 앞에 둔 점수가 조금 낮은 다른 공지가 빠짐)
+            ranked = sorted(scores, reverse=True)
+            count = len(ranked)
+            for i in range(min_k, len(ranked)):
+                if ranked[i] < min_similarity:
+                    reason, count = "min_similarity", i
+                    break
+                if ranked[i - 1] - ranked[i] > score_cliff:
+                    reason, count = "score_cliff", i
+                    break
+            documents = documents[:count]
+
+        if token_budget:
+            kept = []
+            used = 0
+            for doc in documents:
+                tokens = count_tokens(doc.page_content)
+                if document_token_limit:
+                    tokens = min(tokens, document_token_limit)
+                if kept and used + tokens > token_budget:
+                    reason = "token_budget"
+                    break
+                kept.append(doc)
+                used += tokens
+            documents = kept
+
+        record_stage("retrieve.adaptive_k", (time.perf_counter() - start) * 1000,
+                     documents=len(documents), reason=reason)
+        return documents
+
+    def _retrieve(self, query, query_vector):
+        k = self.search_kwargs.get("k", 3)
+        max_k = self.search_kwargs.get("max_k", k)
+        date_filter = self.search_kwargs.get("filter")
+        documents = self._search(query, query_vector, max_k, date_filter)[:max_k]
+
+        # 날짜 필터 결과가 k개보다 적으면 같은 요청 안에서 범위를 점점 넓혀 다시 검색
+        if date_filter and "expiry_date" in date_filter:
+            for pad_days in self.widen_steps_days:
+                if len(documents) >= k:
+                    break
+                widened = widen_filter(date_filter, pad_days)
+                print(f"검색 결과 {len(documents)}건 < {k}건, 날짜 범위 ±{pad_days}일 확장")
+                seen = {document_key(doc) for doc in documents}
+                for doc in self._search(query, query_vector, k, widened):
+                    if len(documents) >= k:
+                        break
+                    if document_key(doc) not in seen:
+                        documents.append(doc)
+                        seen.add(document_key(doc))
+
+        if max_k > k:
+            documents = self._adaptive_cut(documents, self.search_kwargs.get("min_k", 1))
+        return documents
+
+    def _get_relevant_documents(self, query: str, *, run_manager: Any) -> list:
+        start = time.perf_counter()
+        query_vector = self.vectorstore.embeddings.embed_query(query)
+        record_stage("retrieve.embed", (time.perf_counter() - start) * 1000)
+        return self._retrieve(query, query_vector)
+
+    # 질문 임베딩(속도 조절 대기 포함)은 이벤트 루프에서 기다리고, 블로킹 검색만 스레드에서 실행
+    async def _aget_relevant_documents(self, query: str, *, run_manager: Any) -> list:
+        start = time.perf_counter()
+        query_vector = await self.vectorstore.embeddings.aembed_query(query)
+        record_stage("retrieve.embed", (time.perf_counter() - start) * 1000)
+        return await asyncio.to_thread(self._retrieve, query, query_vector)
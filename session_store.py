@@ -0,0 +1,243 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, SystemMessage, message_to_dict, messages_from_dict
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+# 세션(사용자)별 대화 기록 저장소
+# - 세션 수와 세션당 메시지 수에 상한을 두고, 오래 사용하지 않은 세션은 삭제함
+# - CHAT_HISTORY_URL 이 설정되면 SQLite/MySQL 에 저장해 여러 서버 프로세스가 기록을 공유함
+
+# 메시지 상한을 넘으면 오래된 메시지부터 (질문/답변 쌍 단위로) 버림
+# 맨 앞의 대화 요약(SystemMessage)은 유지
+def _trim(messages, max_messages):
+    overflow = len(messages) - max_messages
+    if overflow <= 0:
+        return messages
+    if isinstance(messages[0], SystemMessage):
+        rest = messages[1:]
+        overflow = len(rest) - (max_messages - 1)
+        overflow += overflow % 2
+        return messages[:1] + rest[overflow:]
+    overflow += overflow % 2
+    return messages[overflow:]
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, max_messages):
+        self.max_messages = max_messages
+        self.messages: List[BaseMessage] = []
+        self.last_access = time.time()
+        self._lock = threading.Lock()
+
+    def add_messages(self, messages):
+        with self._lock:
+            self.messages = _trim(self.messages + list(messages), self.max_messages)
+            self.last_access = time.time()
+
+    # 기록이 prefix 로 시작하면 그 부분만 replacement 로 바꿈 (그 사이 추가된 메시지는 유지), 바꿨으면 True
+    def replace_prefix(self, prefix, replacement):
+        with self._lock:
+            if self.messages[:len(prefix)] != list(prefix):
+                return False
+            self.messages = list(replacement) + self.messages[len(prefix):]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+
+class InMemorySessionStore:
+    def __init__(self, max_sessions=1000, max_messages=20, idle_ttl_seconds=3600):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id) -> BaseChatMessageHistory:
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = BoundedChatMessageHistory(self.max_messages)
+                self._sessions[session_id] = history
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            history.last_access = now
+            return history
+
+    def _evict_idle(self, now):
+        # LRU 순서이므로 앞쪽(가장 오래 사용하지 않은 세션)부터 확인
+        while self._sessions:
+            session_id, history = next(iter(self._sessions.items()))
+            if now - history.last_access <= self.idle_ttl_seconds:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+class SQLChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, store, session_id):
+        self._store = store
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self._store.load_messages(self.session_id)
+
+    def add_messages(self, messages):
+        self._store.append_messages(self.session_id, messages)
+
+    def replace_prefix(self, prefix, replacement):
+        return self._store.replace_prefix(self.session_id, prefix, replacement)
+
+    def clear(self):
+        self._store.delete_session(self.session_id)
+
+class SQLSessionStore:
+    def __init__(self, url, max_sessions=10000, max_messages=20, idle_ttl_seconds=86400):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._engine = create_engine(url, pool_pre_ping=True)
+        self._last_eviction = 0.0
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id VARCHAR(255) PRIMARY KEY, last_access DOUBLE PRECISION NOT NULL)"
+            ))
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                "session_id VARCHAR(255) NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, seq))"
+            ))
+
+    def get(self, session_id) -> BaseChatMessageHistory:
+        self._evict_if_due()
+        return SQLChatMessageHistory(self, session_id)
+
+    def load_messages(self, session_id):
+        with self._engine.begin() as connection:
+            rows = connection.execute(
+                text("SELECT message FROM chat_messages WHERE session_id = :session_id ORDER BY seq"),
+                {"session_id": session_id},
+            ).fetchall()
+            self._touch(connection, session_id)
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    # 세션 행을 먼저 갱신(잠금)한 뒤 work(connection) 를 한 트랜잭션으로 실행
+    # 같은 세션을 동시에 고치는 다른 프로세스는 커밋될 때까지 기다리므로 seq 계산이 겹치지 않음
+    # (처음 만드는 세션을 두 프로세스가 동시에 추가해 세션 행 INSERT 가 충돌하면 다시 시도)
+    def _locked(self, session_id, work, attempts=3):
+        for attempt in range(attempts):
+            try:
+                with self._engine.begin() as connection:
+                    self._touch(connection, session_id)
+                    return work(connection)
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+
+    def append_messages(self, session_id, messages):
+        self._locked(session_id, lambda connection: self._append(connection, session_id, messages))
+
+    def _append(self, connection, session_id, messages):
+        last_seq = connection.execute(
+            text("SELECT COALESCE(MAX(seq), 0) FROM chat_messages WHERE session_id = :session_id"),
+            {"session_id": session_id},
+        ).scalar()
+        connection.execute(
+            text("INSERT INTO chat_messages (session_id, seq, message) VALUES (:session_id, :seq, :message)"),
+            [
+                {"session_id": session_id, "seq": last_seq + i + 1,
+                 "message": json.dumps(message_to_dict(message), ensure_ascii=False)}
+                for i, message in enumerate(messages)
+            ],
+        )
+        # 메시지 상한 유지 (짝수 개로 맞춰 질문/답변 쌍이 깨지지 않도록, 대화 요약 메시지는 유지)
+        keep = self.max_messages - self.max_messages % 2
+        connection.execute(
+            text("DELETE FROM chat_messages WHERE session_id = :session_id AND seq <= :cutoff "
+                 "AND message NOT LIKE :summary"),
+            {"session_id": session_id, "cutoff": last_seq + len(messages) - keep,
+             "summary": '{"type": "system"%'},
+        )
+
+    # 확인과 교체를 세션 잠금 안의 한 트랜잭션으로 처리 (다른 프로세스가 빈 기록을 보거나 추가한 메시지를 잃지 않음)
+    def replace_prefix(self, session_id, prefix, replacement):
+        return self._locked(session_id, lambda connection: self._replace_prefix(connection, session_id, prefix, replacement))
+
+    def _replace_prefix(self, connection, session_id, prefix, replacement):
+        rows = connection.execute(
+            text("SELECT seq, message FROM chat_messages WHERE session_id = :session_id ORDER BY seq LIMIT :count"),
+            {"session_id": session_id, "count": len(prefix)},
+        ).fetchall()
+        if len(rows) < len(prefix) or messages_from_dict([json.loads(row[1]) for row in rows]) != list(prefix):
+            return False
+        last_seq = rows[-1][0] if rows else 0
+        connection.execute(
+            text("DELETE FROM chat_messages WHERE session_id = :session_id AND seq <= :last_seq"),
+            {"session_id": session_id, "last_seq": last_seq},
+        )
+        # 남은 메시지보다 앞 번호로 넣어 순서 유지
+        if replacement:
+            connection.execute(
+                text("INSERT INTO chat_messages (session_id, seq, message) VALUES (:session_id, :seq, :message)"),
+                [
+                    {"session_id": session_id, "seq": last_seq - len(replacement) + i + 1,
+                     "message": json.dumps(message_to_dict(message), ensure_ascii=False)}
+                    for i, message in enumerate(replacement)
+                ],
+            )
+        return True
+
+    def delete_session(self, session_id):
+        with self._engine.begin() as connection:
+            connection.execute(text("DELETE FROM chat_messages WHERE session_id = :session_id"), {"session_id": session_id})
+            connection.execute(text("DELETE FROM chat_sessions WHERE session_id = :session_id"), {"session_id": session_id})
+
+    def _touch(self, connection, session_id):
+        params = {"session_id": session_id, "now": time.time()}
+        updated = connection.execute(
+            text("UPDATE chat_sessions SET last_access = :now WHERE session_id = :session_id"), params
+        ).rowcount
+        if not updated:
+            connection.execute(text("INSERT INTO chat_sessions (session_id, last_access) VALUES (:session_id, :now)"), params)
+
+    # 유휴 세션 삭제 및 세션 수 상한 유지 (최대 1분에 한 번)
+    def _evict_if_due(self):
+        now = time.time()
+        if now - self._last_eviction < 60:
+            return
+        self._last_eviction = now
+        with self._engine.begin() as connection:
+            expired = [row[0] for row in connection.execute(
+                text("SELECT session_id FROM chat_sessions WHERE last_access < :cutoff"),
+                {"cutoff": now - self.idle_ttl_seconds},
+            )]
+            count = connection.execute(text("SELECT COUNT(*) FROM chat_sessions")).scalar() - len(expired)
+            if count > self.max_sessions:
+                expired += [row[0] for row in connection.execute(
+                    text("SELECT session_id FROM chat_sessions WHERE last_access >= :cutoff "
+                         "ORDER BY last_access LIMIT :overflow"),
+                    {"cutoff": now - self.idle_ttl_seconds, "overflow": count - self.max_sessions},
+                )]
+            for session_id in expired:
+                connection.execute(text("DELETE FROM chat_messages WHERE session_id = :session_id"), {"session_id": session_id})
+                connection.execute(text("DELETE FROM chat_sessions WHERE session_id = :session_id"), {"session_id": session_id})
+
+# 설정에 따라 저장소 생성 (URL 이 없으면 프로세스 메모리에 보관)
+def create_session_store(url=None, **kwargs):
+    if url:
+        return SQLSessionStore(url, **kwargs)
+    return InMemorySessionStore(**kwargs)
@@ -0,0 +1,84 @@
+import asyncio
+
+# 같은 질문이 처리 중일 때 들어온 요청은 새로 생성하지 않고 진행 중인 스트림을 함께 받음 (single-flight)
+# - 생성은 첫 요청(리더)과 분리된 태스크에서 실행되므로 리더가 먼저 연결을 끊어도 다른 구독자는 끝까지 받음
+# - 늦게 합류한 구독자는 그때까지 나온 토큰을 먼저 받은 뒤 이어서 받음
+# - 모든 호출은 같은 이벤트 루프(llm.get_event_loop) 안에서 이루어짐
+
+class Flight:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.value = None       # 생성 함수가 스트림 외에 남기는 결과 (예: 대화 기록용 한국어 원문 답변)
+        self.subscribers = 0
+        self.task = None
+        self._condition = asyncio.Condition()
+
+    async def _publish(self, chunk):
+        async with self._condition:
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    async def _finish(self, error=None):
+        async with self._condition:
+            self.error = error
+            self.done = True
+            self._condition.notify_all()
+
+    async def subscribe(self):
+        position = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: len(self.chunks) > position or self.done)
+                chunks = self.chunks[position:]
+                finished = self.done
+            position += len(chunks)
+            for chunk in chunks:
+                yield chunk
+            if finished and position == len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self.started = 0
+        self.joined = 0
+
+    # key 가 같은 생성이 진행 중이면 합류하고, 아니면 producer(flight) 로 새로 시작
+    # (flight, 구독 스트림, 리더 여부) 반환, key 가 None 이면 공유하지 않음
+    def join(self, key, producer):
+        flight = self._flights.get(key) if key is not None else None
+        leader = flight is None
+        if leader:
+            flight = Flight()
+            if key is not None:
+                self._flights[key] = flight
+            self.started += 1
+            flight.task = asyncio.create_task(self._run(key, flight, producer))
+        else:
+            self.joined += 1
+        flight.subscribers += 1
+        if not leader:
+            print(f"진행 중인 동일 질문에 합류 (구독자 {flight.subscribers}명, 누적 합류 {self.joined}건)")
+        return flight, flight.subscribe(), leader
+
+    async def _run(self, key, flight, producer):
+        try:
+            async for chunk in producer(flight):
+                await flight._publish(chunk)
+        except BaseException as e:
+            # 취소된 경우에도 구독자가 기다리지 않도록 끝났음을 알림
+            await flight._finish(e if isinstance(e, Exception) else RuntimeError("답변 생성이 취소되었습니다"))
+            if not isinstance(e, Exception):
+                raise
+        else:
+            await flight._finish()
+        finally:
+            if key is not None and self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
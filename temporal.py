@@ -0,0 +1,285 @@
+import re
+from datetime import datetime, timedelta
+
+# 질문 속 시간 표현(한국어/영어, 상대/절대)을 공지 게시일(expiry_date) 범위로 변환하는 파서
+# 모든 정규식은 모듈 로드 시 한 번만 컴파일함
+
+DAY = 86400
+
+class TimeRange:
+    def __init__(self, start, end, label):
+        self.start = start  # datetime (포함)
+        self.end = end      # datetime (포함) 또는 None (현재까지 열린 범위)
+        self.label = label
+
+    def to_filter(self):
+        condition = {"$gte": int(self.start.timestamp())}
+        if self.end is not None:
+            condition["$lte"] = int(self.end.timestamp())
+        return {"expiry_date": condition}
+
+    def __repr__(self):
+        return f"TimeRange({self.label!r}, {self.start}, {self.end})"
+
+def _start_of_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _day_range(day, label):
+    start = _start_of_day(day)
+    return TimeRange(start, start + timedelta(days=1) - timedelta(seconds=1), label)
+
+# 주의 시작은 기존 동작과 같이 일요일
+def _week_range(day, label):
+    start = _start_of_day(day) - timedelta(days=(day.weekday() + 1) % 7)
+    return TimeRange(start, start + timedelta(days=7) - timedelta(seconds=1), label)
+
+def _month_range(year, month, label):
+    start = datetime(year, month, 1)
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    return TimeRange(start, next_month - timedelta(seconds=1), label)
+
+def _shift_month(year, month, offset):
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+def _year_range(year, label):
+    return TimeRange(datetime(year, 1, 1), datetime(year + 1, 1, 1) - timedelta(seconds=1), label)
+
+# 연도가 없는 '12월' 같은 표현은 아직 오지 않은 달이면 작년으로 해석 (게시일은 미래일 수 없음)
+def _recent_year(now, month):
+    return now.year if month <= now.month else now.year - 1
+
+# 연도가 없는 '12월 25일' 도 같은 규칙으로 오늘 이후면 작년 날짜로 해석
+def _recent_date(now, month, day):
+    year = now.year if (month, day) <= (now.month, now.day) else now.year - 1
+    return datetime(year, month, day)
+
+# 달이 없는 '25일' 은 오늘보다 뒤의 날이면 지난달 날짜로 해석
+def _recent_day(now, day):
+    year, month = (now.year, now.month) if day <= now.day else _shift_month(now.year, now.month, -1)
+    return datetime(year, month, day)
+
+_MONTHS_EN = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH_EN_PATTERN = (
+    r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+
+_ISO_DATE = re.compile(r"(?<!\d)(\d{4})\s*[-./]\s*(\d{1,2})\s*[-./]\s*(\d{1,2})(?!\d)")
+_KO_DATE = re.compile(r"(?:(\d{4})\s*년\s*)?(?<!\d)(\d{1,2})\s*월\s*(\d{1,2})\s*일")
+_EN_DATE = re.compile(r"\b" + _MONTH_EN_PATTERN + r"\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s*(\d{4}))?")
+# 연/월 없이 날짜만 있는 표현('25일', '11/25')은 게시를 뜻하는 말이 뒤따를 때만 날짜로 해석
+# ('1일 1식 이벤트', '1/2 확률' 같은 숫자는 무시)
+_POSTED_CONTEXT = r"\s*(?:자|에|날)?\s*(?:올라온|올라왔|올린|게시|등록|나온|발표|공지|notices?|announcements?|posts?|posted)"
+_SLASH_DATE = re.compile(r"(?<![\d/])(\d{1,2})/(\d{1,2})(?![\d/])(?=" + _POSTED_CONTEXT + ")")
+# 'N일 전', 'N주 이내', '최근 N개월', '지난 N일 동안' ('동안/간' 은 기간 길이일 수 있어 최근/지난이 앞에 올 때만)
+_KO_RELATIVE_N = re.compile(r"(?:(최근|지난)\s*)?(?<!\d)(\d{1,3})\s*(일|주일?|개월|달)\s*(전|이내|동안|간)?")
+_EN_RELATIVE_N = re.compile(r"\b(?:(\d{1,3})\s+(day|week|month)s?\s+ago|(?:past|last|previous)\s+(\d{1,3})\s+(day|week|month)s?)\b")
+_KO_MONTH = re.compile(r"(?:(\d{4})\s*년\s*)?(?<!\d)(\d{1,2})\s*월(?!\s*\d)")
+_EN_MONTH = re.compile(r"\b(in\s+)?" + _MONTH_EN_PATTERN + r"\b(?:\s+(\d{4}))?")
+_KO_YEAR = re.compile(r"(?<!\d)(\d{4})\s*년(?!\s*\d)")
+_KO_DAY = re.compile(r"(?<![\d.\-/])(\d{1,2})\s*일(?=" + _POSTED_CONTEXT + ")")
+
+# 키워드 기반 상대 표현 (긴 표현부터 매칭되도록 정렬)
+_KEYWORDS = {
+    "today": ["오늘", "금일", "today"],
+    "yesterday": ["어제", "yesterday"],
+    "day_before_yesterday": ["그저께", "그제", "엊그제", "day before yesterday"],
+    "tomorrow": ["내일", "tomorrow"],
+    "day_after_tomorrow": ["모레", "day after tomorrow"],
+    "this_week": ["이번 주", "이번주", "금주", "this week"],
+    "last_week": ["지난 주", "지난주", "저번 주", "저번주", "last week"],
+    "next_week": ["다음 주", "다음주", "next week"],
+    "this_month": ["이번 달", "이번달", "이달", "this month"],
+    "last_month": ["지난 달", "지난달", "저번 달", "저번달", "last month"],
+    "next_month": ["다음 달", "다음달", "next month"],
+    "this_year": ["올해", "금년", "this year"],
+    "last_year": ["작년", "지난해", "last year"],
+    "recent": ["최근", "최신", "요즘", "recent", "latest", "newest"],
+}
+_KEYWORD_LABELS = {phrase: label for label, phrases in _KEYWORDS.items() for phrase in phrases}
+
+# 단어 중간에서는 매칭하지 않음 ('안내일정' 의 '내일', 'todays' 의 'today')
+# - 영어: 앞뒤 모두 단어 경계
+# - 한국어: 앞에 한글/영문/숫자가 붙으면 제외 (뒤에는 '오늘의', '이번주에' 처럼 조사가 바로 붙으므로 한글 허용)
+def _keyword_regex(phrase):
+    if phrase.isascii():
+        return rf"\b{re.escape(phrase)}\b"
+    return rf"(?<![가-힣a-z0-9]){re.escape(phrase)}"
+
+_KEYWORD_PATTERN = re.compile(
+    "|".join(_keyword_regex(phrase) for phrase in sorted(_KEYWORD_LABELS, key=len, reverse=True))
+)
+
+# 미래 기간: 게시일은 미래일 수 없으므로 날짜 필터를 쓰지 않음 ('다음 주 일정' 은 최근 공지에 있음)
+_FUTURE_LABELS = {"tomorrow", "day_after_tomorrow", "next_week", "next_month"}
+
+# '최근' 기간 (일)
+RECENT_DAYS = 7
+
+def _keyword_range(label, now):
+    today = _start_of_day(now)
+    if label == "today":
+        return _day_range(today, label)
+    if label == "yesterday":
+        return _day_range(today - timedelta(days=1), label)
+    if label == "day_before_yesterday":
+        return _day_range(today - timedelta(days=2), label)
+    if label == "tomorrow":
+        return _day_range(today + timedelta(days=1), label)
+    if label == "day_after_tomorrow":
+        return _day_range(today + timedelta(days=2), label)
+    if label == "this_week":
+        return _week_range(today, label)
+    if label == "last_week":
+        return _week_range(today - timedelta(days=7), label)
+    if label == "next_week":
+        return _week_range(today + timedelta(days=7), label)
+    if label == "this_month":
+        return _month_range(now.year, now.month, label)
+    if label == "last_month":
+        return _month_range(*_shift_month(now.year, now.month, -1), label)
+    if label == "next_month":
+        return _month_range(*_shift_month(now.year, now.month, 1), label)
+    if label == "this_year":
+        return _year_range(now.year, label)
+    if label == "last_year":
+        return _year_range(now.year - 1, label)
+    # 최근: 일 단위로 맞춘 열린 범위 (같은 날에는 같은 필터가 나오도록)
+    return TimeRange(today - timedelta(days=RECENT_DAYS), None, label)
+
+def _relative_n_range(amount, unit, mode, now):
+    today = _start_of_day(now)
+    if unit in ("일", "day"):
+        delta = timedelta(days=amount)
+    elif unit in ("주", "주일", "week"):
+        delta = timedelta(days=7 * amount)
+    else:
+        delta = None
+
+    if mode == "전":
+        # 'N일 전' 은 그 날, 'N주 전' 은 그 주, 'N개월 전' 은 그 달
+        if unit in ("일", "day"):
+            return _day_range(today - delta, f"{amount}{unit}_ago")
+        if delta is not None:
+            return _week_range(today - delta, f"{amount}{unit}_ago")
+        return _month_range(*_shift_month(now.year, now.month, -amount), f"{amount}{unit}_ago")
+
+    # 'N일 이내/동안' 은 N 단위 전부터 오늘까지
+    if delta is not None:
+        start = today - delta
+    else:
+        year, month = _shift_month(now.year, now.month, -amount)
+        start = today.replace(year=year, month=month, day=min(today.day, 28))
+    return TimeRange(start, today + timedelta(days=1) - timedelta(seconds=1), f"last_{amount}{unit}")
+
+def _safe(builder):
+    try:
+        return builder()
+    except ValueError:
+        # 2월 30일 같은 잘못된 날짜 (다른 표현으로 넘어가지 않고 날짜 필터 없음)
+        return None
+
+# 상대 기간 표현 (접두어도 접미어도 없는 'N일' 이나 최근/지난 없는 'N일 동안' 은 건너뜀)
+def _ko_relative_n(text, now):
+    for match in _KO_RELATIVE_N.finditer(text):
+        prefix, amount, unit, mode = match.groups()
+        if mode in (None, "동안", "간") and prefix is None:
+            continue
+        return _relative_n_range(int(amount), unit, mode if mode == "전" else "이내", now)
+    return None
+
+# 질문에서 시간 범위를 추출 (없으면 None)
+def parse_time_range(message, now=None):
+    now = now or datetime.now()
+    text = message.lower()
+
+    match = _ISO_DATE.search(text)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+        return _safe(lambda: _day_range(datetime(year, month, day), "date"))
+
+    match = _KO_DATE.search(text)
+    if match:
+        month, day = int(match.group(2)), int(match.group(3))
+        if match.group(1):
+            return _safe(lambda: _day_range(datetime(int(match.group(1)), month, day), "date"))
+        return _safe(lambda: _day_range(_recent_date(now, month, day), "date"))
+
+    match = _EN_DATE.search(text)
+    if match:
+        month, day = _MONTHS_EN[match.group(1)[:3]], int(match.group(2))
+        if match.group(3):
+            return _safe(lambda: _day_range(datetime(int(match.group(3)), month, day), "date"))
+        return _safe(lambda: _day_range(_recent_date(now, month, day), "date"))
+
+    match = _SLASH_DATE.search(text)
+    if match:
+        month, day = int(match.group(1)), int(match.group(2))
+        return _safe(lambda: _day_range(_recent_date(now, month, day), "date"))
+
+    result = _ko_relative_n(text, now)
+    if result:
+        return result
+
+    match = _EN_RELATIVE_N.search(text)
+    if match:
+        if match.group(1):
+            return _relative_n_range(int(match.group(1)), match.group(2), "전", now)
+        return _relative_n_range(int(match.group(3)), match.group(4), "이내", now)
+
+    match = _KO_MONTH.search(text)
+    if match:
+        month = int(match.group(2))
+        if not 1 <= month <= 12:
+            return None
+        year = int(match.group(1)) if match.group(1) else _recent_year(now, month)
+        return _month_range(year, month, "month")
+
+    # 조동사 'may' 는 'in May' 나 연도가 붙은 경우에만 달로 해석
+    for match in _EN_MONTH.finditer(text):
+        in_prefix, name, year = match.groups()
+        if name == "may" and not in_prefix and not year:
+            continue
+        month = _MONTHS_EN[name[:3]]
+        year = int(year) if year else _recent_year(now, month)
+        return _month_range(year, month, "month")
+
+    match = _KEYWORD_PATTERN.search(text)
+    if match:
+        label = _KEYWORD_LABELS[match.group(0)]
+        return None if label in _FUTURE_LABELS else _keyword_range(label, now)
+
+    match = _KO_YEAR.search(text)
+    if match:
+        return _year_range(int(match.group(1)), "year")
+
+    match = _KO_DAY.search(text)
+    if match:
+        return _safe(lambda: _day_range(_recent_day(now, int(match.group(1))), "date"))
+
+    return None
+
+# 키워드 시간 표현(label)의 현재 범위 (예: 'this_week' → 이번 주 일요일 ~ 토요일)
+def keyword_range(label, now=None):
+    return _keyword_range(label, now or datetime.now())
+
+# 질문 속 키워드 시간 표현을 찾아 (label, 그 표현을 뺀 나머지 질문) 반환 (없으면 None)
+def split_keyword(message):
+    text = message.lower()
+    match = _KEYWORD_PATTERN.search(text)
+    if match is None:
+        return None
+    return _KEYWORD_LABELS[match.group(0)], f"{text[:match.start()]} {text[match.end():]}"
+
+# 검색 결과가 부족할 때 날짜 필터 범위를 앞뒤로 pad_days 만큼 넓힘
+def widen_filter(date_filter, pad_days):
+    condition = dict(date_filter["expiry_date"])
+    if "$gte" in condition:
+        condition["$gte"] -= pad_days * DAY
+    if "$lte" in condition:
+        condition["$lte"] += pad_days * DAY
+    return {**date_filter, "expiry_date": condition}
@@ -0,0 +1,44 @@
+import threading
+import tiktoken
+from config import CHAT_MODEL
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    _encoding = tiktoken.encoding_for_model(CHAT_MODEL)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    # 인코딩 파일을 받을 수 없는 오프라인 환경에서는 글자 수로 추정
+                    print(f"tiktoken 인코딩 로드 실패, 글자 수 기반으로 추정합니다: {e}")
+                    _encoding_failed = True
+    return _encoding
+
+# 텍스트의 토큰 수 (채팅 모델 기준)
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 1) // 2
+    return len(encoding.encode(text, disallowed_special=()))
+
+# 메시지 목록의 토큰 수 (메시지당 역할/구분자 오버헤드 4토큰 포함)
+def count_message_tokens(messages):
+    return sum(count_tokens(message.content if isinstance(message.content, str) else str(message.content)) + 4
+               for message in messages)
+
+# 텍스트를 앞에서부터 max_tokens 토큰 이내로 자름
+def truncate_to_tokens(text, max_tokens):
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 2]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+from config import TRACE_EXPORTERS, TRACE_WINDOW, TRACE_SERVICE_NAME
+
+# 채팅 요청 경로의 단계별 지연 추적
+# - 요청마다 Trace 하나를 만들고 단계(span)별 시작 시각/소요 시간/속성을 기록
+# - 단계 이름의 '.' 앞부분이 부모 단계 (예: retrieve.vector 는 retrieve 의 하위 단계)
+# - 검색기/번역 워커처럼 Trace 를 직접 받지 않는 코드는 record_stage 로 현재 요청(contextvar)의 Trace 에 기록
+# - 요청이 끝나면 내보내기(stdout JSON / OpenTelemetry)로 보내고, 단계별 최근 지연 분포(p50/p95/p99)를 갱신
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class Span:
+    __slots__ = ("name", "start", "duration_ms", "attributes", "error")
+
+    def __init__(self, name, start, attributes):
+        self.name = name
+        self.start = start                  # time.time() 기준 시작 시각 (내보내기용)
+        self.duration_ms = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        data = {"name": self.name, "start": round(self.start, 6), "duration_ms": round(self.duration_ms or 0.0, 3)}
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        return data
+
+class Trace:
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.attributes = attributes
+        self.spans = []
+        self.duration_ms = None
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    # 요청 시작부터 지금까지의 경과 시간 (ms)
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start_perf) * 1000
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, time.time(), attributes)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            self._add(span)
+
+    # 코루틴 하나를 단계로 기록하며 실행 (asyncio.create_task 에 그대로 넘길 수 있음)
+    async def timed(self, name, awaitable, **attributes):
+        with self.span(name, **attributes):
+            return await awaitable
+
+    # 이미 측정한 구간을 단계로 기록 (start 는 time.time() 기준, 없으면 지금에서 거꾸로 계산)
+    def add_span(self, name, duration_ms, start=None, **attributes):
+        span = Span(name, start if start is not None else time.time() - duration_ms / 1000, attributes)
+        span.duration_ms = duration_ms
+        self._add(span)
+        return span
+
+    def _add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = self.elapsed_ms()
+        stage_stats.add(self.name, self.duration_ms)
+        for span in self.spans:
+            stage_stats.add(f"{self.name}.{span.name}", span.duration_ms)
+        for exporter in get_exporters():
+            try:
+                exporter.export(self)
+            except Exception as e:
+                print(f"추적 내보내기 실패 ({type(exporter).__name__}): {e}")
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "attributes": self.attributes,
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)],
+        }
+
+# 현재 요청의 Trace 를 지정 (이후 만드는 태스크와 run_in_executor(copy_context) 작업에 이어짐)
+def activate(trace):
+    _current_trace.set(trace)
+    return trace
+
+def current_trace():
+    return _current_trace.get()
+
+# 현재 요청이 있으면 그 Trace 에 단계를 기록 (없으면 아무것도 하지 않음)
+def record_stage(name, duration_ms, **attributes):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, duration_ms, **attributes)
+
+# 단계별 최근 window 건의 지연 분포 (관리자 화면에서 조회)
+class StageStats:
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, duration_ms):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(duration_ms)
+
+    def summary(self):
+        with self._lock:
+            snapshot = {stage: np.fromiter(samples, dtype=np.float64) for stage, samples in self._samples.items()}
+        summary = {}
+        for stage, samples in sorted(snapshot.items()):
+            if not len(samples):
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[stage] = {
+                "count": int(len(samples)),
+                "mean_ms": round(float(samples.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+            }
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+stage_stats = StageStats(TRACE_WINDOW)
+
+# 요청 하나를 JSON 한 줄로 출력 (로그 수집기에서 그대로 파싱)
+class StdoutJsonExporter:
+    def export(self, trace):
+        print(json.dumps({"trace": trace.to_dict()}, ensure_ascii=False, default=str))
+
+# OpenTelemetry OTLP 내보내기 (엔드포인트는 OTEL_EXPORTER_OTLP_ENDPOINT 환경 변수)
+class OtlpExporter:
+    def __init__(self, service_name=TRACE_SERVICE_NAME):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        self._otel_trace = otel_trace
+        self._tracer = provider.get_tracer("hansung-chatbot.tracing")
+
+    @staticmethod
+    def _attributes(attributes):
+        return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+                for key, value in attributes.items() if value is not None}
+
+    def export(self, trace):
+        to_ns = lambda seconds: int(seconds * 1e9)
+        root = self._tracer.start_span(trace.name, start_time=to_ns(trace.start),
+                                       attributes=self._attributes(trace.attributes))
+        # 이름의 '.' 앞부분과 같은 이름의 단계가 있으면 그 아래에, 없으면 요청 바로 아래에 둠
+        opened = {}
+        for span in sorted(trace.spans, key=lambda span: (span.name.count("."), span.start)):
+            parent = opened.get(span.name.rsplit(".", 1)[0]) if "." in span.name else None
+            context = self._otel_trace.set_span_in_context(parent or root)
+            otel_span = self._tracer.start_span(span.name, context=context, start_time=to_ns(span.start),
+                                                attributes=self._attributes(span.attributes))
+            if span.error:
+                otel_span.set_status(self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span.error))
+            otel_span.end(end_time=to_ns(span.start + span.duration_ms / 1000))
+            opened.setdefault(span.name, otel_span)
+        root.end(end_time=to_ns(trace.start + trace.duration_ms / 1000))
+
+_EXPORTER_TYPES = {"stdout": StdoutJsonExporter, "otlp": OtlpExporter}
+_exporters = None
+_exporters_lock = threading.Lock()
+
+# TRACE_EXPORTERS 설정(쉼표 구분)에 따른 내보내기 목록 (최초 호출 시에만 생성)
+def get_exporters():
+    global _exporters
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                exporters = []
+                for name in filter(None, (name.strip() for name in TRACE_EXPORTERS.split(","))):
+                    try:
+                        exporters.append(_EXPORTER_TYPES[name]())
+                    except (KeyError, ImportError) as e:
+                        print(f"추적 내보내기 '{name}' 를 사용할 수 없습니다: {e!r}")
+                _exporters = exporters
+    return _exporters
@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from deep_translator import GoogleTranslator
+from config import CACHE_DIR
+from tracing import record_stage
+
+# 번역 백엔드는 name 속성과 translate(text) 메서드만 있으면 됨 (테스트에서는 로컬 가짜 백엔드로 교체)
+class GoogleTranslatorBackend:
+    def __init__(self, source="ko", target="en"):
+        self.source = source
+        self.target = target
+        self.name = f"google:{source}-{target}"
+        # GoogleTranslator 는 호출마다 내부 상태를 바꾸므로 워커 스레드마다 따로 생성
+        self._local = threading.local()
+
+    def translate(self, text):
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            translator = GoogleTranslator(source=self.source, target=self.target)
+            self._local.translator = translator
+        return translator.translate(text)
+
+# 번역 메모리: 한 번 번역한 문장(인사말, 반복되는 공지 제목 등)은 다시 요청하지 않음
+class TranslationMemory:
+    def __init__(self, path=None, max_memory_entries=4096):
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "translation_memory.sqlite3")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translated TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(backend_name, text):
+        return hashlib.sha1(f"{backend_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, backend_name, text):
+        key = self._key(backend_name, text)
+        with self._lock:
+            translated = self._memory.get(key)
+            if translated is None:
+                row = self._db.execute("SELECT translated FROM translations WHERE key = ?", (key,)).fetchone()
+                translated = row[0] if row else None
+            if translated is None:
+                self.misses += 1
+                return None
+            self._remember(key, translated)
+            self.hits += 1
+            return translated
+
+    def put(self, backend_name, text, translated):
+        key = self._key(backend_name, text)
+        with self._lock:
+            self._remember(key, translated)
+            self._db.execute("INSERT OR REPLACE INTO translations (key, translated) VALUES (?, ?)", (key, translated))
+            self._db.commit()
+
+    def _remember(self, key, translated):
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[ \t]+|\n+")
+_HANGUL = re.compile(r"[가-힣]")
+
+# 토큰 스트림을 문장 단위로 자름 (문장 뒤의 공백/줄바꿈은 번역하지 않고 그대로 붙임)
+class SentenceSegmenter:
+    def __init__(self, max_chars=300):
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        segments = []
+        while True:
+            match = _SENTENCE_BOUNDARY.search(self._buffer)
+            if match is None:
+                break
+            segments.append((self._buffer[:match.start()], match.group(0)))
+            self._buffer = self._buffer[match.end():]
+        # 문장 부호 없이 길어지면 마지막 공백에서 끊음
+        if len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(" ", 0, self.max_chars)
+            cut = cut if cut > 0 else self.max_chars
+            segments.append((self._buffer[:cut], " " if self._buffer[cut:cut + 1] == " " else ""))
+            self._buffer = self._buffer[cut:].lstrip(" ")
+        return [(text, separator) for text, separator in segments if text or separator]
+
+    def flush(self):
+        remainder, self._buffer = self._buffer, ""
+        return [(remainder, "")] if remainder else []
+
+# 문장 단위 번역을 백그라운드 워커에서 처리해 LLM 토큰 스트림이 멈추지 않도록 하고,
+# 번역된 문장은 원래 순서대로 내보냄
+class StreamingTranslator:
+    def __init__(self, backend, memory=None, max_workers=2):
+        self.backend = backend
+        self.memory = memory if memory is not None else TranslationMemory()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translator")
+
+    def translate_segment(self, text):
+        # 한글이 없는 문장(URL, 숫자, 영어)은 번역하지 않음
+        if not text.strip() or not _HANGUL.search(text):
+            return text
+        translated = self.memory.get(self.backend.name, text)
+        if translated is None:
+            start = time.perf_counter()
+            translated = self.backend.translate(text) or text
+            record_stage("translate.backend", (time.perf_counter() - start) * 1000, backend=self.backend.name, chars=len(text))
+            self.memory.put(self.backend.name, text, translated)
+        return translated
+
+    # 번역 워커에서도 현재 요청의 추적(tracing)에 기록되도록 컨텍스트를 복사해서 넘김
+    async def atranslate_stream(self, chunks):
+        loop = asyncio.get_running_loop()
+        segmenter = SentenceSegmenter()
+        pending = deque()
+        async for chunk in chunks:
+            for text, separator in segmenter.feed(chunk):
+                pending.append((loop.run_in_executor(self._executor, contextvars.copy_context().run, self.translate_segment, text), separator))
+            while pending and pending[0][0].done():
+                future, separator = pending.popleft()
+                yield future.result() + separator
+        for text, separator in segmenter.flush():
+            pending.append((loop.run_in_executor(self._executor, contextvars.copy_context().run, self.translate_segment, text), separator))
+        while pending:
+            future, separator = pending.popleft()
+            yield (await future) + separator
@@ -1,28 +1,8 @@
-import requests
-from bs4 import BeautifulSoup as bs
 import mysql.connector
 from datetime import datetime
-
-# 공지사항 내용을 크롤링하는 함수
-def content_croll(url):
-    page = requests.get(url)
-    soup = bs(page.text, 'html.parser')
-    view_con_div = soup.find('div', class_='view-con')
-
-    content = ""
-    image_url = None
-    if view_con_div:
-        content = view_con_div.get_text(strip=True)
-
-        # 이미지 URL을 찾기
-        image_tag = view_con_div.find('img')
-        if image_tag and 'src' in image_tag.attrs:
-            image_url = image_tag['src']
-    
-    else:
-        content = "No content found"
-    
-    return content, image_url
+from crawler import NoticeCrawler
+from fetch_state import FetchStateStore, link_hash
+from notice_writer import NoticeWriter, ensure_table
 
 # MySQL 연결 설정
 db = mysql.connector.connect(
@@ -31,24 +11,24 @@ db = mysql.connector.connect(
     password="12345678",
     database="crawled"
 )
-cursor = db.cursor()
 
 # 테이블이 없으면 생성
-create_table_query = """
-CREATE TABLE IF NOT EXISTS swpre (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    title VARCHAR(255),
-    link TEXT,
-    content TEXT,
-    image TEXT,
-    date DATETIME
-)
-"""
-cursor.execute(create_table_query)
+ensure_table(db)
+
+# 링크별 마지막 요청 상태 (ETag, Last-Modified, 본문 해시)
+fetch_state = FetchStateStore(db).load()
+
+# MySQL 테이블에 배치 단위로 저장 (요청 상태도 같은 배치로 저장)
+writer = NoticeWriter(db, fetch_state=fetch_state)
+
+# 이미 저장된 공지 (행마다 조회하지 않도록 한 번에 읽음)
+existing_links = writer.existing_links()
 
 # 가장 최신 공지사항 날짜를 가져옴
+cursor = db.cursor()
 cursor.execute("SELECT MAX(date) FROM swpre")
 last_crawled_date = cursor.fetchone()[0]
+cursor.close()
 
 if not last_crawled_date:
     last_crawled_date = datetime.min  # 데이터가 없으면 가장 과거 날짜로 설정
@@ -56,77 +36,36 @@ if not last_crawled_date:
 # 최신 공지사항 페이지 순회
 base_url = 'https://www.hansung.ac.kr/bbs/hansung/143/rssList.do?page={}'
 
-# 카운트
-count = 0
-
 # 가장 오래된 새 공지사항 날짜를 저장할 변수
 oldest_new_date = None
 
-for page_number in range(1, 10):
-    url = base_url.format(page_number)
-    page = requests.get(url)
-    soup = bs(page.text, 'xml')
-    articles = soup.find_all('item')
-    base_domain = "https://www.hansung.ac.kr"
-
-    for article in articles:
-        title = article.find('title').get_text(strip=True) if article.find('title') else "No Title"
-        link = article.find('link').get_text() if article.find('link') else "No Link"
-        pub_date = article.find('pubDate').get_text(strip=True) if article.find('pubDate') else "No Date"
-
-        # pubDate를 datetime 형식으로 변환
-        try:
-            pub_date = datetime.strptime(pub_date, '%Y-%m-%d %H:%M:%S.%f')  # 형식: 'YYYY-MM-DD HH:MM:SS.s'
-        except ValueError:
-            try:
-                pub_date = datetime.strptime(pub_date, '%Y-%m-%d %H:%M:%S')  # 형식: 'YYYY-MM-DD HH:MM:SS'
-            except ValueError:
-                try:
-                    pub_date = datetime.strptime(pub_date, '%a, %d %b %Y %H:%M:%S %Z')  # RFC 822 형식
-                except ValueError:
-                    print(f"날짜 형식 오류: {pub_date}")
-                    continue
-
-        # 마지막 크롤링된 날짜와 비교
-        if pub_date <= last_crawled_date:
-            continue
-
-        if link.startswith("/"):
-            link = f"{base_domain}{link}"
-
-        content, image_url = content_croll(link)
-
-        # 이미 저장된 링크인지 확인
-        cursor.execute("SELECT COUNT(*) FROM swpre WHERE link = %s", (link,))
-        if cursor.fetchone()[0] > 0:
-            continue
-
-        # MySQL 테이블에 저장
-        sql = "INSERT INTO swpre (title, link, content, image, date) VALUES (%s, %s, %s, %s, %s)"
-        val = (title, link, content, image_url, pub_date)
-        cursor.execute(sql, val)
-        db.commit()
+# 새 공지는 추가, 본문이 바뀐 공지는 갱신
+# (요청 상태를 기록하기 전부터 저장되어 있던 공지는 기준 해시만 남기고 건너뜀)
+def save(record):
+    global oldest_new_date
+    if link_hash(record["link"]) in existing_links:
+        if record["previous_hash"] is None:
+            return False
+        print(f"수정된 공지사항: {record['title']}")
+    elif oldest_new_date is None or record["date"] < oldest_new_date:
+        # 가장 오래된 새 공지사항 날짜 업데이트
+        oldest_new_date = record["date"]
+    writer.add(record)
 
-        # 저장된 데이터 출력
-        print(f"제목: {title}")
-        print(f"링크: {link}")
-        print(f"내용: {content[:100]}...")  # 내용의 앞 100자만 출력
-        print(f"이미지 URL: {image_url}")
-        print(f"게시 날짜: {pub_date}")
-        print("-" * 40)
+# 페이지의 공지가 모두 마지막 크롤링 날짜 이전이면 그 페이지까지만 확인하고 순회 중단
+# (그 페이지까지의 기존 공지는 조건부 요청으로 다시 확인해서 바뀐 공지만 저장)
+def reached_crawled(items):
+    return all(item["date"] <= last_crawled_date for item in items)
 
-        count += 1
-
-        # 가장 오래된 새 공지사항 날짜 업데이트
-        if oldest_new_date is None or pub_date < oldest_new_date:
-            oldest_new_date = pub_date
+crawler = NoticeCrawler(save, stop_paging=reached_crawled, fetch_state=fetch_state)
+stats = crawler.crawl(base_url.format(page_number) for page_number in range(1, 92))
+writer.close()
 
 # MySQL 연결 종료
-cursor.close()
 db.close()
 
 # 가장 오래된 새 공지사항 날짜 출력
 if oldest_new_date:
     print(f"가장 처음 저장된 새 공지사항 날짜: {oldest_new_date}")
 
-print(f"새로운 공지사항 {count}개가 성공적으로 저장되었습니다.")
+print(f"새로 저장되거나 수정된 공지사항 {stats.saved}개, 변경 없는 공지사항 {stats.unchanged}개")
@@ -5,8 +5,8 @@ from PIL import Image
 import Vision
 from typing import List, Tuple
 from dotenv import load_dotenv
-from datetime import datetime
 import mysql.connector
+from fetch_state import select_pending, clear_pending
 
 # Load environment variables
 load_dotenv()
@@ -63,23 +63,16 @@ def text_from_image(image, recognition_level="accurate", language_preference=Non
                     results.append((result.text(), result.confidence()))
         return results
 
-# 기준 날짜 설정 (날짜만 비교)
-reference_date = datetime(2024, 11, 2)
-print(f"Reference date: {reference_date}")
-
-# SQL 쿼리 결과 확인
-cursor.execute("""
-    SELECT id, image, content, date FROM swpre
-    WHERE image IS NOT NULL AND date >= %s
-    """, (reference_date,))
-image_rows = cursor.fetchall()
+# update_crawl.py 가 새로 저장했거나 본문이 바뀌었다고 표시한 공지만 OCR 대상
+pending_rows, selected_at = select_pending(cursor, "ocr_pending", ["id", "image", "content", "date", "link"])
+image_rows = [row[:4] for row in pending_rows if row[1] is not None]
 
 print(f"Fetched {len(image_rows)} rows from the database.")
 
 updated_count = 0
 
 if not image_rows:
-    print("No images found after the reference date.")
+    print("No new or changed notices with images.")
 else:
     for row in image_rows:
         id, image_url, existing_content, pub_date = row
@@ -116,6 +109,9 @@ else:
         except Exception as e:
             print(f"Error processing ID {id}: {e}")
 
+# 처리한 공지의 OCR 표시를 지움 (이미지 불러오기 등에 실패한 공지도 다음 본문 변경 전까지는 다시 시도하지 않음)
+clear_pending(db, "ocr_pending", [row[4] for row in pending_rows], selected_at)
+
 # 데이터베이스 연결 종료
 cursor.close()
 db.close()
@@ -1,17 +1,18 @@
 
 from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from rate_limit import GovernedEmbeddings, BATCH, use_batch_process_limits
 from dotenv import load_dotenv
-from datetime import datetime
+from config import EMBEDDING_MODEL
+from notice_index import build_documents, index_documents, delete_documents
+from notice_writer import select_removed, clear_removed
+from digests import fetch_window_rows, refresh_digests
+from fetch_state import select_pending, clear_pending
 import mysql.connector
 
 load_dotenv()
 
-class Document:
-    def __init__(self, page_content, metadata=None, id=None):
-        self.page_content = page_content
-        self.metadata = metadata if metadata is not None else {}
-        self.id = id
+# 채팅 앱과 따로 도는 프로세스이므로 OpenAI 한도 중 업로드 스크립트 몫만 사용
+use_batch_process_limits()
 
 # Step 1: MySQL에 연결
 db = mysql.connector.connect(
@@ -23,38 +24,42 @@ db = mysql.connector.connect(
 
 cursor = db.cursor()
 
-# Step 2: 실행 날짜 이후의 데이터를 배열로 반환
+# Step 2: 새로 저장됐거나 본문이 바뀐 공지(update_crawl.py 가 표시)를 배열로 반환 (조회 시각과 함께)
 def crawled_data_to_array():
-    # 현재 날짜 기준으로 데이터를 필터링
-    reference_date = datetime(2024, 11, 28, 5, 0)
-    fetch_query = """
-        SELECT id, title, link, content, date 
-        FROM swpre 
-        WHERE date >= %s
-    """
-    cursor.execute(fetch_query, (reference_date,))
-    rows = cursor.fetchall()
-    return rows
+    return select_pending(cursor, "embed_pending", ["id", "title", "link", "content", "date"])
 
 # Step 3: 메타데이터와 함께 임베딩 생성 및 저장
 def store_array_to_vector_db():
-    embedding = OpenAIEmbeddings(model='text-embedding-3-large')
-    index_name = 'crawled-db-ver2'
+    # 업로드 임베딩은 배치 대기열로 보내 채팅 요청이 쓸 한도를 남겨둠
+    embedding = GovernedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL, lane=BATCH)
 
-    rows = crawled_data_to_array()
-    documents = []
-    for id, title, link, content, pub_date in rows: 
-        # 메타데이터를 포함하여 문서 내용을 생성합니다.
-        combined_content = f"Title: {title}\nLink: {link}\nDate: {pub_date}\nContent: {content}"
-        metadata = {'title': title, 'link': link, 'date': pub_date}
-        documents.append(Document(combined_content, metadata, id=str(id)))
+    rows, selected_at = crawled_data_to_array()
+    documents = build_documents(rows)
 
-    # 문서를 Pinecone에 저장합니다.
-    database = PineconeVectorStore.from_documents(documents, embedding, index_name=index_name)
+    # 문서를 Pinecone과 로컬 인덱스 스냅샷에 저장합니다.
+    chunk_count = index_documents(documents, embedding)
 
-    print(f"{len(documents)}개의 문서가 Pinecone에 업로드되었습니다.")
+    print(f"{len(documents)}개의 문서({chunk_count}개 청크)가 Pinecone에 업로드되었습니다.")
+
+    # 업로드한 공지의 임베딩 표시를 지움
+    clear_pending(db, "embed_pending", [link for _, _, link, _, _ in rows], selected_at)
+
+# Step 3-1: DB 에서 지운 중복 공지(link_hash 마이그레이션)를 벡터 인덱스에서도 삭제
+def remove_deleted_notices():
+    removed = select_removed(cursor)
+    if not removed:
+        return
+    delete_documents(removed, OpenAIEmbeddings(model=EMBEDDING_MODEL))
+    clear_removed(db, removed)
+    print(f"삭제된 공지 {len(removed)}개를 벡터 인덱스에서 지웠습니다.")
+
+# Step 4: 오늘/어제/이번 주/최근 공지 요약 갱신 (새 공지가 들어온 기간만 다시 생성)
+def refresh_window_digests():
+    refresh_digests(fetch_window_rows(cursor))
 
 store_array_to_vector_db()
+remove_deleted_notices()
+refresh_window_digests()
 
 cursor.close()
 db.close()
@@ -1,17 +1,16 @@
 import mysql.connector
-import time
-from datetime import datetime
 from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from rate_limit import GovernedEmbeddings, BATCH, use_batch_process_limits
 from dotenv import load_dotenv
+from config import EMBEDDING_MODEL
+from notice_index import build_documents, index_documents
+from notice_writer import select_removed, clear_removed
+from digests import fetch_window_rows, refresh_digests
 
 load_dotenv()
 
-class Document:
-    def __init__(self, page_content, metadata=None, id=None):
-        self.page_content = page_content
-        self.metadata = metadata if metadata is not None else {}
-        self.id = id
+# 채팅 앱과 따로 도는 프로세스이므로 OpenAI 한도 중 업로드 스크립트 몫만 사용
+use_batch_process_limits()
 
 # Step 1: MySQL에 연결
 db = mysql.connector.connect(
@@ -32,31 +31,26 @@ def crawled_data_to_array():
 
 # Step 3: 메타데이터와 함께 임베딩 생성 및 저장
 def store_array_to_vector_db():
-    embedding = OpenAIEmbeddings(model='text-embedding-3-large')
-    index_name = 'crawled-db-ver2'
+    # 업로드 임베딩은 배치 대기열로 보내 채팅 요청이 쓸 한도를 남겨둠
+    embedding = GovernedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL, lane=BATCH)
 
     rows = crawled_data_to_array()
-    documents = []
-    for id, title, link, content, pub_date in rows:
-        # 날짜를 UNIX 타임스탬프로 변환
-        date_object = datetime.strptime(str(pub_date), "%Y-%m-%d %H:%M:%S")
-        unix_timestamp = int(time.mktime(date_object.replace(hour=0, minute=0, second=0, microsecond=0).timetuple()))
-        
-        # 문서 내용 생성
-        combined_content = f"Title: {title}\nLink: {link}\nContent: {content}"
-        metadata = {
-            'title': title,
-            'link': link,
-            'expiry_date': unix_timestamp  # UNIX 타임스탬프 저장
-        }
-        documents.append(Document(combined_content, metadata, id=str(id)))
-
-    # 문서를 Pinecone에 저장
-    database = PineconeVectorStore.from_documents(documents, embedding, index_name=index_name)
-
-    print(f"{len(documents)}개의 문서가 Pinecone에 업로드되었습니다.")
+    documents = build_documents(rows)
+
+    # 문서를 Pinecone과 로컬 인덱스 스냅샷에 저장 (전체 업로드이므로 스냅샷은 새로 생성)
+    chunk_count = index_documents(documents, embedding, rebuild=True)
+
+    print(f"{len(documents)}개의 문서({chunk_count}개 청크)가 Pinecone에 업로드되었습니다.")
+
+    # 새로 만든 인덱스에는 삭제된 공지가 없으므로 삭제 대기 목록을 비움
+    clear_removed(db, select_removed(cursor))
+
+# Step 4: 오늘/어제/이번 주/최근 공지 요약 갱신 (새 공지가 들어온 기간만 다시 생성)
+def refresh_window_digests():
+    refresh_digests(fetch_window_rows(cursor))
 
 store_array_to_vector_db()
+refresh_window_digests()
 
 cursor.close()
 db.close()